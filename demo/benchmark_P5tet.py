@@ -0,0 +1,63 @@
+# Copyright (C) 2021 FEniCS Project
+#
+# This file is part of FFCX.(https://www.fenicsproject.org)
+#
+# SPDX-License-Identifier:    LGPL-3.0-or-later
+"""Benchmark formatting of the static element tables of the P5tet demo.
+
+Compares the bulk float formatter used by ArrayDecl with the generic
+per-value initializer list builder, and checks that both produce the
+same code. Run from the demo directory with
+
+    python benchmark_P5tet.py
+
+"""
+
+import os
+import time
+
+import ffcx.parameters
+import ufl
+from ffcx.analysis import analyze_ufl_objects
+from ffcx.codegeneration.C.cnodes import (build_float_initializer_lists,
+                                          build_initializer_lists)
+from ffcx.codegeneration.C.format_value import format_float
+from ffcx.ir.representation import compute_ir
+
+
+def main():
+    demo_dir = os.path.dirname(os.path.realpath(__file__))
+    ufd = ufl.algorithms.load_ufl_file(os.path.join(demo_dir, "P5tet.ufl"))
+    parameters = ffcx.parameters.get_parameters()
+
+    # Mass and stiffness forms of the demo element
+    element = ufd.elements[0]
+    u, v = ufl.TrialFunction(element), ufl.TestFunction(element)
+    forms = [u * v * ufl.dx, ufl.inner(ufl.grad(u), ufl.grad(v)) * ufl.dx]
+
+    start = time.time()
+    analysis = analyze_ufl_objects(forms, parameters)
+    ir = compute_ir(analysis, {}, "P5tet", parameters, False)
+    print(f"Analysis and IR: {time.time() - start:.3f} s")
+
+    # Element tables of the integrals
+    tables = [t for itg in ir.integrals for t in itg.unique_tables.values()]
+    num_values = sum(t.size for t in tables)
+    precision = 16
+
+    start = time.time()
+    reference = [build_initializer_lists(t, t.shape, 0, format_float, precision=precision) for t in tables]
+    generic = time.time() - start
+
+    start = time.time()
+    fast = [build_float_initializer_lists(t, precision=precision) for t in tables]
+    bulk = time.time() - start
+
+    assert fast == reference
+    print(f"Formatted {len(tables)} tables with {num_values} values")
+    print(f"Generic initializer lists: {generic:.3f} s")
+    print(f"Bulk float formatting:     {bulk:.3f} s ({generic / max(bulk, 1e-12):.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
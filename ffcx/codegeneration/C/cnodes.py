@@ -4,14 +4,16 @@
 #
 # SPDX-License-Identifier:    LGPL-3.0-or-later
 
+import itertools
 import logging
 import numbers
+import sys
 
 import numpy
 
 from ffcx.codegeneration.C.format_lines import Indented, format_indented_lines
-from ffcx.codegeneration.C.format_value import (format_float, format_int,
-                                                format_value)
+from ffcx.codegeneration.C.format_value import (format_float, format_floats,
+                                                format_int, format_value)
 from ffcx.codegeneration.C.precedence import PRECEDENCE
 
 logger = logging.getLogger("ffcx")
@@ -715,7 +717,7 @@ class FlattenedArray(object):
         # Typecheck array argument
         if isinstance(array, ArrayDecl):
             self.array = array.symbol
-        elif isinstance(array, Symbol):
+        elif isinstance(array, (Symbol, ArrayAccess)):
             self.array = array
         else:
             assert isinstance(array, str)
@@ -765,6 +767,9 @@ class FlattenedArray(object):
                 flat = flat + (i if s == literal_one else s * i)
         # Delay applying ArrayAccess until we have all indices
         if n == len(self.strides):
+            if isinstance(self.array, ArrayAccess):
+                # Flattened array in an element of an array of pointers
+                return self.array[flat]
             return ArrayAccess(self.array, flat)
         else:
             return FlattenedArray(self.array, strides=self.strides[n:], offset=flat)
@@ -1223,6 +1228,48 @@ def build_1d_initializer_list(values, formatter, padlen=0, precision=None):
     return "".join(tokens)
 
 
+def build_float_initializer_lists(values, padlen=0, precision=None):
+    """Return a list of lines with initializer lists for a multidimensional real array.
+
+    Produces the same lines as build_initializer_lists with
+    format_float, but formats all values at once and builds each line
+    directly from its row of values instead of recursing over the
+    dimensions.
+
+    """
+    values = numpy.asarray(values)
+    assert len(values.shape) > 0
+
+    shape = values.shape
+    n = shape[-1]
+    strings = format_floats(values, precision)
+    padding = ""
+    if padlen:
+        padding = ", " + format_floats([0.0], precision)[0]
+        padding = padding * leftover(n, padlen)
+
+    lines = []
+    outer_shape = shape[:-1]
+    for row, index in enumerate(numpy.ndindex(*outer_shape)):
+        line = "{ " + ", ".join(strings[row * n:(row + 1) * n]) + padding + " }"
+
+        # Wrap in the enclosing lists, innermost first
+        prefix = ""
+        first = True  # First row in the sublist at this level
+        last = True  # Last row in the sublist at this level
+        for k in reversed(range(len(outer_shape))):
+            i, size = index[k], outer_shape[k]
+            if last and i < size - 1:
+                line += ","
+            prefix = ("{ " if first and i == 0 else "  ") + prefix
+            first = first and i == 0
+            last = last and i == size - 1
+            if last:
+                line += " }"
+        lines.append(prefix + line)
+    return lines
+
+
 def build_initializer_lists(values, sizes, level, formatter, padlen=0, precision=None):
     """Return a list of lines with initializer lists for a multidimensional array.
 
@@ -1336,13 +1383,16 @@ class ArrayDecl(CStatement):
         else:
             # Construct initializer lists for arbitrary multidimensional array values
             if self.values.dtype.kind == "f":
-                formatter = format_float
-            elif self.values.dtype.kind == "i":
-                formatter = format_int
+                assert numpy.all(self.values.shape == self.sizes)
+                initializer_lists = build_float_initializer_lists(
+                    self.values, padlen=self.padlen, precision=precision)
             else:
-                formatter = format_value
-            initializer_lists = build_initializer_lists(
-                self.values, self.sizes, 0, formatter, padlen=self.padlen, precision=precision)
+                if self.values.dtype.kind == "i":
+                    formatter = format_int
+                else:
+                    formatter = format_value
+                initializer_lists = build_initializer_lists(
+                    self.values, self.sizes, 0, formatter, padlen=self.padlen, precision=precision)
             if len(initializer_lists) == 1:
                 return decl + " = " + initializer_lists[0] + ";"
             else:
@@ -1355,6 +1405,97 @@ class ArrayDecl(CStatement):
                 and all(getattr(self, name) == getattr(self, name) for name in attributes))
 
 
+def build_string_literal_lines(data, width=200):
+    """Return a list of adjacent C string literals holding the given bytes.
+
+    Every byte is written in its shortest form: printable characters as
+    is, except for question marks which could start a trigraph, control
+    characters with a named escape as such and all other bytes as octal
+    escapes, padded to three digits only when followed by an octal digit.
+
+    """
+    named = {7: "\\a", 8: "\\b", 9: "\\t", 10: "\\n", 11: "\\v", 12: "\\f", 13: "\\r",
+             34: '\\"', 63: "\\?", 92: "\\\\"}
+    short = [named.get(b, chr(b) if 32 <= b < 127 else "\\%o" % b) for b in range(256)]
+    padded = ["\\%03o" % b if token[1:2].isdigit() else token for b, token in enumerate(short)]
+
+    lines = []
+    line = []
+    length = 0
+    for b, following in itertools.zip_longest(data, data[1:]):
+        token = padded[b] if following is not None and 48 <= following < 56 else short[b]
+        if length + len(token) > width:
+            lines.append('"' + "".join(line) + '"')
+            line = []
+            length = 0
+        line.append(token)
+        length += len(token)
+    lines.append('"' + "".join(line) + '"')
+    return lines
+
+
+class ArrayBlobDecl(CStatement):
+    """A definition of a read only array of doubles stored as binary data.
+
+    The values are stored in the native byte order in a static string
+    literal, which compilers parse much faster than an initializer list
+    with one floating point literal per value. The array is accessed
+    through a pointer named after the symbol, so it can be indexed like
+    an array declared with ArrayDecl.
+
+    """
+
+    __slots__ = ("symbol", "sizes", "padlen", "values")
+    is_scoped = False
+
+    def __init__(self, symbol, sizes, values, padlen=0):
+        self.symbol = as_symbol(symbol)
+        if isinstance(sizes, int):
+            sizes = (sizes, )
+        self.sizes = tuple(sizes)
+        self.values = numpy.asarray(values)
+        self.padlen = padlen
+
+    def cs_format(self, precision=None):
+        if not all(self.sizes):
+            raise RuntimeError("Detected an array dimension of zero. This is not valid in C.")
+        assert self.values.shape == self.sizes
+
+        # Pad innermost array dimension with zeros
+        sizes = pad_innermost_dim(self.sizes, self.padlen)
+        values = numpy.zeros(sizes, dtype=numpy.float64)
+        values[..., :self.sizes[-1]] = self.values
+
+        byteorder = {"little": "__ORDER_LITTLE_ENDIAN__", "big": "__ORDER_BIG_ENDIAN__"}[sys.byteorder]
+        data = values.tobytes()
+        name = self.symbol.name
+
+        union = f"union {{ unsigned char bytes[{len(data)}]; double values[{values.size}]; }}"
+        lines = build_string_literal_lines(data)
+        lines[0] = "{ " + lines[0]
+        for i in range(1, len(lines)):
+            lines[i] = "  " + lines[i]
+        lines[-1] += " };"
+
+        brackets = "".join("[%d]" % n for n in sizes[1:])
+        if brackets:
+            pointer = (f"static const double (*const {name}){brackets} = "
+                       f"(const double (*){brackets}) {name}_data.values;")
+        else:
+            pointer = f"static const double *const {name} = {name}_data.values;"
+
+        return [f"#if defined(__BYTE_ORDER__) && __BYTE_ORDER__ != {byteorder}",
+                f'#error "Table {name} was generated for a {sys.byteorder}-endian target"',
+                "#endif",
+                f"static const {union} {name}_data =",
+                Indented(lines),
+                pointer]
+
+    def __eq__(self, other):
+        return (isinstance(other, type(self)) and self.symbol == other.symbol and self.sizes == other.sizes
+                and self.padlen == other.padlen and numpy.array_equal(self.values, other.values))
+
+
 # Scoped statements
 
 
@@ -5,6 +5,8 @@
 import numbers
 import re
 
+import numpy
+
 _subs = (
     # Remove 0s after e+ or e-
     (re.compile(r"e[\+]0*(.)"), r"e\1"),
@@ -30,6 +32,25 @@ def format_float(x, precision=None):
     return s
 
 
+def format_floats(values, precision=None):
+    """Format all values of a real array, returning a flat list of strings.
+
+    Equivalent to applying format_float to each value, but formats the
+    whole array in one pass over Python floats.
+    """
+    values = numpy.asarray(values, dtype=float).ravel().tolist()
+    if precision:
+        strings = list(map("{{:.{}}}".format(precision).format, values))
+    else:
+        strings = list(map(repr, values))
+    for i, s in enumerate(strings):
+        if "e" in s:
+            for r, v in _subs:
+                s = r.sub(v, s)
+            strings[i] = s
+    return strings
+
+
 def format_int(x, precision=None):
     return str(x)
 
@@ -15,7 +15,7 @@ from ffcx.codegeneration.symbols import FFCXBackendSymbols
 class FFCXBackend(object):
     """Class collecting all aspects of the FFCX backend."""
 
-    def __init__(self, ir, parameters):
+    def __init__(self, ir, parameters, form_index=None):
 
         # This is the seam where cnodes/C is chosen for the ffcx backend
         self.language = ffcx.codegeneration.C.cnodes
@@ -28,7 +28,7 @@ class FFCXBackend(object):
         original_constant_offsets = ir.original_constant_offsets
 
         self.symbols = FFCXBackendSymbols(self.language, coefficient_numbering,
-                                          coefficient_offsets, original_constant_offsets)
+                                          coefficient_offsets, original_constant_offsets, form_index)
         self.definitions = FFCXBackendDefinitions(ir, self.language,
                                                   self.symbols, parameters)
         self.access = FFCXBackendAccess(ir, self.language, self.symbols,
@@ -11,6 +11,7 @@ UFC function from an intermediate representation (IR).
 
 """
 
+import functools
 import logging
 from collections import namedtuple
 
@@ -21,13 +22,15 @@ from ffcx.codegeneration.expressions import generator as expression_generator
 from ffcx.codegeneration.finite_element import \
     generator as finite_element_generator
 from ffcx.codegeneration.form import generator as form_generator
+from ffcx.codegeneration.integrals import fused_generator as fused_integral_generator
 from ffcx.codegeneration.integrals import generator as integral_generator
+from ffcx.parallel import run_tasks
 
 logger = logging.getLogger("ffcx")
 
-code_blocks = namedtuple("code_blocks", ["elements", "dofmaps",
+code_blocks = namedtuple("code_blocks", ["tables", "elements", "dofmaps",
                                          "coordinate_mappings", "integrals",
-                                         "forms", "expressions"])
+                                         "fused_integrals", "forms", "expressions"])
 
 
 def generate_code(ir, parameters):
@@ -37,14 +40,73 @@ def generate_code(ir, parameters):
     logger.info("Compiler stage 3: Generating code")
     logger.info(79 * "*")
 
-    # Generate code for finite_elements
-    code_finite_elements = [finite_element_generator(element_ir, parameters) for element_ir in ir.elements]
-    code_dofmaps = [dofmap_generator(dofmap_ir, parameters) for dofmap_ir in ir.dofmaps]
-    code_coordinate_mappings = [coordinate_mapping_generator(cmap_ir, parameters) for cmap_ir in ir.coordinate_mappings]
-    code_integrals = [integral_generator(integral_ir, parameters) for integral_ir in ir.integrals]
-    code_forms = [form_generator(form_ir, parameters) for form_ir in ir.forms]
-    code_expressions = [expression_generator(expression_ir, parameters) for expression_ir in ir.expressions]
-
-    return code_blocks(elements=code_finite_elements, dofmaps=code_dofmaps,
-                       coordinate_mappings=code_coordinate_mappings, integrals=code_integrals,
-                       forms=code_forms, expressions=code_expressions)
+    # Each generator only depends on its own IR, so all code blocks can
+    # be generated independently, in order, by a pool of workers
+    generators = _generators(ir)
+    tasks = [functools.partial(_generate, generator, obj_ir, parameters)
+             for generator, irs in generators for obj_ir in irs]
+    code = run_tasks(tasks, parameters.get("codegen_num_workers", 1))
+
+    # Split results back into code blocks for each kind of object.
+    # Integrals and expressions also return their static tables, which
+    # are defined once at file scope, before all kernels using them.
+    blocks = []
+    tables = {}
+    offset = 0
+    for generator, irs in generators:
+        block = code[offset:offset + len(irs)]
+        if generator in (integral_generator, fused_integral_generator, expression_generator):
+            for declaration, implementation, kernel_tables in block:
+                for name, definition in kernel_tables.items():
+                    tables.setdefault(name, definition)
+        blocks.append(block)
+        offset += len(irs)
+
+    if tables:
+        logger.info(f"Defining {len(tables)} static tables shared by all kernels")
+        tables = [("", format_tables(tables))]
+    else:
+        tables = []
+
+    return code_blocks(tables, *blocks)
+
+
+def generate_code_blocks(ir, parameters):
+    """Generate code for one object at a time, in the order of the code blocks.
+
+    Yields the code of each object, a (declaration, implementation) pair,
+    or a (declaration, implementation, tables) triple for integrals and
+    expressions. Integral and expression IR which has not been computed
+    yet is computed just before its code is generated, so that at most
+    one such IR is held in memory at a time.
+
+    """
+    logger.info(79 * "*")
+    logger.info("Compiler stage 3: Generating code (streaming)")
+    logger.info(79 * "*")
+
+    for generator, irs in _generators(ir):
+        for obj_ir in irs:
+            yield _generate(generator, obj_ir, parameters)
+
+
+def _generators(ir):
+    return [(finite_element_generator, ir.elements),
+            (dofmap_generator, ir.dofmaps),
+            (coordinate_mapping_generator, ir.coordinate_mappings),
+            (integral_generator, ir.integrals),
+            (fused_integral_generator, ir.fused_integrals),
+            (form_generator, ir.forms),
+            (expression_generator, ir.expressions)]
+
+
+def _generate(generator, obj_ir, parameters):
+    # IR computed on demand is given as a task computing it
+    if callable(obj_ir):
+        obj_ir = obj_ir()
+    return generator(obj_ir, parameters)
+
+
+def format_tables(tables):
+    """Format definitions of static tables at file scope."""
+    return "\n// Static tables shared by all kernels\n" + "".join(tables.values())
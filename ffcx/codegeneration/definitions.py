@@ -89,7 +89,19 @@ class FFCXBackendDefinitions(object):
 
         unroll = len(tabledata.dofmap) != end - begin
         # unroll = True
-        if unroll:
+        max_unroll = self.parameters["max_unroll"]
+        if unroll and 0 <= max_unroll < len(tabledata.dofmap):
+            # Loop over a static array of the dofs instead of unrolling
+            ic = self.symbols.coefficient_dof_sum_index()
+            dofs = L.Symbol(f"{access.name}_dofs")
+            dof_access = self.symbols.coefficient_dof_access(mt.terminal, dofs[ic])
+            code = [
+                L.ArrayDecl("static const int", dofs, len(tabledata.dofmap),
+                            values=[int(i) for i in tabledata.dofmap]),
+                L.VariableDecl("ufc_scalar_t", access, 0.0),
+                L.ForRange(ic, 0, len(tabledata.dofmap), body=[L.AssignAdd(access, dof_access * FE[ic])])
+            ]
+        elif unroll:
             # TODO: Could also use a generated constant dofmap here like in block code
             # Unrolled loop to accumulate linear combination of dofs and tables
             values = [
@@ -11,6 +11,7 @@ import ufl
 from ffcx.codegeneration import expressions_template
 from ffcx.codegeneration.backend import FFCXBackend
 from ffcx.codegeneration.C.format_lines import format_indented_lines
+from ffcx.codegeneration.utils import shared_table_name
 from ffcx.ir.representation import ir_expression
 
 logger = logging.getLogger("ffcx")
@@ -38,6 +39,10 @@ def generator(ir, parameters):
     body = format_indented_lines(parts.cs_format(), 1)
     code["tabulate_expression"] = body
 
+    # Format static tables moved to file scope
+    tables = {name: format_indented_lines(decl.cs_format()) + "\n"
+              for name, decl in eg.shared_tables.items()}
+
     code["original_coefficient_positions"] = format_indented_lines(
         eg.generate_original_coefficient_positions().cs_format(), 1)
 
@@ -56,7 +61,7 @@ def generator(ir, parameters):
         points=code["points"],
         value_shape=code["value_shape"])
 
-    return declaration, implementation
+    return declaration, implementation, tables
 
 
 class ExpressionGenerator:
@@ -72,6 +77,7 @@ class ExpressionGenerator:
         self.finalization_blocks = collections.defaultdict(list)
         self.symbol_counters = collections.defaultdict(int)
         self.shared_symbols = {}
+        self.shared_tables = {}
         self.quadrature_rule = list(self.ir.integrand.keys())[0]
 
     def generate(self):
@@ -109,7 +115,7 @@ class ExpressionGenerator:
             table = tables[name]
             decl = L.ArrayDecl(
                 "static const ufc_scalar_t", name, table.shape, table, padlen=padlen)
-            parts += [decl]
+            parts += self.share_table(decl, "FE")
 
         # Add leading comment if there are any tables
         parts = L.commented_code_list(parts, [
@@ -118,6 +124,17 @@ class ExpressionGenerator:
         ])
         return parts
 
+    def share_table(self, decl, prefix):
+        """Move a static table declaration to file scope, named after a hash of its contents."""
+        if not self.ir.params["shared_tables"]:
+            return [decl]
+        L = self.backend.language
+        name = shared_table_name(prefix, decl, None)
+        self.backend.symbols.table_names[decl.symbol.name] = name
+        decl.symbol = L.Symbol(name)
+        self.shared_tables[name] = decl
+        return []
+
     def generate_quadrature_loop(self):
         """Generate quadrature loop for this quadrature rule.
 
@@ -238,14 +255,21 @@ class ExpressionGenerator:
                 continue
             break
 
+        # Loop over static arrays of the dofs instead if there would
+        # be too many statements
+        max_unroll = self.ir.params["max_unroll"]
+        indirect = expand_loop and 0 <= max_unroll < ufl.product(blockdims)
+        if indirect:
+            expand_loop = False
+
         if expand_loop:
             # If DOFs in dofrange are not equally spaced, then expand out the for loop
             for A_indices, B_indices in zip(product(*blockmap),
                                             product(*[range(len(b)) for b in blockmap])):
                 B_indices = tuple([iq] + list(B_indices))
-                A_indices = tuple([iq] + A_indices)
+                A_indices = tuple([iq] + list(A_indices))
                 for fi_ci in blockdata.factor_indices_comp_indices:
-                    f = self.get_var(F.nodes[fi_ci[0]]["expression"])
+                    f = self.get_var(F.expressions[fi_ci[0]])
                     arg_factors = self.get_arg_factors(blockdata, block_rank, B_indices)
                     Brhs = L.float_product([f] + arg_factors)
                     quadparts.append(L.AssignAdd(A[(A_indices[0], fi_ci[1]) + A_indices[1:]], Brhs))
@@ -265,7 +289,9 @@ class ExpressionGenerator:
             for bm, index in zip(blockmap, arg_indices):
                 # TODO: switch order here? (optionally)
                 offset = bm[0]
-                if len(bm) == 1:
+                if indirect:
+                    A_indices.append(self.get_dofmap_array(bm, preparts)[index])
+                elif len(bm) == 1:
                     A_indices.append(index + offset)
                 else:
                     block_size = bm[1] - bm[0]
@@ -278,7 +304,7 @@ class ExpressionGenerator:
             body = []
 
             for fi_ci in blockdata.factor_indices_comp_indices:
-                f = self.get_var(F.nodes[fi_ci[0]]["expression"])
+                f = self.get_var(F.expressions[fi_ci[0]])
                 Brhs = L.float_product([f] + arg_factors)
                 body.append(L.AssignAdd(A[(A_indices[0], fi_ci[1]) + A_indices[1:]], Brhs))
 
@@ -326,6 +352,17 @@ class ExpressionGenerator:
         self.symbol_counters[basename] += 1
         return L.Symbol(name)
 
+    def get_dofmap_array(self, dofmap, parts):
+        """Return a static array of the given dofs, declaring it in parts if not defined before."""
+        L = self.backend.language
+        key = ("dofs", ) + tuple(dofmap)
+        s = self.shared_symbols.get(key)
+        if s is None:
+            s = self.new_temp_symbol("dofs")
+            self.shared_symbols[key] = s
+            parts.append(L.ArrayDecl("static const int", s, len(dofmap), values=[int(i) for i in dofmap]))
+        return s
+
     def get_var(self, v):
         if v._ufl_is_literal_:
             return self.backend.ufl_to_language.get(v)
@@ -341,18 +378,16 @@ class ExpressionGenerator:
 
         use_symbol_array = True
 
-        for i, attr in F.nodes.items():
-            if attr['status'] != mode:
-                continue
-            v = attr['expression']
-            mt = attr.get('mt')
+        for i in F.nodes_with_status(mode):
+            v = F.expressions[i]
+            mt = F.mts[i]
 
             if v._ufl_is_literal_:
                 vaccess = self.backend.ufl_to_language.get(v)
             elif mt is not None:
                 # All finite element based terminals have table data, as well
                 # as some, but not all, of the symbolic geometric terminals
-                tabledata = attr.get('tr')
+                tabledata = F.trs[i]
 
                 # Backend specific modified terminal translation
                 vaccess = self.backend.access.get(mt.terminal, mt, tabledata, 0)
@@ -366,9 +401,10 @@ class ExpressionGenerator:
                 vops = [self.get_var(op) for op in v.ufl_operands]
 
                 # get parent operand
-                pid = F.in_edges[i][0] if F.in_edges[i] else -1
+                parents = F.in_edges[i]
+                pid = parents[0] if len(parents) else -1
                 if pid and pid > i:
-                    parent_exp = F.nodes.get(pid)['expression']
+                    parent_exp = F.expressions[pid]
                 else:
                     parent_exp = None
 
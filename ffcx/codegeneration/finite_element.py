@@ -79,7 +79,7 @@ def apply_dof_transformation(L, ir, parameters, inverse=False, transpose=False,
     apply_transformations = apply_transformations_to_data(
         L, ir.base_transformations, ir.cell_shape, data, inverse=inverse, transpose=transpose,
         indices=lambda dof: dof * block_size + block, ranges=[(block, 0, block_size)],
-        dtype=dtype)
+        dtype=dtype, max_unroll=parameters["max_unroll"])
     return apply_transformations + [L.Return(0)]
 
 
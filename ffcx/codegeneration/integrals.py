@@ -8,15 +8,24 @@ import collections
 import itertools
 import logging
 
+import numpy
+
 import ufl
 from ffcx.codegeneration import integrals_template as ufc_integrals
 from ffcx.codegeneration.backend import FFCXBackend
 from ffcx.codegeneration.C.format_lines import format_indented_lines
-from ffcx.codegeneration.utils import apply_transformations_to_data
+from ffcx.codegeneration.optimization import optimize
+from ffcx.codegeneration.simd import vectorize_cells, vectorize_ensemble
+from ffcx.codegeneration.utils import (apply_transformations_to_data,
+                                       shared_table_name)
 from ffcx.ir.elementtables import piecewise_ttypes
 
 logger = logging.getLogger("ffcx")
 
+# Number of rows and columns of the register tiles of premultiplied
+# blocks
+gemm_tile_shape = (4, 4)
+
 
 def generator(ir, parameters):
     logger.info("Generating code for integral:")
@@ -45,6 +54,21 @@ def generator(ir, parameters):
     # Format code as string
     body = format_indented_lines(parts.cs_format(ir.precision), 1)
 
+    # Generate the action and diagonal kernels of bilinear forms, the
+    # diagonal only of square element tensors
+    kernel_generators = {}
+    for kernel in ("action", "diagonal"):
+        if parameters[f"tabulate_{kernel}"] and len(ir.tensor_shape) == 2 and integral_type != "custom" \
+                and (kernel != "diagonal" or ir.tensor_shape[0] == ir.tensor_shape[1]):
+            kernel_ir = ir._replace(tensor_shape=ir.tensor_shape[:1])
+            kernel_generators[kernel] = IntegralGenerator(kernel_ir, FFCXBackend(kernel_ir, parameters), kernel=kernel)
+    kernel_parts = {kernel: g.generate() for kernel, g in kernel_generators.items()}
+
+    # Format static tables moved to file scope
+    tables = {name: format_indented_lines(decl.cs_format(ir.precision)) + "\n"
+              for generator in [ig] + list(kernel_generators.values())
+              for name, decl in generator.shared_tables.items()}
+
     # Generate generic ffcx code snippets and add specific parts
     code = {}
     code["class_type"] = ir.integral_type + "_integral"
@@ -88,15 +112,158 @@ def generator(ir, parameters):
             factory_name=factory_name,
             enabled_coefficients=code["enabled_coefficients"],
             tabulate_tensor=tabulate_tensor_fn,
+            tabulate_tensor_batch=generate_tabulate_tensor_batch(ir, backend.language, parts),
+            tabulate_action=generate_tabulate_kernel(ir, parameters, "action", kernel_parts.get("action")),
+            tabulate_action_name=f"tabulate_action_{factory_name}" if "action" in kernel_parts else "NULL",
+            tabulate_diagonal=generate_tabulate_kernel(ir, parameters, "diagonal", kernel_parts.get("diagonal")),
+            tabulate_diagonal_name=f"tabulate_diagonal_{factory_name}" if "diagonal" in kernel_parts else "NULL",
+            tabulate_fused=generate_tabulate_fused_declaration(ir),
+            tabulate_fused_name=f"tabulate_fused_{ir.fused_name}" if ir.fused_name else "NULL",
+            tabulate_ensemble=generate_tabulate_ensemble(ir, backend.language, parts),
+            tabulate_ensemble_name=f"tabulate_ensemble_{factory_name}" if ir.params["ensemble_size"] else "NULL",
+            ensemble_size=ir.params["ensemble_size"],
             needs_transformation_data=ir.needs_transformation_data)
-    return declaration, implementation
+    return declaration, implementation, tables
+
+
+def fused_generator(ir, parameters):
+    """Generate code for the fused kernel of the integrals of several forms over the same domain."""
+    logger.info("Generating code for fused integral:")
+    logger.info(f"--- type: {ir.integral_type}")
+    logger.info(f"--- name: {ir.name}")
+    logger.info(f"--- forms: {[form_index for form_index, member_ir in ir.integrals]}")
+
+    # Create FFCX C backend for each member, accessing the arguments
+    # of its form
+    members = [(form_index, member_ir, FFCXBackend(member_ir, parameters, form_index=form_index))
+               for form_index, member_ir in ir.integrals]
+
+    # Configure kernel generator and generate code ast for the body
+    fg = FusedIntegralGenerator(members)
+    parts = fg.generate()
+
+    # Format code as string
+    precision = fg.ir.precision
+    body = format_indented_lines(parts.cs_format(precision), 1)
+    if parameters["tabulate_tensor_void"]:
+        body = ""
+
+    # Format static tables moved to file scope
+    tables = {name: format_indented_lines(decl.cs_format(precision)) + "\n"
+              for name, decl in fg.shared_tables.items()}
+
+    implementation = ufc_integrals.tabulate_fused.format(
+        factory_name=ir.name, entity_local_index=ufc_integrals.entity_local_index[ir.integral_type], body=body)
+    return "", implementation, tables
+
+
+def generate_tabulate_kernel(ir, parameters, kernel, parts):
+    """Generate the action or diagonal kernel of an integral of a bilinear form from its body, or nothing if None."""
+    if parts is None:
+        return ""
+    body = format_indented_lines(parts.cs_format(ir.precision), 1)
+    if parameters["tabulate_tensor_void"]:
+        body = ""
+    return getattr(ufc_integrals, f"tabulate_{kernel}").format(
+        factory_name=ir.name, entity_local_index=ufc_integrals.entity_local_index[ir.integral_type],
+        body=body)
+
+
+def generate_tabulate_fused_declaration(ir):
+    """Declare the fused kernel of an integral, defined with the fused integrals, or nothing if not fused."""
+    if ir.fused_name is None:
+        return ""
+    return ufc_integrals.tabulate_fused_declaration.format(factory_name=ir.fused_name)
+
+
+def generate_tabulate_tensor_batch(ir, L, parts):
+    """Generate function calling tabulate_tensor for each entity of a batch with strided arguments.
+
+    With the simd_width parameter set, cells are evaluated in chunks of
+    this many cells at once by a vectorized copy of the kernel body.
+    """
+    # Number of values of each argument per integration entity
+    entities_per_integral = 2 if ir.integral_type == "interior_facet" else 1
+    strides = {"A": numpy.product(ir.tensor_shape, dtype=int),
+               "w": ir.coefficients_size,
+               "coordinate_dofs": ir.coordinate_dofs_size,
+               "entity_local_index": 0 if ir.integral_type == "cell" else entities_per_integral,
+               "quadrature_permutation": entities_per_integral if "facet" in ir.integral_type else 0}
+
+    args = {}
+    for name, stride in strides.items():
+        if stride == 0:
+            args[name] = name
+        elif name in ("entity_local_index", "quadrature_permutation"):
+            # These may be null pointers
+            args[name] = f"{name} ? {name} + cell * {stride} : NULL"
+        else:
+            args[name] = f"{name} + cell * {stride}"
+
+    width = ir.params["simd_width"]
+    if width <= 1 or ir.integral_type != "cell" or ir.needs_transformation_data \
+            or ir.params["tabulate_tensor_void"]:
+        return ufc_integrals.tabulate_tensor_batch.format(factory_name=ir.name, **args)
+
+    # Vectorize across cells
+    try:
+        simd_parts = vectorize_cells(L, parts, width)
+    except NotImplementedError as e:
+        logger.info(f"Cannot vectorize integral {ir.name} across cells: {e}")
+        return ufc_integrals.tabulate_tensor_batch.format(factory_name=ir.name, **args)
+
+    body = format_indented_lines(simd_parts.cs_format(ir.precision), 1)
+    code = ufc_integrals.tabulate_tensor_simd.format(factory_name=ir.name, tabulate_tensor=body)
+    sizes = {f"{name}_size": width * max(strides[name], 1) for name in ("A", "w", "coordinate_dofs")}
+    code += ufc_integrals.tabulate_tensor_batch_simd.format(
+        factory_name=ir.name, width=width, A_stride=strides["A"], w_stride=strides["w"],
+        coordinate_dofs_stride=strides["coordinate_dofs"], **sizes, **args)
+    return code
+
+
+def generate_tabulate_ensemble(ir, L, parts):
+    """Generate function computing the element tensors for an ensemble of coefficients and constants, or nothing.
+
+    The kernel body is vectorized over the members of the ensemble,
+    with the geometry computed once for all members. If this is not
+    possible, tabulate_tensor is called for each member instead.
+    """
+    size = ir.params["ensemble_size"]
+    if size <= 0:
+        return ""
+
+    strides = {"A": numpy.product(ir.tensor_shape, dtype=int),
+               "w": ir.coefficients_size,
+               "c": ir.constants_size}
+    args = {f"{name}_stride": stride for name, stride in strides.items()}
+    if ir.params["tabulate_tensor_void"]:
+        return ufc_integrals.tabulate_ensemble_loop.format(factory_name=ir.name, size=size, **args)
+
+    try:
+        ensemble_parts = vectorize_ensemble(L, parts, size)
+    except NotImplementedError as e:
+        logger.info(f"Cannot vectorize integral {ir.name} across ensemble: {e}")
+        return ufc_integrals.tabulate_ensemble_loop.format(factory_name=ir.name, size=size, **args)
+
+    body = format_indented_lines(ensemble_parts.cs_format(ir.precision), 1)
+    code = ufc_integrals.tabulate_ensemble_simd.format(
+        factory_name=ir.name, entity_local_index=ufc_integrals.entity_local_index[ir.integral_type], body=body)
+    sizes = {f"{name}_size": size * max(stride, 1) for name, stride in strides.items()}
+    code += ufc_integrals.tabulate_ensemble.format(factory_name=ir.name, size=size, **args, **sizes)
+    return code
 
 
 class IntegralGenerator(object):
-    def __init__(self, ir, backend):
+    def __init__(self, ir, backend, kernel="tensor"):
         # Store ir
         self.ir = ir
 
+        # Kernel to generate for the integral: "tensor" for the element
+        # tensor, "action" for the action of the element tensor of a
+        # bilinear form on the trial function dofs, or "diagonal" for
+        # its diagonal
+        self.kernel = kernel
+
         # Backend specific plugin with attributes
         # - language: for translating ufl operators to target language
         # - symbols: for translating ufl operators to target language
@@ -114,6 +281,9 @@ class IntegralGenerator(object):
         # Cache
         self.shared_symbols = {}
 
+        # Static tables moved to file scope, by name
+        self.shared_tables = {}
+
         # Set of counters used for assigning names to intermediate variables
         self.symbol_counters = collections.defaultdict(int)
 
@@ -169,6 +339,18 @@ class IntegralGenerator(object):
             self.shared_symbols[key] = s
         return s, defined
 
+    def get_dofmap_array(self, dofmap, parts):
+        """Return a static array of the given dofs, declaring it in parts if not defined before."""
+        return self.get_index_array("dofs", dofmap, parts)
+
+    def get_index_array(self, basename, values, parts):
+        """Return a static array of the given integers, declaring it in parts if not defined before."""
+        L = self.backend.language
+        s, defined = self.get_temp_symbol(basename, tuple(values))
+        if not defined:
+            parts.append(L.ArrayDecl("static const int", s, len(values), values=[int(i) for i in values]))
+        return s
+
     def generate(self):
         """Generate entire tabulate_tensor body.
 
@@ -217,7 +399,15 @@ class IntegralGenerator(object):
         parts += all_preparts
         parts += all_quadparts
 
-        return L.StatementList(parts)
+        return self.optimize(L.StatementList(parts))
+
+    def optimize(self, code):
+        """Simplify the generated code if requested by the parameters."""
+        if not self.ir.params["cnodes_optimization"]:
+            return code
+        L = self.backend.language
+        scalar_type = self.backend.ufl_to_language.scalar_type
+        return optimize(L, code, scalar_type, fma=self.ir.params["fma_contraction"])
 
     def generate_quadrature_tables(self):
         """Generate static tables of quadrature points and weights."""
@@ -239,11 +429,10 @@ class IntegralGenerator(object):
             num_points = quadrature_rule.weights.shape[0]
             # Generate quadrature weights array
             wsym = self.backend.symbols.weights_table(quadrature_rule)
-            parts += [
+            parts += self.share_table(
                 L.ArrayDecl(
                     "static const double", wsym, num_points,
-                    quadrature_rule.weights, padlen=padlen)
-            ]
+                    quadrature_rule.weights, padlen=padlen), "weights")
 
         # Add leading comment if there are any tables
         parts = L.commented_code_list(parts, "Quadrature rules")
@@ -274,6 +463,7 @@ class IntegralGenerator(object):
         parts = L.commented_code_list(parts, [
             "Precomputed values of basis functions and precomputations",
             "FE* dimensions: [permutation][entities][points][dofs]",
+            "PI* dimensions: [entities][dofs][dofs] or [entities][entities][dofs][dofs]",
         ])
         return parts
 
@@ -287,8 +477,12 @@ class IntegralGenerator(object):
         L = self.backend.language
 
         if not self.ir.table_needs_transformation_data[name]:
-            return [L.ArrayDecl(
-                "static const double", name, table.shape, table, padlen=padlen)]
+            prefix = "PI" if self.ir.unique_table_types[name] == "preintegrated" else "FE"
+            threshold = self.ir.params["table_blob_threshold"]
+            if threshold >= 0 and table.size >= threshold:
+                return self.share_table(L.ArrayBlobDecl(name, table.shape, table, padlen=padlen), prefix)
+            return self.share_table(L.ArrayDecl(
+                "static const double", name, table.shape, table, padlen=padlen), prefix)
 
         out = [L.ArrayDecl(
             "double", name, table.shape, table, padlen=padlen)]
@@ -297,11 +491,28 @@ class IntegralGenerator(object):
         ranges = tuple((dummy_vars[i], 0, j) for i, j in enumerate(table.shape[:-1]) if j != 1)
         apply_transformations = apply_transformations_to_data(
             L, self.ir.table_dof_base_transformations[name], self.ir.cell_shape, L.Symbol(name),
-            indices=lambda dof: dummy_vars + (dof, ), ranges=ranges)
+            indices=lambda dof: dummy_vars + (dof, ), ranges=ranges, max_unroll=self.ir.params["max_unroll"])
         if len(apply_transformations) > 0:
             out += ["{"] + apply_transformations + ["}"]
         return out
 
+    def share_table(self, decl, prefix):
+        """Move a static table declaration to file scope.
+
+        The table is renamed after a hash of its contents, so that
+        identical tables in different kernels are only defined once.
+        Returns the declarations to keep in the kernel body.
+
+        """
+        if not self.ir.params["shared_tables"]:
+            return [decl]
+        L = self.backend.language
+        name = shared_table_name(prefix, decl, self.ir.precision)
+        self.backend.symbols.table_names[decl.symbol.name] = name
+        decl.symbol = L.Symbol(name)
+        self.shared_tables[name] = decl
+        return []
+
     def generate_quadrature_loop(self, quadrature_rule):
         """Generate quadrature loop with for this num_points."""
         L = self.backend.language
@@ -313,7 +524,7 @@ class IntegralGenerator(object):
 
         # Generate dofblock parts, some of this will be placed before or
         # after quadloop
-        preparts, quadparts = \
+        preparts, quadparts, postparts = \
             self.generate_dofblock_partition(quadrature_rule)
         body += quadparts
 
@@ -325,7 +536,7 @@ class IntegralGenerator(object):
         else:
             num_points = quadrature_rule.points.shape[0]
             iq = self.backend.symbols.quadrature_loop_index()
-            quadparts = [L.ForRange(iq, 0, num_points, body=body)]
+            quadparts = [L.ForRange(iq, 0, num_points, body=body)] + postparts
 
         return preparts, quadparts
 
@@ -335,7 +546,7 @@ class IntegralGenerator(object):
         # Get annotated graph of factorisation
         F = self.ir.integrand[quadrature_rule]["factorization"]
 
-        arraysymbol = L.Symbol(f"sp_{quadrature_rule.id()}")
+        arraysymbol = self.intermediates_symbol("sp", quadrature_rule)
         parts = self.generate_partition(arraysymbol, F, "piecewise", None)
         parts = L.commented_code_list(
             parts, f"Quadrature loop independent computations for quadrature rule {quadrature_rule.id()}")
@@ -347,12 +558,17 @@ class IntegralGenerator(object):
         # Get annotated graph of factorisation
         F = self.ir.integrand[quadrature_rule]["factorization"]
 
-        arraysymbol = L.Symbol(f"sv_{quadrature_rule.id()}")
+        arraysymbol = self.intermediates_symbol("sv", quadrature_rule)
         parts = self.generate_partition(arraysymbol, F, "varying", quadrature_rule)
         parts = L.commented_code_list(
             parts, f"Varying computations for quadrature rule {quadrature_rule.id()}")
         return parts
 
+    def intermediates_symbol(self, basename, quadrature_rule):
+        """Symbol for the array of intermediate values of a partition."""
+        L = self.backend.language
+        return L.Symbol(f"{basename}_{quadrature_rule.id()}")
+
     def generate_partition(self, symbol, F, mode, quadrature_rule):
         L = self.backend.language
 
@@ -361,11 +577,9 @@ class IntegralGenerator(object):
 
         use_symbol_array = True
 
-        for i, attr in F.nodes.items():
-            if attr['status'] != mode:
-                continue
-            v = attr['expression']
-            mt = attr.get('mt')
+        for i in F.nodes_with_status(mode):
+            v = F.expressions[i]
+            mt = F.mts[i]
 
             # Generate code only if the expression is not already in
             # cache
@@ -376,7 +590,7 @@ class IntegralGenerator(object):
                     # All finite element based terminals have table
                     # data, as well as some, but not all, of the
                     # symbolic geometric terminals
-                    tabledata = attr.get('tr')
+                    tabledata = F.trs[i]
 
                     # Backend specific modified terminal translation
                     vaccess = self.backend.access.get(mt.terminal, mt, tabledata, quadrature_rule)
@@ -390,9 +604,10 @@ class IntegralGenerator(object):
                     vops = [self.get_var(quadrature_rule, op) for op in v.ufl_operands]
 
                     # get parent operand
-                    pid = F.in_edges[i][0] if F.in_edges[i] else -1
+                    parents = F.in_edges[i]
+                    pid = parents[0] if len(parents) else -1
                     if pid and pid > i:
-                        parent_exp = F.nodes.get(pid)['expression']
+                        parent_exp = F.expressions[pid]
                     else:
                         parent_exp = None
 
@@ -447,14 +662,18 @@ class IntegralGenerator(object):
         block_contributions = self.ir.integrand[quadrature_rule]["block_contributions"]
         preparts = []
         quadparts = []
+        postparts = []
         blocks = [(blockmap, blockdata)
                   for blockmap, contributions in sorted(block_contributions.items())
                   for blockdata in contributions]
 
+        if self.kernel == "action":
+            return self.generate_action_partition(quadrature_rule, blocks)
+
         for blockmap, blockdata in blocks:
 
             # Define code for block depending on mode
-            block_preparts, block_quadparts = \
+            block_preparts, block_quadparts, block_postparts = \
                 self.generate_block_parts(quadrature_rule, blockmap, blockdata)
 
             # Add definitions
@@ -463,7 +682,179 @@ class IntegralGenerator(object):
             # Add computations
             quadparts.extend(block_quadparts)
 
-        return preparts, quadparts
+            # Add computations after the quadrature loop
+            postparts.extend(block_postparts)
+
+        return preparts, quadparts, postparts
+
+    def generate_action_partition(self, quadrature_rule, blocks):
+        """Generate code for the action of the blocks of a bilinear form on the trial function dofs.
+
+        At each quadrature point, the trial functions of the blocks are
+        interpolated from the dofs, and the sum of the factors times the
+        interpolated values is integrated against each test function.
+        Returns parts occuring before, inside, and after the quadrature
+        loop.
+        """
+        L = self.backend.language
+
+        preparts = []
+        quadparts = []
+        postparts = []
+
+        iq = self.backend.symbols.quadrature_loop_index()
+        i = self.backend.symbols.argument_loop_index(0)
+        A = L.FlattenedArray(self.backend.symbols.element_tensor(), dims=self.ir.tensor_shape)
+
+        # Values to integrate against the test functions, by test
+        # function table and dofs
+        integrands = {}
+        for blockmap, blockdata in blocks:
+            if blockdata.name is not None:
+                self.generate_preintegrated_action(quadrature_rule, blockmap, blockdata, preparts)
+                continue
+
+            fw = self.get_weighted_block_factor(quadrature_rule, blockdata, quadparts)
+            if blockdata.tensor_factors is not None:
+                postparts += self.generate_sum_factorized_action(quadrature_rule, blockmap, blockdata, fw,
+                                                                 preparts, quadparts)
+                continue
+
+            # The transpose of a symmetric pair was dropped from the
+            # blocks, but contributes to different entries of the action
+            contributions = [(blockmap, blockdata)]
+            if blockdata.symmetric == "pair":
+                contributions.append((blockmap[::-1], blockdata._replace(
+                    ttypes=blockdata.ttypes[::-1], unames=blockdata.unames[::-1],
+                    restrictions=blockdata.restrictions[::-1], ma_data=blockdata.ma_data[::-1])))
+
+            for bm, bd in contributions:
+                u = self.get_trial_values(quadrature_rule, bm, bd, preparts, quadparts)
+                key = (bm[0], bd.unames[0], self.get_argument_restriction(quadrature_rule, bd, 0))
+                integrands.setdefault(key, (bm, bd, []))[2].append(L.float_product([fw, u]))
+
+        for bm, bd, values in integrands.values():
+            value = values[0]
+            for v in values[1:]:
+                value = value + v
+            test, = self.get_arg_factors(bd, 1, quadrature_rule, iq, (i, ))
+            quadparts.append(L.ForRange(i, 0, len(bm[0]), body=L.AssignAdd(
+                A[self.get_block_dof(bm[0], i, preparts)], L.float_product([test, value]))))
+
+        return preparts, quadparts, postparts
+
+    def get_argument_restriction(self, quadrature_rule, blockdata, k):
+        """Return the restriction of argument k of a block."""
+        scope = self.ir.integrand[quadrature_rule]["modified_arguments"]
+        return scope[blockdata.ma_data[k].ma_index].restriction
+
+    def get_trial_values(self, quadrature_rule, blockmap, blockdata, preparts, quadparts):
+        """Return the value of the trial function of a block at the quadrature point.
+
+        The value is interpolated from the trial function dofs in
+        quadparts if not defined before.
+        """
+        L = self.backend.language
+
+        key = (quadrature_rule, blockmap[1], blockdata.unames[1], self.get_argument_restriction(
+            quadrature_rule, blockdata, 1))
+        u, defined = self.get_temp_symbol("u", key)
+        if not defined:
+            iq = self.backend.symbols.quadrature_loop_index()
+            j = self.backend.symbols.argument_loop_index(1)
+            x = self.backend.symbols.trial_dofs()
+            trial = self.get_arg_factors(blockdata, 2, quadrature_rule, iq, (j, j))[1]
+            quadparts += [L.VariableDecl("ufc_scalar_t", u, 0.0),
+                          L.ForRange(j, 0, len(blockmap[1]), body=L.AssignAdd(
+                              u, L.float_product([trial, x[self.get_block_dof(blockmap[1], j, preparts)]])))]
+        return u
+
+    def generate_preintegrated_action(self, quadrature_rule, blockmap, blockdata, parts):
+        """Generate code for the action of a preintegrated block, added to parts."""
+        L = self.backend.language
+
+        i, j = (self.backend.symbols.argument_loop_index(k) for k in range(2))
+        x = self.backend.symbols.trial_dofs()
+        A = L.FlattenedArray(self.backend.symbols.element_tensor(), dims=self.ir.tensor_shape)
+
+        f = self.get_block_factor(quadrature_rule, blockdata)
+        PI = self.backend.symbols.named_table(blockdata.name)
+        value = L.float_product([f, PI[self.get_entities(blockdata) + (i, j)],
+                                 x[self.get_block_dof(blockmap[1], j, parts)]])
+        parts.append(L.ForRange(i, 0, len(blockmap[0]), body=L.ForRange(
+            j, 0, len(blockmap[1]), body=L.AssignAdd(A[self.get_block_dof(blockmap[0], i, parts)], value))))
+
+    def generate_sum_factorized_action(self, quadrature_rule, blockmap, blockdata, fw, preparts, quadparts):
+        """Generate code for the action of a sum factorized block.
+
+        The trial function is interpolated at the points of the
+        quadrature grid before the quadrature loop, contracting its
+        dofs with the 1D tables one direction at a time. The factor
+        times the interpolated values is then integrated against the
+        test functions like a linear form. Returns the parts to place
+        after the quadrature loop.
+        """
+        L = self.backend.language
+
+        grid = self.ir.integrand[quadrature_rule]["quadrature_grid"]
+        trial = blockdata.tensor_factors[1]
+        tdim = len(grid.shape)
+        num_points = len(grid.indices)
+
+        U, defined = self.get_temp_symbol("sf_u", (quadrature_rule, blockmap[1], blockdata.unames[1]))
+        if not defined:
+            row, = self.get_sum_factorization_rows(blockmap[1:], blockdata._replace(
+                ma_data=blockdata.ma_data[1:], tensor_factors=blockdata.tensor_factors[1:]), preparts)
+            x = self.backend.symbols.trial_dofs()
+            dims = [trial.tables[d].shape[1] for d in range(tdim)]
+            tables = [self.get_tensor_factor_table(trial.tables[d], preparts) for d in range(tdim)]
+            scales = []
+            if not numpy.allclose(trial.scales, 1.0):
+                s, scales_defined = self.get_temp_symbol("sf_scales", (trial.scales.tobytes(), ))
+                if not scales_defined:
+                    preparts.append(L.ArrayDecl("static const double", s, len(trial.scales), values=trial.scales))
+                scales = [s]
+
+            def flat(indices, sizes):
+                index = 0
+                for i, n in zip(indices, sizes):
+                    index = index * n + i
+                return index
+
+            # Gather the dofs in lexicographic order of the 1D functions
+            j = self.backend.symbols.argument_loop_index(1)
+            source = self.new_temp_symbol("sf")
+            preparts += [L.ArrayDecl("ufc_scalar_t", source, len(trial.columns)),
+                         L.ForRange(j, 0, len(trial.columns), body=L.Assign(
+                             source[j], L.float_product([s[j] for s in scales] + [x[row(j)]])))]
+
+            # Contract one direction at a time, T[q_0, ..., q_d, a_{d+1}, ...]
+            qindices = [L.Symbol(f"iq{d}") for d in range(tdim)]
+            aindices = [L.Symbol(f"{j.name}{d}") for d in range(tdim)]
+            acc = L.Symbol("sf_acc")
+            for d in range(tdim):
+                target = U if d == tdim - 1 else self.new_temp_symbol("sf")
+                sizes = list(grid.shape[:d + 1]) + dims[d + 1:]
+                target_indices = qindices[:d + 1] + aindices[d + 1:]
+                source_index = flat(qindices[:d] + aindices[d:], list(grid.shape[:d]) + dims[d:])
+                preparts += [
+                    L.ArrayDecl("ufc_scalar_t", target, ufl.product(sizes)),
+                    L.ForRanges(*[(index, 0, n) for index, n in zip(target_indices, sizes)], body=[
+                        L.VariableDecl("ufc_scalar_t", acc, 0.0),
+                        L.ForRange(aindices[d], 0, dims[d], body=L.AssignAdd(
+                            acc, tables[d][qindices[d], aindices[d]] * source[source_index])),
+                        L.Assign(target[flat(target_indices, sizes)], acc)])]
+                source = target
+
+        # Integrate against the test functions
+        iq = self.backend.symbols.quadrature_loop_index()
+        if grid.indices == tuple(range(num_points)):
+            u = U[iq]
+        else:
+            u = U[self.get_index_array("qmap", grid.indices, preparts)[iq]]
+        test = blockdata._replace(tensor_factors=blockdata.tensor_factors[:1], ma_data=blockdata.ma_data[:1])
+        return self.generate_sum_factorized_block(quadrature_rule, blockmap[:1], test, L.float_product([fw, u]),
+                                                  preparts, quadparts)
 
     def get_entities(self, blockdata):
         L = self.backend.language
@@ -530,37 +921,8 @@ class IntegralGenerator(object):
             arg_factors.append(arg_factor)
         return arg_factors
 
-    def generate_block_parts(self, quadrature_rule, blockmap, blockdata):
-        """Generate and return code parts for a given block.
-
-        Returns parts occuring before, inside, and after
-        the quadrature loop identified by num_points.
-
-        Should be called with num_points=None for quadloop-independent blocks.
-        """
-        L = self.backend.language
-
-        # The parts to return
-        preparts = []
-        quadparts = []
-
-        block_rank = len(blockmap)
-        blockdims = tuple(len(dofmap) for dofmap in blockmap)
-
-        ttypes = blockdata.ttypes
-        if "zeros" in ttypes:
-            raise RuntimeError("Not expecting zero arguments to be left in dofblock generation.")
-
-        iq = self.backend.symbols.quadrature_loop_index()
-
-        # Override dof index with quadrature loop index for arguments
-        # with quadrature element, to index B like B[iq*num_dofs + iq]
-        arg_indices = tuple(self.backend.symbols.argument_loop_index(i) for i in range(block_rank))
-        B_indices = []
-        for i in range(block_rank):
-            B_indices.append(arg_indices[i])
-        B_indices = list(B_indices)
-
+    def get_block_factor(self, quadrature_rule, blockdata):
+        """Return the factor multiplying the arguments of a block."""
         # Get factor expression
         F = self.ir.integrand[quadrature_rule]["factorization"]
 
@@ -570,8 +932,15 @@ class IntegralGenerator(object):
         # We have scalar integrand here, take just the factor index
         factor_index = blockdata.factor_indices_comp_indices[0][0]
 
-        v = F.nodes[factor_index]['expression']
-        f = self.get_var(quadrature_rule, v)
+        v = F.expressions[factor_index]
+        return self.get_var(quadrature_rule, v)
+
+    def get_weighted_block_factor(self, quadrature_rule, blockdata, quadparts):
+        """Return the factor of a block times the quadrature weight, defining it in quadparts if not before."""
+        L = self.backend.language
+
+        iq = self.backend.symbols.quadrature_loop_index()
+        f = self.get_block_factor(quadrature_rule, blockdata)
 
         # Quadrature weight was removed in representation, add it back now
         if self.ir.integral_type in ufl.custom_integral_types:
@@ -589,13 +958,159 @@ class IntegralGenerator(object):
             fw = fw_rhs
         else:
             # Define and cache scalar temp variable
+            factor_index = blockdata.factor_indices_comp_indices[0][0]
             key = (quadrature_rule, factor_index, blockdata.all_factors_piecewise)
             fw, defined = self.get_temp_symbol("fw", key)
             if not defined:
                 quadparts.append(L.VariableDecl("const ufc_scalar_t", fw, fw_rhs))
+        return fw
+
+    def generate_block_parts(self, quadrature_rule, blockmap, blockdata):
+        """Generate and return code parts for a given block.
+
+        Returns parts occuring before, inside, and after
+        the quadrature loop identified by num_points.
+
+        Should be called with num_points=None for quadloop-independent blocks.
+        """
+        # The parts to return
+        preparts = []
+        quadparts = []
+
+        block_rank = len(blockmap)
+        blockdims = tuple(len(dofmap) for dofmap in blockmap)
+
+        ttypes = blockdata.ttypes
+        if "zeros" in ttypes:
+            raise RuntimeError("Not expecting zero arguments to be left in dofblock generation.")
+
+        iq = self.backend.symbols.quadrature_loop_index()
+
+        if self.kernel == "diagonal":
+            return self.generate_diagonal_block_parts(quadrature_rule, blockmap, blockdata)
+
+        if blockdata.name is not None:
+            # Scale the preintegrated block by the piecewise factor
+            # before the quadrature loop
+            f = self.get_block_factor(quadrature_rule, blockdata)
+            PI = self.backend.symbols.named_table(blockdata.name)
+            entities = self.get_entities(blockdata)
+            self.accumulate_block(blockmap, blockdata, lambda B_indices: [f, PI[entities + tuple(B_indices)]],
+                                  preparts, preparts)
+            return preparts, quadparts, []
+
+        fw = self.get_weighted_block_factor(quadrature_rule, blockdata, quadparts)
+
+        if blockdata.tensor_factors is not None:
+            postparts = self.generate_sum_factorized_block(quadrature_rule, blockmap, blockdata, fw,
+                                                           preparts, quadparts)
+            return preparts, quadparts, postparts
+
+        # Sum only the varying arguments over the quadrature points if
+        # some arguments are piecewise
+        if self.ir.params["hoist_piecewise_arguments"] and block_rank > 0 \
+                and any(tt in piecewise_ttypes for tt in ttypes) and "quadrature" not in ttypes \
+                and self.ir.integral_type not in ufl.custom_integral_types:
+            postparts = self.generate_hoisted_block(quadrature_rule, blockmap, blockdata, fw, preparts, quadparts)
+            return preparts, quadparts, postparts
+
+        if blockdata.symmetric is not None:
+            postparts = self.generate_symmetric_block(quadrature_rule, blockmap, blockdata, fw, preparts, quadparts)
+            return preparts, quadparts, postparts
+
+        # Compute large blocks of bilinear forms as a matrix-matrix
+        # product after the quadrature loop
+        min_size = self.ir.params["gemm_min_block_size"]
+        if 0 <= min_size <= ufl.product(blockdims) and block_rank == 2 \
+                and all(tt in ("varying", "uniform") for tt in ttypes) \
+                and self.ir.integral_type not in ufl.custom_integral_types:
+            postparts = self.generate_premultiplied_block(quadrature_rule, blockmap, blockdata, fw,
+                                                          preparts, quadparts)
+            return preparts, quadparts, postparts
 
         # Naively accumulate integrand for this block in the innermost
         # loop
+        self.accumulate_block(
+            blockmap, blockdata,
+            lambda B_indices: [fw] + self.get_arg_factors(blockdata, block_rank, quadrature_rule, iq, B_indices),
+            preparts, quadparts)
+
+        return preparts, quadparts, []
+
+    def generate_diagonal_block_parts(self, quadrature_rule, blockmap, blockdata):
+        """Generate and return code parts for the diagonal of a block of a bilinear form.
+
+        Only the entries of the block with the same test and trial dof
+        are computed. Returns parts occuring before, inside, and after
+        the quadrature loop.
+        """
+        L = self.backend.language
+
+        preparts = []
+        quadparts = []
+
+        # Pairs of test and trial function indices of the block with
+        # the same dof
+        pairs = [(i, blockmap[1].index(dof)) for i, dof in enumerate(blockmap[0]) if dof in blockmap[1]]
+        if not pairs:
+            return preparts, quadparts, []
+        dofmap = [blockmap[0][i] for i, j in pairs]
+
+        # The transpose of a symmetric pair contributes the same diagonal
+        weight = [2.0] if blockdata.symmetric == "pair" else []
+
+        k = self.backend.symbols.argument_loop_index(0)
+        if [i for i, j in pairs] == [j for i, j in pairs] == list(range(len(pairs))):
+            indices = (k, k)
+        else:
+            indices = tuple(self.get_index_array(name, [p[n] for p in pairs], preparts)[k]
+                            for n, name in enumerate(("diag_test", "diag_trial")))
+
+        if blockdata.name is not None:
+            # Scale the diagonal of the preintegrated block by the
+            # piecewise factor before the quadrature loop
+            f = self.get_block_factor(quadrature_rule, blockdata)
+            PI = self.backend.symbols.named_table(blockdata.name)
+            factors = weight + [f, PI[self.get_entities(blockdata) + indices]]
+            parts = preparts
+        else:
+            fw = self.get_weighted_block_factor(quadrature_rule, blockdata, quadparts)
+
+            if blockdata.tensor_factors is not None:
+                # Sum factorize the diagonal with the products of the 1D
+                # tables of the arguments, which have the same dof for
+                # the same product of 1D functions
+                test, trial = blockdata.tensor_factors
+                diagonal = test._replace(tables=tuple(a * b for a, b in zip(test.tables, trial.tables)),
+                                         scales=test.scales * trial.scales)
+                postparts = self.generate_sum_factorized_block(
+                    quadrature_rule, blockmap[:1], blockdata._replace(
+                        ma_data=blockdata.ma_data[:1], tensor_factors=(diagonal, )),
+                    L.float_product(weight + [fw]), preparts, quadparts)
+                return preparts, quadparts, postparts
+
+            iq = self.backend.symbols.quadrature_loop_index()
+            factors = weight + [fw] + self.get_arg_factors(blockdata, 2, quadrature_rule, iq, indices)
+            parts = quadparts
+
+        A = L.FlattenedArray(self.backend.symbols.element_tensor(), dims=self.ir.tensor_shape)
+        parts.append(L.ForRange(k, 0, len(pairs), body=L.AssignAdd(
+            A[self.get_block_dof(dofmap, k, preparts)], L.float_product(factors))))
+        return preparts, quadparts, []
+
+    def accumulate_block(self, blockmap, blockdata, factors, preparts, parts):
+        """Generate code adding a block to the element tensor.
+
+        The entry of the block with the given indices is the product of
+        factors(indices). The code is appended to parts, and static
+        arrays of dofs to preparts.
+        """
+        L = self.backend.language
+
+        block_rank = len(blockmap)
+        blockdims = tuple(len(dofmap) for dofmap in blockmap)
+        arg_indices = tuple(self.backend.symbols.argument_loop_index(i) for i in range(block_rank))
+
         assert not blockdata.transposed
         A_shape = self.ir.tensor_shape
 
@@ -613,40 +1128,427 @@ class IntegralGenerator(object):
                 continue
             break
 
+        # Loop over static arrays of the dofs instead if there would
+        # be too many statements
+        max_unroll = self.ir.params["max_unroll"]
+        indirect = expand_loop and 0 <= max_unroll < ufl.product(blockdims)
+        if indirect:
+            expand_loop = False
+
         if expand_loop:
             # If DOFs in dofrange are not equally spaced, then expand
             # out the for loop
             for A_indices, B_indices in zip(itertools.product(*blockmap),
                                             itertools.product(*[range(len(b)) for b in blockmap])):
-                quadparts += [
-                    L.AssignAdd(
-                        A[A_indices],
-                        L.float_product([fw] + self.get_arg_factors(
-                            blockdata, block_rank,
-                            quadrature_rule, iq, B_indices)
-                        )
-                    )
-                ]
+                parts += [L.AssignAdd(A[A_indices], L.float_product(factors(B_indices)))]
         else:
-            # Fetch code to access modified arguments
+            B_rhs = L.float_product(factors(arg_indices))
+            A_indices = [self.get_block_dof(bm, index, preparts) for bm, index in zip(blockmap, arg_indices)]
+            body = L.AssignAdd(A[A_indices], B_rhs)
+
+            for i in reversed(range(block_rank)):
+                body = L.ForRange(arg_indices[i], 0, blockdims[i], body=body)
+            parts += [body]
+
+    def get_block_dof(self, dofmap, index, parts):
+        """Return the dof of the element tensor at the given index of a block.
+
+        Dofs that are not equally spaced are looked up in a static
+        array, declared in parts if not defined before.
+        """
+        if any(b - a != dofmap[1] - dofmap[0] for a, b in zip(dofmap[1:-1], dofmap[2:])):
+            return self.get_dofmap_array(dofmap, parts)[index]
+        elif len(dofmap) == 1:
+            return index + dofmap[0]
+        else:
+            return (dofmap[1] - dofmap[0]) * index + dofmap[0]
+
+    def generate_symmetric_block(self, quadrature_rule, blockmap, blockdata, fw, preparts, quadparts):
+        """Generate code for a symmetric block of a bilinear form.
+
+        The upper triangle of the block, or of the sum of the block and
+        its transpose, is accumulated in the quadrature loop in a
+        scratch array shared by all symmetric blocks with the same
+        dofs. The scratch array is added to the upper and lower
+        triangle of the element tensor after the loop. Returns the parts
+        to place after the quadrature loop.
+        """
+        L = self.backend.language
+
+        iq = self.backend.symbols.quadrature_loop_index()
+        i, j = (self.backend.symbols.argument_loop_index(k) for k in range(2))
+        n = len(blockmap[0])
+
+        postparts = []
+        S, defined = self.get_temp_symbol("sym", (quadrature_rule, blockmap))
+        if not defined:
+            preparts.append(L.ArrayDecl("ufc_scalar_t", S, (n, n), values=0))
+
+            A = L.FlattenedArray(self.backend.symbols.element_tensor(), dims=self.ir.tensor_shape)
+            rows = [self.get_block_dof(bm, index, preparts) for bm, index in zip(blockmap, (i, j))]
+            cols = [self.get_block_dof(bm, index, preparts) for bm, index in zip(blockmap, (j, i))]
+            postparts.append(L.ForRange(i, 0, n, body=[
+                L.AssignAdd(A[rows[0], cols[1]], S[i, i]),
+                L.ForRange(j, i + 1, n, body=[L.AssignAdd(A[rows], S[i, j]), L.AssignAdd(A[cols], S[i, j])])]))
+
+        value = L.float_product(self.get_arg_factors(blockdata, 2, quadrature_rule, iq, (i, j)))
+        if blockdata.symmetric == "pair":
+            value = value + L.float_product(self.get_arg_factors(blockdata, 2, quadrature_rule, iq, (j, i)))
+        quadparts.append(L.ForRange(i, 0, n, body=L.ForRange(j, i, n, body=L.AssignAdd(
+            S[i, j], L.float_product([fw, value])))))
+
+        return postparts
+
+    def generate_hoisted_block(self, quadrature_rule, blockmap, blockdata, fw, preparts, quadparts):
+        """Generate code for a block with arguments that are piecewise constant over the quadrature points.
+
+        The product of the factor fw and the varying arguments is summed
+        over the quadrature points in a scratch array over the dofs of
+        the varying arguments, shared by all blocks with the same factor
+        and varying arguments. The sums are multiplied by the piecewise
+        arguments and added to the element tensor after the loop.
+        Returns the parts to place after the quadrature loop.
+        """
+        L = self.backend.language
+
+        iq = self.backend.symbols.quadrature_loop_index()
+        block_rank = len(blockmap)
+        indices = tuple(self.backend.symbols.argument_loop_index(i) for i in range(block_rank))
+        varying = [i for i, tt in enumerate(blockdata.ttypes) if tt not in piecewise_ttypes]
+        dims = tuple(len(blockmap[i]) for i in varying)
+
+        # Sum the factor times the varying arguments in the quadrature
+        # loop
+        key = (quadrature_rule, fw.ce_format(self.ir.precision),
+               tuple((blockdata.unames[i], blockdata.restrictions[i]) for i in varying))
+        S, defined = self.get_temp_symbol("hsum", key)
+        if not defined:
+            arg_factors = self.get_arg_factors(blockdata, block_rank, quadrature_rule, iq, indices)
+            value = L.float_product([fw] + [arg_factors[i] for i in varying])
+            if varying:
+                preparts.append(L.ArrayDecl("ufc_scalar_t", S, dims, values=0))
+                body = L.AssignAdd(S[tuple(indices[i] for i in varying)], value)
+                for i, dim in reversed(list(zip(varying, dims))):
+                    body = L.ForRange(indices[i], 0, dim, body=body)
+            else:
+                preparts.append(L.VariableDecl("ufc_scalar_t", S, 0.0))
+                body = L.AssignAdd(S, value)
+            quadparts.append(body)
+
+        # Multiply the sums by the piecewise arguments after the loop
+        def factors(B_indices):
             arg_factors = self.get_arg_factors(blockdata, block_rank, quadrature_rule, iq, B_indices)
+            piecewise = [arg_factors[i] for i in range(block_rank) if i not in varying]
+            return [S[tuple(B_indices[i] for i in varying)] if varying else S] + piecewise
+
+        postparts = []
+        self.accumulate_block(blockmap, blockdata, factors, preparts, postparts)
+        return postparts
+
+    def generate_premultiplied_block(self, quadrature_rule, blockmap, blockdata, fw, preparts, quadparts):
+        """Generate code for a block of a bilinear form as a matrix-matrix product.
+
+        The values fw * FE_i of the first argument premultiplied by the
+        factor are stored for all points in the quadrature loop, and
+        multiplied with the table FE_j of the second argument after the
+        loop, by a register tiled loop nest or by the micro-kernel given
+        by the gemm_microkernel parameter. Returns the parts to place
+        after the quadrature loop.
+        """
+        L = self.backend.language
 
-            B_rhs = L.float_product([fw] + arg_factors)
-            A_indices = []
+        iq = self.backend.symbols.quadrature_loop_index()
+        i, j = (self.backend.symbols.argument_loop_index(k) for k in range(2))
+        ni, nj = (len(dofmap) for dofmap in blockmap)
+        num_points = quadrature_rule.weights.shape[0]
+
+        # Store the premultiplied first argument in the quadrature loop
+        Asym = self.new_temp_symbol("gemm_a")
+        FE_i, FE_j = self.get_arg_factors(blockdata, 2, quadrature_rule, iq, (i, j))
+        preparts.append(L.ArrayDecl("ufc_scalar_t", Asym, (num_points, ni)))
+        quadparts.append(L.ForRange(i, 0, ni, body=L.Assign(Asym[iq, i], L.float_product([fw, FE_i]))))
+
+        postparts = []
+        kernel = self.ir.params["gemm_microkernel"]
+        if kernel:
+            # Compute the block in a scratch array with the
+            # micro-kernel, then add it to the element tensor
+            Csym = self.new_temp_symbol("gemm_c")
+            B = L.ArrayAccess(FE_j.array, FE_j.indices[:-2] + (0, 0))
+            ldb = L.pad_dim(nj, self.ir.params["padlen"])
+            postparts += [
+                L.ArrayDecl("ufc_scalar_t", Csym, (ni, nj), values=0),
+                L.VerbatimStatement(f"void {kernel}(int, int, int, const ufc_scalar_t*, int, const double*, int, "
+                                    "ufc_scalar_t*, int);"),
+                L.Call(kernel, [ni, nj, num_points, L.AddressOf(Asym[0, 0]), ni, L.AddressOf(B), ldb,
+                                L.AddressOf(Csym[0, 0]), nj])]
+            self.accumulate_block(blockmap, blockdata, lambda B_indices: [Csym[B_indices]], preparts, postparts)
+            return postparts
+
+        def tiles(n, size):
+            """Return (begin, count, size) of full tiles and a remainder tile."""
+            count, remainder = divmod(n, size)
+            return [t for t in [(0, count, size), (count * size, 1, remainder)] if t[1] > 0 and t[2] > 0]
+
+        A = L.FlattenedArray(self.backend.symbols.element_tensor(), dims=self.ir.tensor_shape)
+        it, jt = L.Symbol("it"), L.Symbol("jt")
+        for (ib, ic, isize), (jb, jc, jsize) in itertools.product(tiles(ni, gemm_tile_shape[0]),
+                                                                  tiles(nj, gemm_tile_shape[1])):
+            rows = [ib + a if ic == 1 else it * isize + (ib + a) for a in range(isize)]
+            cols = [jb + b if jc == 1 else jt * jsize + (jb + b) for b in range(jsize)]
+            acc = [[L.Symbol(f"acc{a}_{b}") for b in range(jsize)] for a in range(isize)]
+
+            # Accumulate the tile in scalars, with the products over
+            # the quadrature points unrolled
+            body = [L.VariableDecl("ufc_scalar_t", acc[a][b], 0.0) for a in range(isize) for b in range(jsize)]
+            body.append(L.ForRange(iq, 0, num_points, body=[
+                L.AssignAdd(acc[a][b], Asym[iq, rows[a]] * FE_j.array[FE_j.indices[:-1] + (cols[b], )])
+                for a in range(isize) for b in range(jsize)]))
+            body += [L.AssignAdd(A[self.get_block_dof(blockmap[0], rows[a], preparts),
+                                   self.get_block_dof(blockmap[1], cols[b], preparts)], acc[a][b])
+                     for a in range(isize) for b in range(jsize)]
+
+            if jc > 1:
+                body = L.ForRange(jt, 0, jc, body=body)
+            if ic > 1:
+                body = L.ForRange(it, 0, ic, body=body)
+            postparts.append(body if ic > 1 or jc > 1 else L.Scope(body))
+
+        return postparts
+
+    def generate_sum_factorized_block(self, quadrature_rule, blockmap, blockdata, fw, preparts, quadparts):
+        """Generate code for a block by sum factorization.
+
+        The factor fw is stored for all points of the quadrature grid in
+        the quadrature loop, and contracted with the 1D tables of the
+        arguments one direction at a time after the loop, starting with
+        the last direction. Returns the parts to place after the
+        quadrature loop.
+        """
+        L = self.backend.language
 
-            for bm, index in zip(blockmap, arg_indices):
-                # TODO: switch order here? (optionally)
-                offset = bm[0]
-                if len(bm) == 1:
-                    A_indices.append(index + offset)
-                else:
-                    block_size = bm[1] - bm[0]
-                    A_indices.append(block_size * index + offset)
+        grid = self.ir.integrand[quadrature_rule]["quadrature_grid"]
+        factors = blockdata.tensor_factors
+        rank = len(factors)
+        tdim = len(grid.shape)
 
-            body = L.AssignAdd(A[A_indices], B_rhs)
+        # Store the factor in the quadrature loop, in grid order
+        iq = self.backend.symbols.quadrature_loop_index()
+        num_points = len(grid.indices)
+        Fsym = self.new_temp_symbol("sf")
+        preparts.append(L.ArrayDecl("ufc_scalar_t", Fsym, num_points))
+        if grid.indices == tuple(range(num_points)):
+            quadparts.append(L.Assign(Fsym[iq], fw))
+        else:
+            qmap = self.get_index_array("qmap", grid.indices, preparts)
+            quadparts.append(L.Assign(Fsym[qmap[iq]], fw))
+
+        # Row of A for the dofs of each argument, in lexicographic order
+        # of the 1D functions
+        rows = self.get_sum_factorization_rows(blockmap, blockdata, preparts)
+
+        # 1D tables and scaling of the products of 1D functions
+        tables = [[self.get_tensor_factor_table(f.tables[d], preparts) for d in range(tdim)] for f in factors]
+        dims = [[f.tables[d].shape[1] for d in range(tdim)] for f in factors]
+        scales = []
+        for f in factors:
+            if numpy.allclose(f.scales, 1.0):
+                scales.append(None)
+            else:
+                s, defined = self.get_temp_symbol("sf_scales", (f.scales.tobytes(), ))
+                if not defined:
+                    preparts.append(L.ArrayDecl("static const double", s, len(f.scales), values=f.scales))
+                scales.append(s)
+
+        postparts = []
+
+        def flat(indices, sizes):
+            index = 0
+            for i, n in zip(indices, sizes):
+                index = index * n + i
+            return index
+
+        qindices = [L.Symbol(f"iq{d}") for d in range(tdim)]
+        aindices = [[L.Symbol(f"{self.backend.symbols.argument_loop_index(k).name}{d}") for d in range(tdim)]
+                    for k in range(rank)]
+        pairs = [(aindices[k][d], dims[k][d]) for d in range(tdim) for k in range(rank)]
+
+        # Contract one direction at a time, T[q_0, ..., q_{d-1}, pairs of
+        # argument indices for directions >= d]
+        source = Fsym
+        A = L.FlattenedArray(self.backend.symbols.element_tensor(), dims=self.ir.tensor_shape)
+        acc = L.Symbol("sf_acc")
+        for d in reversed(range(tdim)):
+            target_ranges = [(qindices[e], 0, grid.shape[e]) for e in range(d)] + \
+                [(i, 0, n) for i, n in pairs[rank * d:]]
+            source_index = flat(qindices[:d + 1] + [i for i, n in pairs[rank * (d + 1):]],
+                                list(grid.shape[:d + 1]) + [n for i, n in pairs[rank * (d + 1):]])
+            value = L.float_product([source[source_index]] + [tables[k][d][qindices[d], aindices[k][d]]
+                                                              for k in range(rank)])
+            body = [L.VariableDecl("ufc_scalar_t", acc, 0.0),
+                    L.ForRange(qindices[d], 0, grid.shape[d], body=L.AssignAdd(acc, value))]
+            if d > 0:
+                target = self.new_temp_symbol("sf")
+                postparts.append(L.ArrayDecl("ufc_scalar_t", target, ufl.product([r[2] for r in target_ranges])))
+                body.append(L.Assign(target[flat([r[0] for r in target_ranges], [r[2] for r in target_ranges])],
+                                     acc))
+                source = target
+            else:
+                lex = [flat(aindices[k], dims[k]) for k in range(rank)]
+                A_indices = [rows[k](lex[k]) for k in range(rank)]
+                scale = [scales[k][lex[k]] for k in range(rank) if scales[k] is not None]
+                body.append(L.AssignAdd(A[A_indices], L.float_product(scale + [acc])))
+            postparts.append(L.ForRanges(*target_ranges, body=body))
 
-            for i in reversed(range(block_rank)):
-                body = L.ForRange(B_indices[i], 0, blockdims[i], body=body)
-            quadparts += [body]
+        return postparts
 
-        return preparts, quadparts
+    def get_sum_factorization_rows(self, blockmap, blockdata, parts):
+        """Return functions mapping the lexicographic index of a product of 1D functions to a dof, for each argument.
+
+        Dof transformations of the arguments, which only permute the
+        dofs, are applied at runtime in code added to parts.
+        """
+        L = self.backend.language
+
+        rows = []
+        for k, mad in enumerate(blockdata.ma_data):
+            columns = blockdata.tensor_factors[k].columns
+            name = mad.tabledata.name
+            if not self.ir.table_needs_transformation_data[name]:
+                dofs = self.get_dofmap_array([blockmap[k][j] for j in columns], parts)
+                rows.append(lambda i, dofs=dofs: dofs[i])
+                continue
+
+            # Permute the rows at runtime like the table columns
+            perm = self.new_temp_symbol("sf_perm")
+            dofs = self.new_temp_symbol("sf_rows")
+            dofmap = self.get_dofmap_array(blockmap[k], parts)
+            lex = self.get_index_array("sf_columns", columns, parts)
+            c = L.Symbol("ic")
+            parts += [L.ArrayDecl("int", perm, len(columns), values=list(range(len(columns)))),
+                      L.ArrayDecl("int", dofs, len(columns)),
+                      L.Scope(apply_transformations_to_data(
+                          L, self.ir.table_dof_base_transformations[name], self.ir.cell_shape, perm, dtype="int",
+                          max_unroll=self.ir.params["max_unroll"])),
+                      L.ForRange(c, 0, len(columns), body=L.Assign(dofs[perm[c]], dofmap[c]))]
+            rows.append(lambda i, dofs=dofs, lex=lex: dofs[lex[i]])
+        return rows
+
+    def get_tensor_factor_table(self, table, parts):
+        """Return a static 1D table of sum factorization, declaring it in parts if not defined before."""
+        L = self.backend.language
+        s, defined = self.get_temp_symbol("FE1d", (table.shape, table.tobytes()))
+        if not defined:
+            parts += self.share_table(L.ArrayDecl("static const double", s, table.shape, table,
+                                                  padlen=self.ir.params["padlen"]), "FE")
+        return self.backend.symbols.named_table(s.name)
+
+
+class FusedIntegralGenerator(IntegralGenerator):
+    """Generator of one kernel computing the integrals of several forms over the same domain.
+
+    The code for the integral of each form, a member of the fused
+    kernel, is generated with the IR and backend of the member in
+    place. The variable scopes are shared by all members, so that
+    subexpressions appearing in several forms, such as geometry and
+    coefficient values, are computed only once.
+    """
+
+    def __init__(self, members):
+        # Members are (form_index, ir, backend) triples. Tables and
+        # quadrature rules of all members are defined once, by the
+        # IR merging those of the members.
+        ir = merge_fused_ir([member_ir for form_index, member_ir, backend in members])
+        super().__init__(ir, members[0][2])
+        self.form_index = None
+
+        # Tables moved to file scope are renamed for all members
+        for form_index, member_ir, backend in members:
+            backend.symbols.table_names = self.backend.symbols.table_names
+
+        # Cached symbols, such as scratch arrays of blocks, are kept
+        # for each member
+        self.members = [(form_index, member_ir, backend, {}) for form_index, member_ir, backend in members]
+
+    def set_member(self, member):
+        """Generate code for the given member from now on."""
+        self.form_index, self.ir, self.backend, self.shared_symbols = member
+
+    def intermediates_symbol(self, basename, quadrature_rule):
+        """Symbol for the array of intermediate values of a partition of the current member."""
+        L = self.backend.language
+        return L.Symbol(f"{basename}_{quadrature_rule.id()}_{self.form_index}")
+
+    def generate(self):
+        """Generate entire tabulate_fused body."""
+        L = self.backend.language
+
+        # Assert that scopes are empty: expecting this to be called only once
+        assert not any(d for d in self.scopes.values())
+
+        # Generate the tables of quadrature points and weights, basis
+        # function values and preintegrated blocks of all members
+        parts = self.generate_quadrature_tables()
+        parts += self.generate_element_tables()
+        rules = list(self.ir.integrand.keys())
+
+        all_preparts = []
+        all_quadparts = []
+        for rule in rules:
+            # Generate the piecewise computations of all members before
+            # the quadrature loop, and the varying computations and
+            # blocks of all members in a single quadrature loop
+            body = []
+            preparts = []
+            postparts = []
+            for member in self.members:
+                self.set_member(member)
+                if rule not in self.ir.integrand:
+                    continue
+                all_preparts += self.generate_piecewise_partition(rule)
+                body += L.commented_code_list(
+                    self.generate_varying_partition(rule),
+                    f"Quadrature loop body setup for quadrature rule {rule.id()} of form {self.form_index}")
+                block_preparts, block_quadparts, block_postparts = self.generate_dofblock_partition(rule)
+                preparts += block_preparts
+                body += block_quadparts
+                postparts += block_postparts
+
+            all_preparts += preparts
+            if body:
+                num_points = rule.points.shape[0]
+                iq = self.backend.symbols.quadrature_loop_index()
+                all_quadparts += [L.ForRange(iq, 0, num_points, body=body)] + postparts
+
+        parts += all_preparts
+        parts += all_quadparts
+
+        return self.optimize(L.StatementList(parts))
+
+
+def merge_fused_ir(irs):
+    """Merge the quadrature rules and tables of the IR of the members of a fused kernel.
+
+    Returns the IR of the first member with the quadrature rules and
+    tables of all members.
+    """
+    integrand = {}
+    tables = {}
+    table_types = {}
+    table_needs_transformation_data = {}
+    table_dof_base_transformations = {}
+    for ir in irs:
+        for rule, data in ir.integrand.items():
+            integrand.setdefault(rule, data)
+        for name, table in ir.unique_tables.items():
+            if name in tables and (tables[name].shape != table.shape or not numpy.allclose(tables[name], table)):
+                raise RuntimeError("Table values mismatch with same name.")
+            tables[name] = table
+        table_types.update(ir.unique_table_types)
+        table_needs_transformation_data.update(ir.table_needs_transformation_data)
+        table_dof_base_transformations.update(ir.table_dof_base_transformations)
+
+    return irs[0]._replace(integrand=integrand, unique_tables=tables, unique_table_types=table_types,
+                           table_needs_transformation_data=table_needs_transformation_data,
+                           table_dof_base_transformations=table_dof_base_transformations,
+                           precision=max(ir.precision for ir in irs))
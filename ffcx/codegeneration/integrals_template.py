@@ -80,17 +80,207 @@ void tabulate_tensor_{factory_name}(ufc_scalar_t* restrict A,
 """
 }
 
+# Name of the local entity index argument of tabulate_tensor
+entity_local_index = {
+    "cell": "unused_local_index",
+    "exterior_facet": "facet",
+    "interior_facet": "facet",
+    "vertex": "vertex"
+}
+
+tabulate_action = """
+void tabulate_action_{factory_name}(ufc_scalar_t* restrict A,
+                                    const ufc_scalar_t* restrict trial_dofs,
+                                    const ufc_scalar_t* restrict w,
+                                    const ufc_scalar_t* restrict c,
+                                    const double* restrict coordinate_dofs,
+                                    const int* restrict {entity_local_index},
+                                    const uint8_t* restrict quadrature_permutation,
+                                    const uint32_t cell_permutation)
+{{
+{body}
+}}
+"""
+
+tabulate_diagonal = """
+void tabulate_diagonal_{factory_name}(ufc_scalar_t* restrict A,
+                                      const ufc_scalar_t* restrict w,
+                                      const ufc_scalar_t* restrict c,
+                                      const double* restrict coordinate_dofs,
+                                      const int* restrict {entity_local_index},
+                                      const uint8_t* restrict quadrature_permutation,
+                                      const uint32_t cell_permutation)
+{{
+{body}
+}}
+"""
+
+tabulate_fused = """
+void tabulate_fused_{factory_name}(ufc_scalar_t* const* A,
+                                   const ufc_scalar_t* const* w,
+                                   const ufc_scalar_t* const* c,
+                                   const double* restrict coordinate_dofs,
+                                   const int* restrict {entity_local_index},
+                                   const uint8_t* restrict quadrature_permutation,
+                                   const uint32_t cell_permutation)
+{{
+{body}
+}}
+"""
+
+tabulate_fused_declaration = """
+ufc_tabulate_fused tabulate_fused_{factory_name};
+"""
+
+tabulate_tensor_batch = """
+void tabulate_tensor_batch_{factory_name}(int num_cells,
+                                          ufc_scalar_t* restrict A,
+                                          const ufc_scalar_t* restrict w,
+                                          const ufc_scalar_t* restrict c,
+                                          const double* restrict coordinate_dofs,
+                                          const int* restrict entity_local_index,
+                                          const uint8_t* restrict quadrature_permutation,
+                                          const uint32_t* restrict cell_permutations)
+{{
+  for (int cell = 0; cell < num_cells; ++cell)
+    tabulate_tensor_{factory_name}({A}, {w}, c, {coordinate_dofs},
+                                   {entity_local_index},
+                                   {quadrature_permutation},
+                                   cell_permutations ? cell_permutations[cell] : 0);
+}}
+"""
+
+tabulate_tensor_simd = """
+static void tabulate_tensor_simd_{factory_name}(ufc_scalar_t* restrict A,
+                                                const ufc_scalar_t* restrict w,
+                                                const ufc_scalar_t* restrict c,
+                                                const double* restrict coordinate_dofs)
+{{
+{tabulate_tensor}
+}}
+"""
+
+tabulate_tensor_batch_simd = """
+void tabulate_tensor_batch_{factory_name}(int num_cells,
+                                          ufc_scalar_t* restrict A,
+                                          const ufc_scalar_t* restrict w,
+                                          const ufc_scalar_t* restrict c,
+                                          const double* restrict coordinate_dofs,
+                                          const int* restrict entity_local_index,
+                                          const uint8_t* restrict quadrature_permutation,
+                                          const uint32_t* restrict cell_permutations)
+{{
+  // Chunks of {width} cells, evaluated at once in AoSoA layout
+  int cell = 0;
+  for (; cell + {width} <= num_cells; cell += {width})
+  {{
+    ufc_scalar_t A_simd[{A_size}];
+    ufc_scalar_t w_simd[{w_size}];
+    double coordinate_dofs_simd[{coordinate_dofs_size}];
+    for (int lane = 0; lane < {width}; ++lane)
+    {{
+      for (int i = 0; i < {A_stride}; ++i)
+        A_simd[i * {width} + lane] = A[(cell + lane) * {A_stride} + i];
+      for (int i = 0; i < {w_stride}; ++i)
+        w_simd[i * {width} + lane] = w[(cell + lane) * {w_stride} + i];
+      for (int i = 0; i < {coordinate_dofs_stride}; ++i)
+        coordinate_dofs_simd[i * {width} + lane] = coordinate_dofs[(cell + lane) * {coordinate_dofs_stride} + i];
+    }}
+    tabulate_tensor_simd_{factory_name}(A_simd, w_simd, c, coordinate_dofs_simd);
+    for (int lane = 0; lane < {width}; ++lane)
+      for (int i = 0; i < {A_stride}; ++i)
+        A[(cell + lane) * {A_stride} + i] = A_simd[i * {width} + lane];
+  }}
+
+  // Remaining cells
+  for (; cell < num_cells; ++cell)
+    tabulate_tensor_{factory_name}({A}, {w}, c, {coordinate_dofs},
+                                   {entity_local_index},
+                                   {quadrature_permutation},
+                                   cell_permutations ? cell_permutations[cell] : 0);
+}}
+"""
+
+tabulate_ensemble_simd = """
+static void tabulate_ensemble_simd_{factory_name}(ufc_scalar_t* restrict A,
+                                                  const ufc_scalar_t* restrict w,
+                                                  const ufc_scalar_t* restrict c,
+                                                  const double* restrict coordinate_dofs,
+                                                  const int* restrict {entity_local_index},
+                                                  const uint8_t* restrict quadrature_permutation,
+                                                  const uint32_t cell_permutation)
+{{
+{body}
+}}
+"""
+
+tabulate_ensemble = """
+void tabulate_ensemble_{factory_name}(ufc_scalar_t* restrict A,
+                                      const ufc_scalar_t* restrict w,
+                                      const ufc_scalar_t* restrict c,
+                                      const double* restrict coordinate_dofs,
+                                      const int* restrict entity_local_index,
+                                      const uint8_t* restrict quadrature_permutation,
+                                      const uint32_t cell_permutation)
+{{
+  // Members of the ensemble, evaluated at once in AoSoA layout
+  ufc_scalar_t A_ensemble[{A_size}];
+  ufc_scalar_t w_ensemble[{w_size}];
+  ufc_scalar_t c_ensemble[{c_size}];
+  for (int member = 0; member < {size}; ++member)
+  {{
+    for (int i = 0; i < {A_stride}; ++i)
+      A_ensemble[i * {size} + member] = A[member * {A_stride} + i];
+    for (int i = 0; i < {w_stride}; ++i)
+      w_ensemble[i * {size} + member] = w[member * {w_stride} + i];
+    for (int i = 0; i < {c_stride}; ++i)
+      c_ensemble[i * {size} + member] = c[member * {c_stride} + i];
+  }}
+  tabulate_ensemble_simd_{factory_name}(A_ensemble, w_ensemble, c_ensemble, coordinate_dofs,
+                                        entity_local_index, quadrature_permutation, cell_permutation);
+  for (int member = 0; member < {size}; ++member)
+    for (int i = 0; i < {A_stride}; ++i)
+      A[member * {A_stride} + i] = A_ensemble[i * {size} + member];
+}}
+"""
+
+tabulate_ensemble_loop = """
+void tabulate_ensemble_{factory_name}(ufc_scalar_t* restrict A,
+                                      const ufc_scalar_t* restrict w,
+                                      const ufc_scalar_t* restrict c,
+                                      const double* restrict coordinate_dofs,
+                                      const int* restrict entity_local_index,
+                                      const uint8_t* restrict quadrature_permutation,
+                                      const uint32_t cell_permutation)
+{{
+  for (int member = 0; member < {size}; ++member)
+    tabulate_tensor_{factory_name}(A + member * {A_stride}, w + member * {w_stride}, c + member * {c_stride},
+                                   coordinate_dofs, entity_local_index, quadrature_permutation,
+                                   cell_permutation);
+}}
+"""
+
 factory = """
 // Code for integral {factory_name}
 
 {tabulate_tensor}
-
+{tabulate_tensor_batch}
+{tabulate_action}
+{tabulate_diagonal}
+{tabulate_fused}
+{tabulate_ensemble}
 ufc_integral* create_{factory_name}(void)
 {{
   static const bool enabled{enabled_coefficients}
   ufc_integral* integral = (ufc_integral*)malloc(sizeof(*integral));
   integral->enabled_coefficients = enabled;
   integral->tabulate_tensor = tabulate_tensor_{factory_name};
+  integral->tabulate_tensor_batch = tabulate_tensor_batch_{factory_name};
+  integral->tabulate_action = {tabulate_action_name};
+  integral->tabulate_diagonal = {tabulate_diagonal_name};
+  integral->tabulate_fused = {tabulate_fused_name};
+  integral->tabulate_ensemble = {tabulate_ensemble_name};
+  integral->ensemble_size = {ensemble_size};
   integral->needs_transformation_data = {needs_transformation_data};
   return integral;
 }}
@@ -5,18 +5,25 @@
 # SPDX-License-Identifier:    LGPL-3.0-or-later
 
 from contextlib import redirect_stdout
+import concurrent.futures
 import importlib
 import io
 import logging
 import os
 import re
+import shlex
+import subprocess
+import sysconfig
 import tempfile
 import time
 from pathlib import Path
 
 import cffi
+import numpy
+import ufl
 import ffcx
 import ffcx.naming
+from ffcx.parallel import num_workers
 
 logger = logging.getLogger("ffcx")
 
@@ -38,6 +45,11 @@ UFC_COORDINATEMAPPING_DECL = '\n'.join(re.findall('typedef struct ufc_coordinate
 UFC_FORM_DECL = '\n'.join(re.findall('typedef struct ufc_form.*?ufc_form;', ufc_h, re.DOTALL))
 
 UFC_INTEGRAL_DECL = '\n'.join(re.findall(r'typedef void ?\(ufc_tabulate_tensor\).*?\);', ufc_h, re.DOTALL))
+UFC_INTEGRAL_DECL += '\n'.join(re.findall(r'typedef void ?\(ufc_tabulate_tensor_batch\).*?\);', ufc_h, re.DOTALL))
+UFC_INTEGRAL_DECL += '\n'.join(re.findall(r'typedef void ?\(ufc_tabulate_action\).*?\);', ufc_h, re.DOTALL))
+UFC_INTEGRAL_DECL += '\n'.join(re.findall(r'typedef void ?\(ufc_tabulate_diagonal\).*?\);', ufc_h, re.DOTALL))
+UFC_INTEGRAL_DECL += '\n'.join(re.findall(r'typedef void ?\(ufc_tabulate_fused\).*?\);', ufc_h, re.DOTALL))
+UFC_INTEGRAL_DECL += '\n'.join(re.findall(r'typedef void ?\(ufc_tabulate_ensemble\).*?\);', ufc_h, re.DOTALL))
 UFC_INTEGRAL_DECL += '\n'.join(re.findall(r'typedef void ?\(ufc_tabulate_tensor_custom\).*?\);', ufc_h, re.DOTALL))
 UFC_INTEGRAL_DECL += '\n'.join(re.findall('typedef struct ufc_integral.*?ufc_integral;',
                                           ufc_h, re.DOTALL))
@@ -45,10 +57,13 @@ UFC_INTEGRAL_DECL += '\n'.join(re.findall('typedef struct ufc_custom_integral.*?
                                           ufc_h, re.DOTALL))
 UFC_EXPRESSION_DECL = '\n'.join(re.findall('typedef struct ufc_expression.*?ufc_expression;', ufc_h, re.DOTALL))
 
+# Parameters which do not change the generated code
+_unsigned_parameters = ("ir_num_workers", "codegen_num_workers", "compile_num_workers")
+
 
 def _compute_parameter_signature(parameters):
     """Return parameters signature (some parameters should not affect signature)."""
-    return str(sorted(parameters.items()))
+    return str(sorted((k, v) for k, v in parameters.items() if k not in _unsigned_parameters))
 
 
 def get_cached_module(module_name, object_names, cache_dir, timeout):
@@ -139,10 +154,25 @@ def compile_elements(elements, parameters=None, cache_dir=None, timeout=10, cffi
 
 
 def compile_forms(forms, parameters=None, cache_dir=None, timeout=10, cffi_extra_compile_args=None,
-                  cffi_verbose=False, cffi_debug=None, cffi_libraries=None):
-    """Compile a list of UFL forms into UFC Python objects."""
+                  cffi_verbose=False, cffi_debug=None, cffi_libraries=None, specialize_constants=None):
+    """Compile a list of UFL forms into UFC Python objects.
+
+    Parameters
+    ----------
+    specialize_constants
+        Dict of values of UFL constants, which are substituted into the
+        forms before compilation. Terms vanishing for these values are
+        removed, and the specialized constants are not part of the
+        constants of the compiled forms.
+
+    """
     p = ffcx.parameters.get_parameters(parameters)
 
+    # Constants with values given at compile time are replaced by these
+    # values, which become part of the form signatures
+    if specialize_constants:
+        forms = [_specialize_constants(form, specialize_constants) for form in forms]
+
     # Get a signature for these forms
     module_name = 'libffcx_forms_' + \
         ffcx.naming.compute_signature(forms, _compute_parameter_signature(p)
@@ -179,6 +209,18 @@ def compile_forms(forms, parameters=None, cache_dir=None, timeout=10, cffi_extra
     return obj, module
 
 
+def _specialize_constants(form, values):
+    """Replace constants of a form by the given values."""
+    mapping = {}
+    for constant in form.constants():
+        if constant in values:
+            value = numpy.asarray(values[constant])
+            if value.shape != constant.ufl_shape:
+                raise ValueError(f"Value of shape {value.shape} for constant of shape {constant.ufl_shape}.")
+            mapping[constant] = ufl.as_ufl(value.item()) if value.shape == () else ufl.as_tensor(value.tolist())
+    return ufl.replace(form, mapping) if mapping else form
+
+
 def compile_expressions(expressions, parameters=None, cache_dir=None, timeout=10, cffi_extra_compile_args=None,
                         cffi_verbose=False, cffi_debug=None, cffi_libraries=None):
     """Compile a list of UFL expressions into UFC Python objects.
@@ -272,24 +314,44 @@ def _compile_objects(decl, ufl_objects, object_names, module_name, parameters, c
 
     import ffcx.compiler
 
-    _, code_body = ffcx.compiler.compile_ufl_objects(ufl_objects, prefix="JIT", parameters=parameters)
-
-    ffibuilder = cffi.FFI()
-    ffibuilder.set_source(module_name, code_body, include_dirs=[ffcx.codegeneration.get_include_path()],
-                          extra_compile_args=cffi_extra_compile_args, libraries=cffi_libraries)
-    ffibuilder.cdef(decl)
-
     c_filename = cache_dir.joinpath(module_name + ".c")
     ready_name = c_filename.with_suffix(".c.cached")
 
     # Compile (ensuring that compile dir exists)
     cache_dir.mkdir(exist_ok=True, parents=True)
 
+    include_dirs = [ffcx.codegeneration.get_include_path()]
+    if parameters["streaming"]:
+        # Write generated code to a separate file while it is generated,
+        # and include it from the module source
+        body_filename = cache_dir.joinpath(module_name + "_body.c")
+        with open(body_filename, "w") as body_file:
+            ffcx.compiler.compile_ufl_objects_streaming(ufl_objects, body_file, prefix="JIT", parameters=parameters)
+        code_body = f'#include "{body_filename.name}"\n'
+        include_dirs.append(str(cache_dir))
+    else:
+        _, code_body = ffcx.compiler.compile_ufl_objects(ufl_objects, prefix="JIT", parameters=parameters)
+
     logger.info(79 * "#")
     logger.info("Calling JIT C compiler")
     logger.info(79 * "#")
 
     t0 = time.time()
+
+    # Kernels split into separate translation units are compiled in
+    # parallel, and linked into the module built from the glue unit
+    extra_objects = []
+    if not isinstance(code_body, str):
+        extra_objects = _compile_units(code_body[1:], module_name, parameters, cache_dir,
+                                       cffi_extra_compile_args, cffi_debug)
+        code_body = code_body[0]
+
+    ffibuilder = cffi.FFI()
+    ffibuilder.set_source(module_name, code_body, include_dirs=include_dirs,
+                          extra_compile_args=cffi_extra_compile_args, libraries=cffi_libraries,
+                          extra_objects=extra_objects)
+    ffibuilder.cdef(decl)
+
     f = io.StringIO()
     with redirect_stdout(f):
         ffibuilder.compile(tmpdir=cache_dir, verbose=True, debug=cffi_debug)
@@ -307,6 +369,40 @@ def _compile_objects(decl, ufl_objects, object_names, module_name, parameters, c
     fd.close()
 
 
+def _compile_units(sources, module_name, parameters, cache_dir, cffi_extra_compile_args, cffi_debug):
+    """Compile C sources to object files in parallel, returning the object file names."""
+    cc = shlex.split(sysconfig.get_config_var("CC") or "cc")
+    flags = shlex.split(sysconfig.get_config_var("CFLAGS") or "")
+    flags += shlex.split(sysconfig.get_config_var("CCSHARED") or "")
+    flags += ["-I" + ffcx.codegeneration.get_include_path()]
+    if cffi_debug:
+        flags += ["-g", "-O0"]
+    flags += cffi_extra_compile_args or []
+
+    commands = []
+    objects = []
+    for i, source in enumerate(sources):
+        c_filename = cache_dir.joinpath(f"{module_name}_unit{i}.c")
+        o_filename = c_filename.with_suffix(".o")
+        with open(c_filename, "w") as f:
+            f.write(source)
+        unit_flags = flags
+        if parameters["large_unit_size"] >= 0 and len(source) > parameters["large_unit_size"]:
+            unit_flags = flags + shlex.split(parameters["large_unit_flags"])
+        commands.append(cc + unit_flags + ["-c", str(c_filename), "-o", str(o_filename)])
+        objects.append(str(o_filename))
+
+    workers = min(num_workers(parameters["compile_num_workers"]), len(commands))
+    logger.info(f"Compiling {len(commands)} translation units with {workers} processes")
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max(workers, 1)) as pool:
+        results = list(pool.map(lambda cmd: subprocess.run(cmd, capture_output=True, text=True), commands))
+    for cmd, result in zip(commands, results):
+        if result.returncode != 0:
+            raise RuntimeError(f"Compilation of translation unit failed: {' '.join(cmd)}\n{result.stderr}")
+
+    return objects
+
+
 def _load_objects(cache_dir, module_name, object_names):
 
     # Create module finder that searches the compile path
@@ -0,0 +1,455 @@
+# Copyright (C) 2021 FEniCS Project
+#
+# This file is part of FFCX.(https://www.fenicsproject.org)
+#
+# SPDX-License-Identifier:    LGPL-3.0-or-later
+"""Algebraic simplification and strength reduction of kernel bodies.
+
+The statements of a kernel body are rewritten by the following passes:
+
+- literal constants are folded, and additions of zero and
+  multiplications by one are removed,
+- powers with small integer exponents are expanded into
+  multiplications,
+- divisions by loop invariant divisors are replaced by multiplications
+  with reciprocals computed before the loop,
+- expressions whose value has been assigned to a variable before, e.g.
+  in another partition, are replaced by the variable (value numbering),
+- optionally, a*b + c is contracted into fma(a, b, c).
+
+Floating point results may differ in the last bits from those of the
+unoptimized code.
+"""
+
+import copy
+import numbers
+
+from ffcx.codegeneration.C.ufl_to_cnodes import math_table
+
+# Largest absolute value of integer exponents of powers expanded into
+# multiplications
+max_power_expansion = 4
+
+# Functions computing powers, which are expanded
+power_functions = ("pow", "powf", "cpow", "cpowf")
+
+# Functions without side effects, whose calls can be reused
+pure_functions = set(name for table in math_table.values() for name in table.values()) | {"fma", "fmaf"}
+
+# Functions contracting a*b + c for real scalar types
+fma_functions = {"double": "fma", "float": "fmaf"}
+
+
+class CNodesOptimizer(object):
+    """Simplify the CNodes statements of a kernel body.
+
+    Raises no errors for unknown statements, but does not reuse values
+    across verbatim statements.
+    """
+
+    def __init__(self, L, scalar_type, fma=False):
+        self.L = L
+        self.scalar_type = scalar_type
+        self.fma = fma_functions.get(scalar_type) if fma else None
+
+        # Counter for names of reciprocals
+        self.num_reciprocals = 0
+
+    def optimize(self, statements):
+        """Return a list of statements simplifying the given statements."""
+        parts = self.map_expressions(_flatten(self.L, statements), self.simplify)
+        if "complex" not in self.scalar_type:
+            parts = self.hoist_reciprocals(parts)
+        parts = self.number_values(parts, _Values())
+        if self.fma:
+            parts = self.map_expressions(parts, self.contract, contract_updates=True)
+        return parts
+
+    def map_expressions(self, statements, f, contract_updates=False):
+        """Return a list of the statements with f applied to all expressions but the targets of assignments.
+
+        Integer declarations are left as they are if contract_updates
+        is True, and updates x += a*b are contracted into x = fma(a, b, x).
+        """
+        L = self.L
+        parts = []
+        for s in _flatten(L, statements):
+            if isinstance(s, L.VariableDecl):
+                if s.value is not None and not (contract_updates and "int" in s.typename):
+                    s = L.VariableDecl(s.typename, s.symbol, f(s.value))
+            elif isinstance(s, L.Statement) and isinstance(s.expr, L.AssignOp):
+                expr = copy.copy(s.expr)
+                expr.rhs = f(expr.rhs)
+                if isinstance(expr, L.AssignAdd) and contract_updates:
+                    contracted = self.contract(L.Add(expr.lhs, expr.rhs))
+                    if isinstance(contracted, L.Call):
+                        expr = L.Assign(expr.lhs, contracted)
+                s = L.Statement(expr)
+            elif isinstance(s, (L.If, L.ElseIf)):
+                s = type(s)(f(s.condition), L.StatementList(self.map_expressions(s.body, f, contract_updates)))
+            elif isinstance(s, L.Else):
+                s = L.Else(L.StatementList(self.map_expressions(s.body, f, contract_updates)))
+            elif isinstance(s, L.ForRange):
+                s = L.ForRange(s.index, s.begin, s.end, body=self.map_expressions(s.body, f, contract_updates),
+                               index_type=s.index_type)
+            elif isinstance(s, L.Scope):
+                s = L.Scope(self.map_expressions(s.body, f, contract_updates))
+            parts.append(s)
+        return parts
+
+    def simplify(self, expr):
+        """Fold literal constants and expand integer powers in an expression."""
+        L = self.L
+        if isinstance(expr, L.CExprTerminal):
+            return expr
+        elif isinstance(expr, L.ArrayAccess):
+            return L.ArrayAccess(expr.array, [self.simplify(i) for i in expr.indices])
+        expr = _map_operands(L, expr, self.simplify)
+
+        if isinstance(expr, (L.Add, L.Sub, L.Mul, L.Div)):
+            a, b = expr.lhs, expr.rhs
+            if _is_number(L, a) and _is_number(L, b):
+                if not isinstance(expr, L.Div):
+                    return _fold(L, expr, [a, b])
+                elif (isinstance(a, L.LiteralFloat) or isinstance(b, L.LiteralFloat)) and b.value != 0:
+                    return L.LiteralFloat(a.value / b.value)
+            elif isinstance(expr, L.Add) and _is_value(L, a, 0):
+                return b
+            elif isinstance(expr, (L.Add, L.Sub)) and _is_value(L, b, 0):
+                return a
+            elif isinstance(expr, L.Sub) and _is_value(L, a, 0):
+                return L.Neg(b)
+            elif isinstance(expr, L.Mul) and _is_value(L, a, 1):
+                return b
+            elif isinstance(expr, (L.Mul, L.Div)) and _is_value(L, b, 1):
+                return a
+        elif isinstance(expr, (L.Sum, L.Product)):
+            neutral = 0 if isinstance(expr, L.Sum) else 1
+            literals = [arg for arg in expr.args if _is_number(L, arg)]
+            args = [arg for arg in expr.args if not _is_number(L, arg)]
+            if literals:
+                value = _fold(L, expr, literals)
+                if not _is_value(L, value, neutral) or not args:
+                    args = [value] + args
+            if len(args) == 1:
+                return args[0]
+            return type(expr)(args)
+        elif isinstance(expr, L.Neg):
+            if _is_number(L, expr.arg):
+                return type(expr.arg)(-expr.arg.value)
+            elif isinstance(expr.arg, L.Neg):
+                return expr.arg.arg
+        elif isinstance(expr, L.Call) and expr.function.ce_format() in power_functions:
+            return self.expand_power(expr)
+        return expr
+
+    def expand_power(self, expr):
+        """Expand a power with a small integer exponent into multiplications."""
+        L = self.L
+        base, exponent = expr.arguments
+        if not _is_number(L, exponent) or isinstance(exponent.value, complex) \
+                or float(exponent.value) != int(exponent.value) or abs(int(exponent.value)) > max_power_expansion:
+            return expr
+        if not isinstance(base, (L.Symbol, L.ArrayAccess, L.CExprLiteral)):
+            # Avoid evaluating the base several times
+            return expr
+        n = int(exponent.value)
+        if n == 0:
+            return L.LiteralFloat(1.0)
+        power = base if abs(n) == 1 else L.Product([base] * abs(n))
+        return power if n > 0 else L.Div(L.LiteralFloat(1.0), power)
+
+    def hoist_reciprocals(self, statements):
+        """Replace divisions by loop invariant divisors by multiplications with reciprocals computed before loops."""
+        L = self.L
+        parts = []
+        for s in statements:
+            if isinstance(s, L.ForRange):
+                assigned = _assigned_names(L, s.body)
+                body = s.body
+                if assigned is not None:
+                    assigned.add(s.index.name)
+                    reciprocals = {}
+                    body = self.map_expressions(body, lambda e: self.replace_divisions(e, assigned, reciprocals))
+                    for symbol, divisor in reciprocals.values():
+                        parts.append(L.VariableDecl("const ufc_scalar_t", symbol,
+                                                    L.Div(L.LiteralFloat(1.0), divisor)))
+                s = L.ForRange(s.index, s.begin, s.end, body=self.hoist_reciprocals(_flatten(L, body)),
+                               index_type=s.index_type)
+            elif isinstance(s, (L.If, L.ElseIf)):
+                s = type(s)(s.condition, L.StatementList(self.hoist_reciprocals(_flatten(L, s.body))))
+            elif isinstance(s, L.Else):
+                s = L.Else(L.StatementList(self.hoist_reciprocals(_flatten(L, s.body))))
+            elif isinstance(s, L.Scope):
+                s = L.Scope(self.hoist_reciprocals(_flatten(L, s.body)))
+            parts.append(s)
+        return parts
+
+    def replace_divisions(self, expr, assigned, reciprocals):
+        """Replace divisions by divisors not depending on the assigned names by multiplications with reciprocals."""
+        L = self.L
+        if isinstance(expr, (L.CExprTerminal, L.ArrayAccess)):
+            return expr
+        expr = _map_operands(L, expr, lambda e: self.replace_divisions(e, assigned, reciprocals))
+        if isinstance(expr, L.Div) and not isinstance(expr.rhs, L.CExprLiteral) \
+                and not _names(L, expr.rhs) & assigned and _is_pure(L, expr.rhs):
+            key = expr.rhs.ce_format()
+            if key not in reciprocals:
+                reciprocals[key] = (L.Symbol(f"rec{self.num_reciprocals}"), expr.rhs)
+                self.num_reciprocals += 1
+            symbol = reciprocals[key][0]
+            return symbol if _is_value(L, expr.lhs, 1) else L.Mul(expr.lhs, symbol)
+        return expr
+
+    def number_values(self, statements, values):
+        """Replace expressions whose values are held by variables by these variables.
+
+        The values available from before are updated with the values
+        assigned by the statements.
+        """
+        L = self.L
+        parts = []
+        for s in statements:
+            if isinstance(s, L.VariableDecl):
+                values.kill(s.symbol.name, None)
+                if s.value is not None:
+                    value = values.replace(L, s.value)
+                    s = L.VariableDecl(s.typename, s.symbol, value)
+                    values.add(L, value, s.symbol)
+            elif isinstance(s, (L.ArrayDecl, L.ArrayBlobDecl)):
+                values.kill(s.symbol.name, None)
+            elif isinstance(s, L.Statement) and isinstance(s.expr, L.AssignOp):
+                expr = copy.copy(s.expr)
+                expr.rhs = values.replace(L, expr.rhs)
+                target = expr.lhs
+                name, index = _location(L, target)
+                values.kill(name, index)
+                if isinstance(expr, L.Assign) and (index is not None or isinstance(target, L.Symbol)) \
+                        and name not in _names(L, expr.rhs):
+                    values.add(L, expr.rhs, target)
+                s = L.Statement(expr)
+            elif isinstance(s, (L.ForRange, L.If, L.ElseIf, L.Else, L.Scope)):
+                assigned = _assigned_names(L, s.body)
+                if assigned is None:
+                    values.clear()
+                    assigned = set()
+                if isinstance(s, L.ForRange):
+                    # Values changed in the loop are not available in
+                    # any iteration
+                    assigned.add(s.index.name)
+                    for name in assigned:
+                        values.kill(name, None)
+                body = L.StatementList(self.number_values(_flatten(L, s.body), values.copy()))
+                if isinstance(s, L.ForRange):
+                    s = L.ForRange(s.index, s.begin, s.end, body=body, index_type=s.index_type)
+                elif isinstance(s, (L.If, L.ElseIf)):
+                    s = type(s)(values.replace(L, s.condition), body)
+                else:
+                    s = type(s)(body)
+                for name in assigned:
+                    values.kill(name, None)
+            elif not isinstance(s, (L.Comment, L.Pragma)):
+                values.clear()
+            parts.append(s)
+        return parts
+
+    def contract(self, expr):
+        """Contract products added to other terms into calls to fma."""
+        L = self.L
+        if isinstance(expr, (L.CExprTerminal, L.ArrayAccess)):
+            return expr
+        expr = _map_operands(L, expr, self.contract)
+        if isinstance(expr, L.Add):
+            terms = [expr.lhs, expr.rhs]
+        elif isinstance(expr, L.Sum):
+            terms = list(expr.args)
+        elif isinstance(expr, L.Sub):
+            terms = [expr.lhs, L.Neg(expr.rhs)]
+        else:
+            return expr
+        products = [t for t in terms if isinstance(t, (L.Mul, L.Product))]
+        if not products:
+            return expr
+        others = [t for t in terms if not any(t is p for p in products)]
+        if others:
+            value = others[0] if len(others) == 1 else L.Sum(others)
+        else:
+            value = products.pop()
+        for p in products:
+            a, b = (p.lhs, p.rhs) if isinstance(p, L.Mul) else (L.float_product(p.args[:-1]), p.args[-1])
+            value = L.Call(self.fma, [a, b, value])
+        return value
+
+
+class _Values(object):
+    """Expressions whose values are held in variables, with lookup of the variables depending on a location."""
+
+    def __init__(self):
+        self.values = {}
+        self.dependents = {}
+
+    def copy(self):
+        values = _Values()
+        values.values = dict(self.values)
+        values.dependents = {k: set(v) for k, v in self.dependents.items()}
+        return values
+
+    def clear(self):
+        self.values.clear()
+        self.dependents.clear()
+
+    def add(self, L, expr, target):
+        """Record that the value of expr is held by target."""
+        if isinstance(expr, (L.CExprTerminal, L.ArrayAccess)) or not _is_pure(L, expr):
+            return
+        key = expr.ce_format()
+        if key in self.values:
+            return
+        self.values[key] = target
+        for location in _locations(L, expr) | {_location(L, target)}:
+            self.dependents.setdefault(location, set()).add(key)
+
+    def kill(self, name, index):
+        """Forget the values depending on the location, an entry of an array if index is not None."""
+        if index is None:
+            locations = [location for location in self.dependents if location[0] == name]
+        else:
+            locations = [(name, index), (name, None)]
+        for location in locations:
+            for key in self.dependents.pop(location, ()):
+                self.values.pop(key, None)
+
+    def replace(self, L, expr):
+        """Replace the expression and its subexpressions by the variables holding their values."""
+        if isinstance(expr, (L.CExprTerminal, L.ArrayAccess)):
+            return expr
+        target = self.values.get(expr.ce_format())
+        if target is not None:
+            return target
+        return _map_operands(L, expr, lambda e: self.replace(L, e))
+
+
+def _flatten(L, statements):
+    """Return a flat list of the statements, with statement lists expanded."""
+    if isinstance(statements, L.StatementList):
+        statements = statements.statements
+    elif not isinstance(statements, (list, tuple)):
+        statements = [statements]
+    flat = []
+    for s in statements:
+        if isinstance(s, L.StatementList):
+            flat.extend(_flatten(L, s))
+        else:
+            flat.append(L.as_cstatement(s))
+    return flat
+
+
+def _map_operands(L, expr, f):
+    """Return a copy of an operator with f applied to its operands."""
+    expr = copy.copy(expr)
+    if isinstance(expr, L.BinOp):
+        expr.lhs = f(expr.lhs)
+        expr.rhs = f(expr.rhs)
+    elif isinstance(expr, L.NaryOp):
+        expr.args = [f(arg) for arg in expr.args]
+    elif isinstance(expr, L.UnaryOp):
+        expr.arg = f(expr.arg)
+    elif isinstance(expr, L.Conditional):
+        expr.condition = f(expr.condition)
+        expr.true = f(expr.true)
+        expr.false = f(expr.false)
+    elif isinstance(expr, L.Call):
+        expr.arguments = [f(arg) for arg in expr.arguments]
+    elif isinstance(expr, L.ArrayAccess):
+        expr.indices = tuple(f(i) for i in expr.indices)
+    return expr
+
+
+def _is_number(L, expr):
+    return isinstance(expr, (L.LiteralFloat, L.LiteralInt)) and isinstance(expr.value, numbers.Number)
+
+
+def _is_value(L, expr, value):
+    return _is_number(L, expr) and expr.value == value
+
+
+def _fold(L, expr, literals):
+    """Fold literals combined by the operator of expr into a literal."""
+    value = literals[0].value
+    for literal in literals[1:]:
+        if isinstance(expr, (L.Add, L.Sum)):
+            value = value + literal.value
+        elif isinstance(expr, L.Sub):
+            value = value - literal.value
+        else:
+            value = value * literal.value
+    if all(isinstance(literal, L.LiteralInt) for literal in literals):
+        return L.LiteralInt(value)
+    return L.LiteralFloat(value)
+
+
+def _is_pure(L, expr):
+    """Check if an expression has no side effects, i.e. only calls functions without side effects."""
+    if isinstance(expr, L.Call):
+        if expr.function.ce_format() not in pure_functions:
+            return False
+        return all(_is_pure(L, arg) for arg in expr.arguments)
+    elif isinstance(expr, L.AssignOp):
+        return False
+    elif isinstance(expr, L.CExprTerminal):
+        return True
+    pure = [True]
+    _map_operands(L, expr, lambda e: pure.append(_is_pure(L, e)) or e)
+    return all(pure)
+
+
+def _location(L, target):
+    """Return the name of the variable assigned to, and the entry of an array if given by literal indices."""
+    if isinstance(target, L.ArrayAccess):
+        if all(isinstance(i, L.LiteralInt) for i in target.indices):
+            return target.array.name, tuple(int(i.value) for i in target.indices)
+        return target.array.name, None
+    return target.name, None
+
+
+def _locations(L, expr):
+    """Return the locations of the variables read by an expression."""
+    if isinstance(expr, L.Symbol):
+        return {(expr.name, None)}
+    elif isinstance(expr, L.ArrayAccess):
+        return {_location(L, expr)}.union(*(_locations(L, i) for i in expr.indices))
+    elif isinstance(expr, L.CExprTerminal):
+        return set()
+    locations = []
+    _map_operands(L, expr, lambda e: locations.append(_locations(L, e)) or e)
+    return set().union(*locations)
+
+
+def _names(L, expr):
+    """Return the names of the variables read by an expression."""
+    return set(name for name, index in _locations(L, expr))
+
+
+def _assigned_names(L, statements):
+    """Return the names of variables declared or assigned by statements, or None if unknown."""
+    names = set()
+    for s in _flatten(L, statements):
+        if isinstance(s, (L.VariableDecl, L.ArrayDecl, L.ArrayBlobDecl)):
+            names.add(s.symbol.name)
+        elif isinstance(s, L.Statement) and isinstance(s.expr, L.AssignOp):
+            names.add(_location(L, s.expr.lhs)[0])
+        elif isinstance(s, (L.ForRange, L.If, L.ElseIf, L.Else, L.Scope)):
+            body_names = _assigned_names(L, s.body)
+            if body_names is None:
+                return None
+            names |= body_names
+            if isinstance(s, L.ForRange):
+                names.add(s.index.name)
+        elif not isinstance(s, (L.Comment, L.Pragma)):
+            return None
+    return names
+
+
+def optimize(L, statements, scalar_type, fma=False):
+    """Simplify a kernel body, contracting a*b + c into fma(a, b, c) if fma is True."""
+    return L.StatementList(CNodesOptimizer(L, scalar_type, fma).optimize(statements))
@@ -0,0 +1,285 @@
+# Copyright (C) 2021 FEniCS Project
+#
+# This file is part of FFCX.(https://www.fenicsproject.org)
+#
+# SPDX-License-Identifier:    LGPL-3.0-or-later
+"""Cross-element and cross-ensemble vectorization of tabulate_tensor bodies.
+
+A kernel body is rewritten to evaluate a chunk of W cells, or an
+ensemble of W sets of coefficients and constants on the same cell, at
+once. Values that depend on inputs varying from lane to lane get an
+additional innermost dimension of size W, and sequences of statements
+computing them are wrapped in innermost loops over the lanes, which the
+compiler can turn into SIMD instructions. Tables, loop indices and
+values not depending on the varying inputs are the same for all lanes
+and are left unchanged.
+
+The varying inputs, A, w and coordinate_dofs for cells and A, w and c
+for ensembles, are expected in an AoSoA layout, i.e. value k of lane l
+is stored at [k * W + l].
+"""
+
+import copy
+
+import numpy
+
+# Arguments of tabulate_tensor with a value per cell
+cell_arrays = ("A", "w", "coordinate_dofs")
+
+# Arguments of tabulate_tensor with a value per member of an ensemble
+ensemble_arrays = ("A", "w", "c")
+
+
+class CellVectorizer(object):
+    """Rewrite CNodes statements to operate on W cells, or other lanes, at once.
+
+    The arrays given as inputs have a value per lane, in AoSoA layout.
+    The scalar arguments given as varying_scalars also differ between
+    lanes, but are not available per lane. Raises NotImplementedError
+    for code that cannot be vectorized, e.g. verbatim statements or
+    dependencies on such scalars.
+    """
+
+    def __init__(self, L, width, inputs=cell_arrays, varying_scalars=("cell_permutation", )):
+        self.L = L
+        self.width = width
+        self.lane = L.Symbol("lane")
+        self.inputs = inputs
+        self.varying_scalars = varying_scalars
+
+        # Names of local variables depending on the inputs
+        self.varying = set()
+
+        # Names of local scalars and arrays with one value per lane
+        self.scalars = set()
+        self.arrays = set()
+
+    def find_varying(self, statements):
+        """Find the names of local variables depending on the inputs, which need a value per lane."""
+        varying = set(self.inputs) | set(self.varying_scalars)
+        size = -1
+        while size != len(varying):
+            size = len(varying)
+            self.mark_varying(statements, varying, False)
+        return varying - set(self.inputs) - set(self.varying_scalars)
+
+    def mark_varying(self, statements, varying, control):
+        """Add the variables assigned values depending on the varying variables to these.
+
+        All variables assigned under control of a varying condition are
+        varying.
+        """
+        L = self.L
+        chain = control
+        for s in _flatten(L, statements):
+            if isinstance(s, L.VariableDecl):
+                if s.value is not None and (control or _names(L, s.value) & varying):
+                    varying.add(s.symbol.name)
+            elif isinstance(s, L.Statement) and isinstance(s.expr, L.AssignOp):
+                if control or _names(L, s.expr) & varying:
+                    target = s.expr.lhs
+                    varying.add(target.array.name if isinstance(target, L.ArrayAccess) else target.name)
+            elif isinstance(s, (L.If, L.ElseIf, L.Else)):
+                if isinstance(s, L.If):
+                    chain = control or bool(_names(L, s.condition) & varying)
+                elif isinstance(s, L.ElseIf):
+                    chain = chain or bool(_names(L, s.condition) & varying)
+                self.mark_varying(s.body, varying, chain)
+            elif isinstance(s, L.ForRange):
+                bounds = _names(L, s.begin) | _names(L, s.end)
+                self.mark_varying(s.body, varying, control or bool(bounds & varying))
+            elif isinstance(s, L.Scope):
+                self.mark_varying(s.body, varying, control)
+
+    def vectorize(self, statements):
+        """Return a list of statements computing the given statements for W cells."""
+        L = self.L
+        parts = []
+        group = []
+
+        def flush():
+            if group:
+                parts.extend([L.Pragma("omp simd"), L.ForRange(self.lane, 0, self.width, body=list(group))])
+                group.clear()
+
+        varying_chain = False
+        for s in _flatten(L, statements):
+            if isinstance(s, (L.Comment, L.Pragma)):
+                flush()
+                parts.append(s)
+            elif isinstance(s, L.VariableDecl):
+                # Declarations are moved ahead of the current loop over
+                # lanes, and are unchanged if not varying
+                if s.typename.startswith("static") or s.symbol.name not in self.varying:
+                    parts.append(s)
+                    continue
+                typename = s.typename.replace("const ", "")
+                self.scalars.add(s.symbol.name)
+                parts.append(L.ArrayDecl(typename, s.symbol, self.width))
+                if s.value is not None:
+                    group.append(L.Assign(self.lanify(s.symbol), self.lanify(s.value)))
+            elif isinstance(s, L.ArrayDecl):
+                if s.typename.startswith("static") or s.symbol.name not in self.varying:
+                    parts.append(s)
+                    continue
+                self.arrays.add(s.symbol.name)
+                values = s.values
+                if isinstance(values, numpy.ndarray):
+                    values = numpy.repeat(values[..., numpy.newaxis], self.width, axis=-1)
+                parts.append(L.ArrayDecl(s.typename, s.symbol, s.sizes + (self.width, ), values=values))
+            elif isinstance(s, L.Statement):
+                t = self.lanify_statement(s)
+                if t.cs_format() != s.cs_format():
+                    group.append(t)
+                else:
+                    # Computed once for all lanes
+                    flush()
+                    parts.append(s)
+            elif isinstance(s, (L.If, L.ElseIf, L.Else)):
+                if isinstance(s, L.If):
+                    varying_chain = self.is_varying(s.condition)
+                if varying_chain:
+                    # Branch per cell inside the loop over cells
+                    group.append(self.lanify_statement(s))
+                else:
+                    flush()
+                    body = L.StatementList(self.vectorize(s.body))
+                    if isinstance(s, L.Else):
+                        parts.append(L.Else(body))
+                    else:
+                        parts.append(type(s)(s.condition, body))
+            elif isinstance(s, L.ForRange):
+                flush()
+                parts.append(L.ForRange(s.index, s.begin, s.end, body=self.vectorize(s.body),
+                                        index_type=s.index_type))
+            elif isinstance(s, L.Scope):
+                flush()
+                parts.append(L.Scope(self.vectorize(s.body)))
+            else:
+                raise NotImplementedError(f"Cannot vectorize statement of type {type(s).__name__}.")
+        flush()
+        return parts
+
+    def lanify_statement(self, s):
+        """Rewrite a statement placed inside the loop over cells."""
+        L = self.L
+        if isinstance(s, L.Statement):
+            return L.Statement(self.lanify(s.expr))
+        elif isinstance(s, L.StatementList):
+            return L.StatementList([self.lanify_statement(t) for t in s.statements])
+        elif isinstance(s, L.If):
+            return L.If(self.lanify(s.condition), self.lanify_statement(s.body))
+        elif isinstance(s, L.ElseIf):
+            return L.ElseIf(self.lanify(s.condition), self.lanify_statement(s.body))
+        elif isinstance(s, L.Else):
+            return L.Else(self.lanify_statement(s.body))
+        elif isinstance(s, L.Scope):
+            return L.Scope(self.lanify_statement(s.body))
+        elif isinstance(s, L.ForRange):
+            return L.ForRange(s.index, s.begin, s.end, body=self.lanify_statement(s.body),
+                              index_type=s.index_type)
+        elif isinstance(s, L.Comment):
+            return s
+        raise NotImplementedError(f"Cannot vectorize statement of type {type(s).__name__}.")
+
+    def lanify(self, expr):
+        """Rewrite an expression to access the values of a single cell."""
+        L = self.L
+        if isinstance(expr, L.Symbol):
+            if expr.name in self.scalars:
+                return expr[self.lane]
+            if expr.name in self.varying_scalars:
+                raise NotImplementedError(f"Cannot vectorize kernels depending on {expr.name}.")
+            return expr
+        elif isinstance(expr, L.ArrayAccess):
+            indices = tuple(self.lanify(i) for i in expr.indices)
+            if expr.array.name in self.inputs:
+                index, = indices
+                if isinstance(index, L.LiteralInt):
+                    index = L.LiteralInt(index.value * self.width)
+                else:
+                    index = index * self.width
+                return L.ArrayAccess(expr.array, index + self.lane)
+            elif expr.array.name in self.arrays:
+                return L.ArrayAccess(expr.array, indices + (self.lane, ))
+            return L.ArrayAccess(expr.array, indices)
+        elif isinstance(expr, (L.CExprTerminal, L.LiteralFloat, L.LiteralInt)):
+            return expr
+
+        # Operators are copied with rewritten operands
+        expr = copy.copy(expr)
+        if isinstance(expr, L.BinOp):
+            expr.lhs = self.lanify(expr.lhs)
+            expr.rhs = self.lanify(expr.rhs)
+        elif isinstance(expr, L.NaryOp):
+            expr.args = [self.lanify(arg) for arg in expr.args]
+        elif isinstance(expr, L.UnaryOp):
+            expr.arg = self.lanify(expr.arg)
+        elif isinstance(expr, L.Conditional):
+            expr.condition = self.lanify(expr.condition)
+            expr.true = self.lanify(expr.true)
+            expr.false = self.lanify(expr.false)
+        elif isinstance(expr, L.Call):
+            expr.arguments = [self.lanify(arg) for arg in expr.arguments]
+        else:
+            raise NotImplementedError(f"Cannot vectorize expression of type {type(expr).__name__}.")
+        return expr
+
+    def is_varying(self, expr):
+        """Check if an expression may take different values for different cells."""
+        return str(self.lanify(expr)) != str(expr)
+
+
+def _flatten(L, statements):
+    """Return a flat list of the statements, with statement lists expanded."""
+    if isinstance(statements, L.StatementList):
+        statements = statements.statements
+    elif not isinstance(statements, (list, tuple)):
+        statements = [statements]
+    flat = []
+    for s in statements:
+        if isinstance(s, L.StatementList):
+            flat.extend(_flatten(L, s))
+        else:
+            flat.append(L.as_cstatement(s))
+    return flat
+
+
+def _names(L, expr):
+    """Return the names of the symbols in an expression."""
+    if isinstance(expr, L.Symbol):
+        return {expr.name}
+    elif isinstance(expr, L.ArrayAccess):
+        return {expr.array.name}.union(*(_names(L, i) for i in expr.indices))
+    elif isinstance(expr, L.BinOp):
+        return _names(L, expr.lhs) | _names(L, expr.rhs)
+    elif isinstance(expr, L.NaryOp):
+        return set().union(*(_names(L, arg) for arg in expr.args))
+    elif isinstance(expr, L.UnaryOp):
+        return _names(L, expr.arg)
+    elif isinstance(expr, L.Conditional):
+        return _names(L, expr.condition) | _names(L, expr.true) | _names(L, expr.false)
+    elif isinstance(expr, L.Call):
+        return set().union(*(_names(L, arg) for arg in expr.arguments))
+    return set()
+
+
+def vectorize(L, statements, width, inputs, varying_scalars=()):
+    """Rewrite a kernel body to evaluate width lanes at once, with AoSoA inputs and outputs."""
+    vectorizer = CellVectorizer(L, width, inputs, varying_scalars)
+    vectorizer.varying = vectorizer.find_varying(statements)
+    return L.StatementList(vectorizer.vectorize(statements))
+
+
+def vectorize_cells(L, statements, width):
+    """Rewrite a kernel body to evaluate width cells at once, with AoSoA inputs and outputs."""
+    return vectorize(L, statements, width, cell_arrays, ("cell_permutation", ))
+
+
+def vectorize_ensemble(L, statements, size):
+    """Rewrite a kernel body to evaluate it for an ensemble of coefficients and constants at once.
+
+    The values of A, w and c are expected in AoSoA layout, while the
+    geometry is the same for all members of the ensemble.
+    """
+    return vectorize(L, statements, size, ensemble_arrays)
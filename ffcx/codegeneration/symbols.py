@@ -57,7 +57,7 @@ class FFCXBackendSymbols(object):
     """FFCX specific symbol definitions. Provides non-ufl symbols."""
 
     def __init__(self, language, coefficient_numbering, coefficient_offsets,
-                 original_constant_offsets):
+                 original_constant_offsets, form_index=None):
         self.L = language
         self.S = self.L.Symbol
         self.coefficient_numbering = coefficient_numbering
@@ -65,6 +65,13 @@ class FFCXBackendSymbols(object):
 
         self.original_constant_offsets = original_constant_offsets
 
+        # Position of the form in fused kernels, which get arrays of
+        # element tensors, coefficients and constants of all forms
+        self.form_index = form_index
+
+        # Names of tables which have been moved to file scope
+        self.table_names = {}
+
         # Used for padding variable names based on restriction
 #        self.restriction_postfix = {r: ufc_restriction_postfix(r) for r in ("+", "-", None)}
 
@@ -75,7 +82,17 @@ class FFCXBackendSymbols(object):
 
     def element_tensor(self):
         """Symbol for the element tensor itself."""
-        return self.S("A")
+        return self.form_argument("A")
+
+    def form_argument(self, name):
+        """Symbol for a kernel argument of the form, in the array of all forms in fused kernels."""
+        if self.form_index is None:
+            return self.S(name)
+        return self.S(name)[self.form_index]
+
+    def trial_dofs(self):
+        """Symbol for the trial function dofs in action kernels."""
+        return self.S("trial_dofs")
 
     def entity(self, entitytype, restriction):
         """Entity index for lookup in element tables."""
@@ -180,7 +197,7 @@ class FFCXBackendSymbols(object):
 
     def weights_table(self, quadrature_rule):
         """Table of quadrature weights."""
-        return self.S(f"weights_{quadrature_rule.id()}")
+        return self.named_table(f"weights_{quadrature_rule.id()}")
 
     def points_table(self, quadrature_rule):
         """Table of quadrature points (points on the reference integration entity)."""
@@ -216,23 +233,25 @@ class FFCXBackendSymbols(object):
     def coefficient_dof_access(self, coefficient, dof_number):
         # TODO: Add domain number?
         offset = self.coefficient_offsets[coefficient]
-        w = self.S("w")
+        w = self.form_argument("w")
         return w[offset + dof_number]
 
     def coefficient_value(self, mt):
         """Symbol for variable holding value or derivative component of coefficient."""
 
         c = self.coefficient_numbering[mt.terminal]
-        return self.S(format_mt_name("w%d" % (c, ), mt))
+        if self.form_index is None:
+            return self.S(format_mt_name("w%d" % (c, ), mt))
+        return self.S(format_mt_name("w%d_f%d" % (c, self.form_index), mt))
 
     def constant_index_access(self, constant, index):
         offset = self.original_constant_offsets[constant]
-        c = self.S("c")
+        c = self.form_argument("c")
 
         return c[offset + index]
 
     def named_table(self, name):
-        return self.S(name)
+        return self.S(self.table_names.get(name, name))
 
     def element_table(self, tabledata, entitytype, restriction):
         entity = self.entity(entitytype, restriction)
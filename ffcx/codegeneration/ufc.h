@@ -291,6 +291,141 @@ extern "C"
       const uint8_t* restrict quadrature_permutation,
       uint32_t cell_permutation);
 
+  /// Tabulate integral into tensors A of a batch of cells (or facets
+  /// or vertices) with compiled quadrature rule
+  ///
+  /// The arguments are those of ufc_tabulate_tensor for all entities
+  /// in the batch, stored contiguously, one entity after the other.
+  /// The constants c are shared by all entities.
+  ///
+  /// @param[in] num_cells Number of entities in the batch.
+  /// @param[out] A Element tensors. Dimensions: A[num_cells][...].
+  /// @param[in] w Coefficients. Dimensions: w[num_cells][...].
+  /// @param[in] c Constants. Dimensions: c[constant][dim].
+  /// @param[in] coordinate_dofs Coordinate dofs.
+  ///         Dimensions: coordinate_dofs[num_cells][...].
+  /// @param[in] entity_local_index Local entity indices.
+  ///         Dimensions: entity_local_index[num_cells][...], or a null
+  ///         pointer for cell integrals.
+  /// @param[in] quadrature_permutation Quadrature permutations.
+  ///         Dimensions: quadrature_permutation[num_cells][...], or a
+  ///         null pointer if not used.
+  /// @param[in] cell_permutations Cell permutation of each entity, or
+  ///         a null pointer if not used.
+  ///
+  /// @see ufc_tabulate_tensor
+  ///
+  typedef void(ufc_tabulate_tensor_batch)(
+      int num_cells, ufc_scalar_t* restrict A,
+      const ufc_scalar_t* restrict w, const ufc_scalar_t* restrict c,
+      const double* restrict coordinate_dofs,
+      const int* restrict entity_local_index,
+      const uint8_t* restrict quadrature_permutation,
+      const uint32_t* restrict cell_permutations);
+
+  /// Tabulate the action of the element tensor of a bilinear form
+  /// integral on the trial function dofs, without forming the element
+  /// tensor, i.e. A[i] += sum_j A_local[i][j] * trial_dofs[j]
+  ///
+  /// @param[out] A Action of the element tensor.
+  ///         Dimensions: A[num_test_dofs].
+  /// @param[in] trial_dofs Values of the trial function dofs.
+  ///         Dimensions: trial_dofs[num_trial_dofs].
+  ///
+  /// The other arguments are those of ufc_tabulate_tensor. For interior
+  /// facet integrals, the dofs of both cells are included. The kernel
+  /// is optional, i.e. ufc_integral.tabulate_action is a null pointer
+  /// if it has not been generated.
+  ///
+  /// @see ufc_tabulate_tensor
+  ///
+  typedef void(ufc_tabulate_action)(
+      ufc_scalar_t* restrict A, const ufc_scalar_t* restrict trial_dofs,
+      const ufc_scalar_t* restrict w, const ufc_scalar_t* restrict c,
+      const double* restrict coordinate_dofs,
+      const int* restrict entity_local_index,
+      const uint8_t* restrict quadrature_permutation,
+      uint32_t cell_permutation);
+
+  /// Tabulate the diagonal of the element tensor of a bilinear form
+  /// integral with square element tensor, without computing the other
+  /// entries, i.e. A[i] += A_local[i][i]
+  ///
+  /// @param[out] A Diagonal of the element tensor.
+  ///         Dimensions: A[num_dofs].
+  ///
+  /// The other arguments are those of ufc_tabulate_tensor. The kernel
+  /// is optional, i.e. ufc_integral.tabulate_diagonal is a null
+  /// pointer if it has not been generated.
+  ///
+  /// @see ufc_tabulate_tensor
+  ///
+  typedef void(ufc_tabulate_diagonal)(
+      ufc_scalar_t* restrict A, const ufc_scalar_t* restrict w,
+      const ufc_scalar_t* restrict c, const double* restrict coordinate_dofs,
+      const int* restrict entity_local_index,
+      const uint8_t* restrict quadrature_permutation,
+      uint32_t cell_permutation);
+
+  /// Tabulate the integrals over the same domain of several forms
+  /// compiled together at once, sharing the evaluation of geometry
+  /// and coefficients
+  ///
+  /// @param[out] A
+  ///         Element tensors of the forms, A[k] is the element tensor of
+  ///         form k in the order the forms were compiled in, as for
+  ///         ufc_tabulate_tensor. Entries for forms without an integral
+  ///         over the domain are not accessed.
+  /// @param[in] w
+  ///         Coefficients of the forms, w[k] as for ufc_tabulate_tensor.
+  /// @param[in] c
+  ///         Constants of the forms, c[k] as for ufc_tabulate_tensor.
+  ///
+  /// The other arguments are those of ufc_tabulate_tensor. The kernel
+  /// is optional, i.e. ufc_integral.tabulate_fused is a null pointer
+  /// if it has not been generated. It is shared by the integrals of
+  /// all fused forms.
+  ///
+  /// @see ufc_tabulate_tensor
+  ///
+  typedef void(ufc_tabulate_fused)(
+      ufc_scalar_t* const* A, const ufc_scalar_t* const* w,
+      const ufc_scalar_t* const* c, const double* restrict coordinate_dofs,
+      const int* restrict entity_local_index,
+      const uint8_t* restrict quadrature_permutation,
+      uint32_t cell_permutation);
+
+  /// Tabulate the element tensors of an integral for an ensemble of
+  /// sets of coefficients and constants on the same integration
+  /// entity, sharing the evaluation of geometry
+  ///
+  /// @param[out] A
+  ///         Element tensors of the members of the ensemble, as for
+  ///         ufc_tabulate_tensor.
+  ///         Dimensions: A[ensemble_size][tensor_size].
+  /// @param[in] w
+  ///         Coefficients of the members of the ensemble, as for
+  ///         ufc_tabulate_tensor.
+  ///         Dimensions: w[ensemble_size][coefficients_size].
+  /// @param[in] c
+  ///         Constants of the members of the ensemble, as for
+  ///         ufc_tabulate_tensor.
+  ///         Dimensions: c[ensemble_size][constants_size].
+  ///
+  /// The other arguments are those of ufc_tabulate_tensor, and are the
+  /// same for all members. The kernel is optional, i.e.
+  /// ufc_integral.tabulate_ensemble is a null pointer if it has not
+  /// been generated.
+  ///
+  /// @see ufc_tabulate_tensor
+  ///
+  typedef void(ufc_tabulate_ensemble)(
+      ufc_scalar_t* restrict A, const ufc_scalar_t* restrict w,
+      const ufc_scalar_t* restrict c, const double* restrict coordinate_dofs,
+      const int* restrict entity_local_index,
+      const uint8_t* restrict quadrature_permutation,
+      uint32_t cell_permutation);
+
   /// Tabulate integral into tensor A with runtime quadrature rule
   ///
   /// @see ufc_tabulate_tensor
@@ -306,6 +441,15 @@ extern "C"
   {
     const bool* enabled_coefficients;
     ufc_tabulate_tensor* tabulate_tensor;
+    ufc_tabulate_tensor_batch* tabulate_tensor_batch;
+    ufc_tabulate_action* tabulate_action;
+    ufc_tabulate_diagonal* tabulate_diagonal;
+    ufc_tabulate_fused* tabulate_fused;
+    ufc_tabulate_ensemble* tabulate_ensemble;
+
+    /// Number of members of the ensembles of tabulate_ensemble
+    int ensemble_size;
+
     bool needs_transformation_data;
   } ufc_integral;
 
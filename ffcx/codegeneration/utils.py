@@ -6,10 +6,27 @@
 # SPDX-License-Identifier:    LGPL-3.0-or-later
 
 # TODO: Move these to ffcx.language utils?
+import hashlib
+
 import numpy
 index_type = "int"
 
 
+def shared_table_name(prefix, decl, precision):
+    """Return a file scope name for a static table declaration, based on a hash of its contents.
+
+    Identical tables get the same name, so they only need to be defined once
+    for all kernels in a module.
+    """
+    values = numpy.ascontiguousarray(decl.values)
+    typename = getattr(decl, "typename", "")
+    h = hashlib.sha1()
+    h.update(repr((type(decl).__name__, typename, decl.sizes, decl.padlen, precision,
+                   values.dtype.str, values.shape)).encode())
+    h.update(values.tobytes())
+    return f"{prefix}_{h.hexdigest()[:16]}"
+
+
 def generate_return_new(L, classname):
     return L.Return(L.Call("create_" + classname))
 
@@ -129,7 +146,7 @@ def make_transformation_data(L, base_transformations, cell_shape, inverse=False,
 
 def apply_transformations_to_data(L, base_transformations, cell_shape, data, inverse=False,
                                   transpose=False,
-                                  indices=lambda dof: dof, ranges=None, dtype="double"):
+                                  indices=lambda dof: dof, ranges=None, dtype="double", max_unroll=-1):
     transformation_data = make_transformation_data(
         L, base_transformations, cell_shape, inverse=inverse, transpose=transpose)
 
@@ -137,22 +154,11 @@ def apply_transformations_to_data(L, base_transformations, cell_shape, data, inv
     apply_transformations = []
     temporary_variables = 0
     for entity_transformation, value, transformation in transformation_data:
-        body = []
-
-        # Use temporary variables t0, t1, ... to store current data
-        temps = {}
-        for index, row in enumerate(transformation):
-            if not numpy.allclose(row, [1 if i == index else 0 for i, j in enumerate(row)]):
-                for dof, w in enumerate(row):
-                    if not numpy.isclose(w, 0) and dof not in temps:
-                        temps[dof] = L.Symbol("t" + str(len(temps)))
-                body.append(L.Assign(data[indices(index)],
-                                     sum(temps[dof] if numpy.isclose(w, 1) else w * temps[dof]
-                                         for dof, w in enumerate(row) if not numpy.isclose(w, 0))))
-        temporary_variables = max(temporary_variables, len(temps))
+        rows = [index for index, row in enumerate(transformation)
+                if not numpy.allclose(row, [1 if i == index else 0 for i, j in enumerate(row)])]
 
         # If no changes would be made, continue to next entity
-        if len(body) == 0:
+        if len(rows) == 0:
             continue
 
         if value is None:
@@ -160,6 +166,25 @@ def apply_transformations_to_data(L, base_transformations, cell_shape, data, inv
         else:
             condition = L.EQ(entity_transformation, value)
 
+        if 0 <= max_unroll < len(rows):
+            # Too many rows to unroll, loop over static tables instead
+            apply_transformations.append(L.If(condition, _compact_transformation(
+                L, transformation, rows, data, indices, ranges, dtype)))
+            continue
+
+        # Use temporary variables t0, t1, ... to store current data
+        body = []
+        temps = {}
+        for index in rows:
+            row = transformation[index]
+            for dof, w in enumerate(row):
+                if not numpy.isclose(w, 0) and dof not in temps:
+                    temps[dof] = L.Symbol("t" + str(len(temps)))
+            body.append(L.Assign(data[indices(index)],
+                                 sum(temps[dof] if numpy.isclose(w, 1) else w * temps[dof]
+                                     for dof, w in enumerate(row) if not numpy.isclose(w, 0))))
+        temporary_variables = max(temporary_variables, len(temps))
+
         body = [L.Assign(t, data[indices(dof)]) for dof, t in temps.items()] + body
         if ranges is None:
             apply_transformations.append(L.If(condition, body))
@@ -174,6 +199,33 @@ def apply_transformations_to_data(L, base_transformations, cell_shape, data, inv
     return apply_transformations
 
 
+def _compact_transformation(L, transformation, rows, data, indices, ranges, dtype):
+    """Apply the given rows of a transformation with loops over static tables of the rows and their values."""
+    cols = sorted({dof for index in rows for dof, w in enumerate(transformation[index]) if not numpy.isclose(w, 0)})
+    values = numpy.array([[transformation[index][dof] for dof in cols] for index in rows])
+
+    rows_sym = L.Symbol("transform_rows")
+    cols_sym = L.Symbol("transform_cols")
+    values_sym = L.Symbol("transform_values")
+    temps = L.Symbol("transform_temps")
+    r = L.Symbol("transform_r")
+    c = L.Symbol("transform_c")
+
+    body = [L.ArrayDecl(dtype, temps, len(cols)),
+            L.ForRange(c, 0, len(cols), index_type=index_type,
+                       body=L.Assign(temps[c], data[indices(cols_sym[c])])),
+            L.ForRange(r, 0, len(rows), index_type=index_type, body=[
+                L.Assign(data[indices(rows_sym[r])], 0),
+                L.ForRange(c, 0, len(cols), index_type=index_type,
+                           body=L.AssignAdd(data[indices(rows_sym[r])], values_sym[r, c] * temps[c]))])]
+    if ranges is not None:
+        body = [L.ForRanges(*ranges, index_type=index_type, body=body)]
+
+    return [L.ArrayDecl("static const int", rows_sym, len(rows), values=rows),
+            L.ArrayDecl("static const int", cols_sym, len(cols), values=cols),
+            L.ArrayDecl("static const double", values_sym, values.shape, values=values)] + body
+
+
 def entity_reflection(L, i, cell_shape):
     """Returns the bool that says whether or not an entity has been reflected."""
     cell_info = L.Symbol("cell_permutation")
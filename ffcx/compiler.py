@@ -61,24 +61,46 @@ Compiler stages:
    to the UFC format, generating as output one or more .h/.c files
    conforming to the UFC format.
 
+With the parameter streaming, stages 2-4 are instead interleaved for
+integrals and expressions: the IR of each is computed, its code generated
+and written to the output source file, and released, one at a time.
+
 """
 
 import logging
 import os
+import sys
 import typing
 from time import time
 
 from ffcx.analysis import analyze_ufl_objects
-from ffcx.codegeneration.codegeneration import generate_code
-from ffcx.formatting import format_code
+from ffcx.codegeneration.codegeneration import (generate_code,
+                                                generate_code_blocks)
+from ffcx.formatting import format_code, format_code_streaming
 from ffcx.ir.representation import compute_ir
 
+try:
+    import resource
+except ImportError:
+    resource = None
+
 logger = logging.getLogger("ffcx")
 
 
+def peak_memory():
+    """Return the peak resident memory of this process in MB, or None if not available."""
+    if resource is None:
+        return None
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Reported in bytes on macOS, and in kilobytes elsewhere
+    return maxrss / 1024**2 if sys.platform == "darwin" else maxrss / 1024
+
+
 def _print_timing(stage, timing):
-    logger.info("Compiler stage {stage} finished in {time:.4f} seconds.".format(
-        stage=stage, time=timing))
+    memory = peak_memory()
+    memory = "" if memory is None else f" (peak memory {memory:.1f} MB)"
+    logger.info("Compiler stage {stage} finished in {time:.4f} seconds{memory}.".format(
+        stage=stage, time=timing, memory=memory))
 
 
 def compile_ufl_objects(ufl_objects: typing.Union[typing.List, typing.Tuple],
@@ -93,6 +115,9 @@ def compile_ufl_objects(ufl_objects: typing.Union[typing.List, typing.Tuple],
     @param ufl_objects:
         Objects to be compiled. Accepts elements, forms, integrals or coordinate mappings.
 
+    Returns the header and the source code, which is a list of translation
+    units if the parameter translation_units is not 1.
+
     """
     if prefix != os.path.basename(prefix):
         raise RuntimeError("Invalid prefix, looks like a full path? prefix='{}'.".format(prefix))
@@ -118,3 +143,40 @@ def compile_ufl_objects(ufl_objects: typing.Union[typing.List, typing.Tuple],
     _print_timing(4, time() - cpu_time)
 
     return code_h, code_c
+
+
+def compile_ufl_objects_streaming(ufl_objects: typing.Union[typing.List, typing.Tuple],
+                                  c_file: typing.TextIO,
+                                  object_names: typing.Dict = {},
+                                  prefix: str = None,
+                                  parameters: typing.Dict = None,
+                                  visualise: bool = False):
+    """Generate UFC code for given UFL objects, writing the source to c_file while it is generated.
+
+    Only the IR of one integral or expression is held in memory at a
+    time, and the generated source is never held in memory as a whole.
+    The parameter streaming must be set. Returns the header code.
+
+    """
+    if prefix != os.path.basename(prefix):
+        raise RuntimeError("Invalid prefix, looks like a full path? prefix='{}'.".format(prefix))
+    if not parameters.get("streaming", False):
+        raise RuntimeError("Streaming compilation requires the parameter streaming.")
+
+    # Stage 1: analysis
+    cpu_time = time()
+    analysis = analyze_ufl_objects(ufl_objects, parameters)
+    _print_timing(1, time() - cpu_time)
+
+    # Stage 2: intermediate representation, except for integrals and
+    # expressions, which is computed on demand in the next stage
+    cpu_time = time()
+    ir = compute_ir(analysis, object_names, prefix, parameters, visualise)
+    _print_timing(2, time() - cpu_time)
+
+    # Stages 3 and 4: generate, format and write code one object at a time
+    cpu_time = time()
+    code_h = format_code_streaming(generate_code_blocks(ir, parameters), parameters, c_file)
+    _print_timing("3-4", time() - cpu_time)
+
+    return code_h
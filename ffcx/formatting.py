@@ -21,6 +21,7 @@ from collections import namedtuple
 
 from ffcx import __version__ as FFCX_VERSION
 from ffcx.codegeneration import __version__ as UFC_VERSION
+from ffcx.codegeneration.codegeneration import format_tables
 
 logger = logging.getLogger("ffcx")
 
@@ -60,12 +61,70 @@ c_extern_post = """
 
 
 def format_code(code: namedtuple, parameters):
-    """Format given code in UFC format. Returns two strings with header and source file contents."""
+    """Format given code in UFC format. Returns two strings with header and source file contents.
+
+    If the parameter translation_units is not 1, the source is instead
+    a list of strings: a glue unit with elements, dofmaps, coordinate
+    mappings and forms, followed by units with the integral and
+    expression kernels.
+
+    """
 
     logger.info(79 * "*")
     logger.info("Compiler stage 5: Formatting code")
     logger.info(79 * "*")
 
+    code_h_pre, code_h_post, code_c_pre = _generate_preamble(parameters)
+
+    code_h = ""
+    code_c = ""
+
+    for parts_code in code:
+        code_h += "".join([c[0] for c in parts_code])
+        code_c += "".join([c[1] for c in parts_code])
+
+    num_units = parameters.get("translation_units", 1)
+    if num_units != 1:
+        # Every unit declares all objects, as they may refer to each other
+        code_c = _format_units(code, code_c_pre + code_h, num_units)
+    else:
+        code_c = code_c_pre + code_c
+
+    # Add headers to body
+    code_h = code_h_pre + code_h + code_h_post
+
+    return code_h, code_c
+
+
+def format_code_streaming(code, parameters, c_file):
+    """Format code of objects one at a time, writing the source to c_file as it is generated.
+
+    Static tables are defined just before the first kernel using them.
+    Returns the header file contents.
+
+    """
+    if parameters.get("translation_units", 1) != 1:
+        raise RuntimeError("Streaming code generation writes a single translation unit.")
+
+    code_h_pre, code_h_post, code_c_pre = _generate_preamble(parameters)
+    c_file.write(code_c_pre)
+
+    code_h = ""
+    defined_tables = set()
+    for declaration, implementation, *tables in code:
+        code_h += declaration
+        if tables:
+            tables = {name: t for name, t in tables[0].items() if name not in defined_tables}
+            if tables:
+                c_file.write(format_tables(tables))
+                defined_tables.update(tables)
+        c_file.write(implementation)
+
+    return code_h_pre + code_h + code_h_post
+
+
+def _generate_preamble(parameters):
+    """Generate code before and after the contents of the header, and before the source."""
     # Generate code for comment at top of file
     code_h_pre = _generate_comment(parameters) + "\n"
     code_c_pre = _generate_comment(parameters) + "\n"
@@ -88,23 +147,56 @@ def format_code(code: namedtuple, parameters):
     code_h_pre += c_extern_pre
     code_h_post = c_extern_post
 
-    code_h = ""
-    code_c = ""
+    return code_h_pre, code_h_post, code_c_pre
 
-    for parts_code in code:
-        code_h += "".join([c[0] for c in parts_code])
-        code_c += "".join([c[1] for c in parts_code])
 
-    # Add headers to body
-    code_h = code_h_pre + code_h + code_h_post
-    code_c = code_c_pre + code_c
+def _format_units(code, pre, num_units):
+    """Format source code split into a glue unit and units of kernels.
 
-    return code_h, code_c
+    Kernels are distributed over num_units units (one per kernel if 0),
+    balanced by the size of their code. Each unit defines the static tables
+    used by its kernels.
+
+    """
+    glue = "".join(c[1] for parts_code in (code.elements, code.dofmaps, code.coordinate_mappings, code.forms)
+                   for c in parts_code)
+    kernels = list(code.integrals) + list(code.fused_integrals) + list(code.expressions)
+    sizes = [len(c[1]) + sum(len(t) for t in c[2].values()) for c in kernels]
+
+    # Assign largest kernels first, each to the currently smallest unit
+    num_units = min(num_units, len(kernels)) if num_units > 0 else len(kernels)
+    units = [[] for i in range(num_units)]
+    unit_sizes = [0] * num_units
+    for i in sorted(range(len(kernels)), key=lambda i: -sizes[i]):
+        j = unit_sizes.index(min(unit_sizes))
+        units[j].append(i)
+        unit_sizes[j] += sizes[i]
+    logger.info(f"Splitting {len(kernels)} kernels into {num_units} translation units of sizes {unit_sizes}")
+
+    sources = [pre + glue]
+    for unit in units:
+        tables = {}
+        for i in sorted(unit):
+            tables.update(kernels[i][2])
+        source = pre
+        if tables:
+            source += format_tables(tables)
+        source += "".join(kernels[i][1] for i in sorted(unit))
+        sources.append(source)
+    return sources
 
 
 def write_code(code_h, code_c, prefix, output_dir):
     _write_file(code_h, prefix, ".h", output_dir)
-    _write_file(code_c, prefix, ".c", output_dir)
+    if code_c is None:
+        # Source has already been written while streaming
+        pass
+    elif isinstance(code_c, str):
+        _write_file(code_c, prefix, ".c", output_dir)
+    else:
+        # Glue unit, followed by units of kernels
+        for i, source in enumerate(code_c):
+            _write_file(source, prefix if i == 0 else f"{prefix}_{i}", ".c", output_dir)
 
 
 def _write_file(output, prefix, postfix, output_dir):
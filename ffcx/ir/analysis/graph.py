@@ -5,6 +5,7 @@
 # SPDX-License-Identifier:    LGPL-3.0-or-later
 """Linearized data structure for the computational graph."""
 
+import array
 import logging
 
 import numpy
@@ -17,34 +18,190 @@ from ffcx.ir.analysis.valuenumbering import ValueNumberer
 logger = logging.getLogger("ffcx")
 
 
+class Adjacency(object):
+    """Compressed sparse row (CSR) representation of adjacency lists.
+
+    adj[i] is an integer array of the neighbours of node i, in the
+    order the corresponding edges were inserted."""
+
+    __slots__ = ("offsets", "indices")
+
+    def __init__(self, num_nodes, sources, targets):
+        sources = numpy.frombuffer(sources, dtype=numpy.int32) if len(sources) else numpy.zeros(0, numpy.int32)
+        targets = numpy.frombuffer(targets, dtype=numpy.int32) if len(targets) else numpy.zeros(0, numpy.int32)
+
+        # Stable sort keeps the insertion order of edges from each node
+        order = numpy.argsort(sources, kind="stable")
+        self.indices = targets[order]
+        self.offsets = numpy.zeros(num_nodes + 1, dtype=numpy.int64)
+        numpy.cumsum(numpy.bincount(sources, minlength=num_nodes), out=self.offsets[1:])
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return self.indices[self.offsets[i]:self.offsets[i + 1]]
+
+    def items(self):
+        for i in range(len(self)):
+            yield i, self[i]
+
+
+class ExpressionInterner(object):
+    """Mapping from UFL expressions to integer indices, keyed by structure.
+
+    Each expression object is looked up by identity first. An object
+    seen for the first time gets a structural key made of its type code
+    and the serial numbers of its operands (terminals are their own
+    key), so equal subexpressions share a key while deep expressions
+    are never hashed or compared recursively. Keys are computed once
+    per object, which makes a full graph traversal linear in its size.
+    """
+
+    def __init__(self):
+        # id(expr) -> (expr, serial), holding expr keeps the id valid
+        self._by_id = {}
+        # Structural key -> serial number
+        self._serials = {}
+        # Serial number -> (first inserted expression, index)
+        self._entries = {}
+
+    def _serial(self, expr):
+        """Return the serial number of the structural key of expr."""
+        entry = self._by_id.get(id(expr))
+        if entry is not None:
+            return entry[1]
+
+        by_id = self._by_id
+        stack = [expr]
+        while stack:
+            e = stack[-1]
+            if id(e) in by_id:
+                stack.pop()
+                continue
+            if e._ufl_is_terminal_:
+                key = e
+            else:
+                missing = [o for o in e.ufl_operands if id(o) not in by_id]
+                if missing:
+                    stack.extend(missing)
+                    continue
+                key = (e._ufl_typecode_, ) + tuple(by_id[id(o)][1] for o in e.ufl_operands)
+            by_id[id(e)] = (e, self._serials.setdefault(key, len(self._serials)))
+            stack.pop()
+        return by_id[id(expr)][1]
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __iter__(self):
+        return (e for e, i in self._entries.values())
+
+    def __contains__(self, expr):
+        return self._serial(expr) in self._entries
+
+    def __getitem__(self, expr):
+        entry = self._entries.get(self._serial(expr))
+        if entry is None:
+            raise KeyError(expr)
+        return entry[1]
+
+    def __setitem__(self, expr, index):
+        s = self._serial(expr)
+        entry = self._entries.get(s)
+        self._entries[s] = (expr if entry is None else entry[0], index)
+
+    def get(self, expr, default=None):
+        entry = self._entries.get(self._serial(expr))
+        return default if entry is None else entry[1]
+
+
 class ExpressionGraph(object):
     """A directed multi-edge graph.
     ExpressionGraph allows multiple edges between the same nodes,
-    and respects the insertion order of nodes and edges."""
+    and respects the insertion order of nodes and edges.
+
+    Nodes are identified by integers 0, 1, ... in insertion order.
+    Node attributes are stored columnwise, one list or array per
+    attribute indexed by node id. Edges are appended to flat integer
+    arrays and compressed to CSR form the first time they are queried.
+    """
+
+    # Possible values of the status attribute, stored as indices into this tuple
+    statuses = ("inactive", "active", "piecewise", "varying")
 
     def __init__(self):
 
-        # Data structures for directed multi-edge graph
-        self.nodes = {}
-        self.out_edges = {}
-        self.in_edges = {}
+        # Node attributes
+        self.expressions = []  # UFL expression of each node
+        self.targets = []  # None, or True/list of argument keys for target nodes
+        self.components = []  # None, or list of components of target nodes
+        self.mts = []  # None, or modified terminal of the node expression
+        self.trs = []  # None, or unique table reference of the modified terminal
+        self.status = numpy.zeros(0, dtype=numpy.uint8)  # See statuses
 
-    def number_of_nodes(self):
-        return len(self.nodes)
+        # Lookup from expression to node id
+        self.e2i = ExpressionInterner()
 
-    def add_node(self, key, **kwargs):
-        """Add a node with optional properties."""
-        self.nodes[key] = kwargs
-        self.out_edges[key] = []
-        self.in_edges[key] = []
+        # Edges from _edge_sources[k] to _edge_targets[k]
+        self._edge_sources = array.array("i")
+        self._edge_targets = array.array("i")
+        self._out_edges = None
+        self._in_edges = None
+
+    def number_of_nodes(self):
+        return len(self.expressions)
+
+    def add_node(self, expression):
+        """Add a node for expression and return its id."""
+        key = len(self.expressions)
+        self.expressions.append(expression)
+        self.targets.append(None)
+        self.components.append(None)
+        self.mts.append(None)
+        self.trs.append(None)
+        self._out_edges = None
+        self._in_edges = None
+        return key
 
     def add_edge(self, node1, node2):
         """Add a directed edge from node1 to node2."""
-        if node1 not in self.nodes or node2 not in self.nodes:
+        n = len(self.expressions)
+        if not (0 <= node1 < n and 0 <= node2 < n):
             raise KeyError("Adding edge to unknown node")
 
-        self.out_edges[node1] += [node2]
-        self.in_edges[node2] += [node1]
+        self._edge_sources.append(node1)
+        self._edge_targets.append(node2)
+        self._out_edges = None
+        self._in_edges = None
+
+    @property
+    def out_edges(self):
+        """Adjacency of outgoing edges, out_edges[i] is an array of node ids."""
+        if self._out_edges is None:
+            self._out_edges = Adjacency(self.number_of_nodes(), self._edge_sources, self._edge_targets)
+        return self._out_edges
+
+    @property
+    def in_edges(self):
+        """Adjacency of incoming edges, in_edges[i] is an array of node ids."""
+        if self._in_edges is None:
+            self._in_edges = Adjacency(self.number_of_nodes(), self._edge_targets, self._edge_sources)
+        return self._in_edges
+
+    def init_status(self, status="inactive"):
+        """Set the status of all nodes."""
+        self.status = numpy.full(self.number_of_nodes(), self.statuses.index(status), dtype=numpy.uint8)
+
+    def get_status(self, i):
+        return self.statuses[self.status[i]]
+
+    def set_status(self, i, status):
+        self.status[i] = self.statuses.index(status)
+
+    def nodes_with_status(self, status):
+        """Return ids of all nodes with given status, in insertion order."""
+        return numpy.flatnonzero(self.status == self.statuses.index(status))
 
 
 def build_graph_vertices(expressions, skip_terminal_modifiers=False):
@@ -56,15 +213,16 @@ def build_graph_vertices(expressions, skip_terminal_modifiers=False):
     GV = sorted(G.e2i, key=G.e2i.get)
 
     # Add nodes to 'new' graph structure
-    for i, v in enumerate(GV):
-        G.add_node(i, expression=v)
+    for v in GV:
+        G.add_node(v)
 
     for comp, expr in enumerate(expressions):
         # Get vertex index representing input expression root
         V_target = G.e2i[expr]
-        G.nodes[V_target]['target'] = True
-        G.nodes[V_target]['component'] = G.nodes[V_target].get("component", [])
-        G.nodes[V_target]['component'].append(comp)
+        G.targets[V_target] = True
+        if G.components[V_target] is None:
+            G.components[V_target] = []
+        G.components[V_target].append(comp)
 
     return G
 
@@ -78,14 +236,19 @@ def build_scalar_graph(expression):
     # Build more fine grained computational graph of scalar subexpressions
     scalar_expressions = rebuild_with_scalar_subexpressions(G)
 
+    return build_scalar_graph_from_components(scalar_expressions)
+
+
+def build_scalar_graph_from_components(scalar_expressions):
+    """Build list representation of expression graph of the scalar components of an expression."""
+
     # Build new list representation of graph where all
     # vertices of V represent single scalar operations
     G = build_graph_vertices(scalar_expressions, skip_terminal_modifiers=True)
 
     # Compute graph edges
     V_deps = []
-    for i, v in G.nodes.items():
-        expr = v['expression']
+    for expr in G.expressions:
         if expr._ufl_is_terminal_ or expr._ufl_is_terminal_modifier_:
             V_deps.append(())
         else:
@@ -129,8 +292,7 @@ def rebuild_with_scalar_subexpressions(G):
     W = numpy.empty(total_unique_symbols, dtype=object)
 
     # Iterate over each graph node in order
-    for i, v in G.nodes.items():
-        expr = v['expression']
+    for i, expr in enumerate(G.expressions):
         # Find symbols of v components
         vs = V_symbols[i]
 
@@ -210,7 +372,7 @@ def _count_nodes_with_unique_post_traversal(expressions, skip_terminal_modifiers
         else:
             return list(e.ufl_operands)
 
-    e2i = {}
+    e2i = ExpressionInterner()
     stack = [(expr, getops(expr)) for expr in reversed(expressions)]
     while stack:
         expr, ops = stack[-1]
@@ -39,6 +39,8 @@ class ValueNumberer(object):
                             ufl.classes.ComponentTensor: self.component_tensor,
                             ufl.classes.ListTensor: self.list_tensor,
                             ufl.classes.Variable: self.variable}
+        # Handlers resolved for each expression type, including parent class fallbacks
+        self._dispatch = {}
 
     def new_symbols(self, n):
         """Generator for new symbols with a running counter."""
@@ -54,23 +56,28 @@ class ValueNumberer(object):
         return begin
 
     def get_node_symbols(self, expr):
-        idx = [i for i, v in self.G.nodes.items() if v['expression'] == expr][0]
-        return self.V_symbols[idx]
+        return self.V_symbols[self.G.e2i[expr]]
+
+    def _handler(self, t):
+        """Find the handler for expression type t."""
+        # First look for exact type match
+        f = self.call_lookup.get(t)
+        if f is None:
+            # Look for parent class types instead
+            for k in self.call_lookup.keys():
+                if issubclass(t, k):
+                    f = self.call_lookup[k]
+                    break
+        return f
 
     def compute_symbols(self):
-        for i, v in self.G.nodes.items():
-            expr = v['expression']
-            symbol = None
-            # First look for exact type match
-            f = self.call_lookup.get(type(expr), False)
-            if f:
-                symbol = f(expr)
-            else:
-                # Look for parent class types instead
-                for k in self.call_lookup.keys():
-                    if isinstance(expr, k):
-                        symbol = self.call_lookup[k](expr)
-                        break
+        for expr in self.G.expressions:
+            t = type(expr)
+            f = self._dispatch.get(t)
+            if f is None:
+                f = self._handler(t)
+                self._dispatch[t] = f
+            symbol = f(expr) if f is not None else None
 
             if symbol is None:
                 # Nothing found
@@ -23,8 +23,7 @@ def visualise_graph(Gx, filename):
         return
 
     G = pgv.AGraph(strict=False, directed=True)
-    for nd, v in Gx.nodes.items():
-        ex = v['expression']
+    for nd, ex in enumerate(Gx.expressions):
         label = ex.__class__.__name__
         if isinstance(ex, Sum):
             label = '+'
@@ -42,18 +41,18 @@ def visualise_graph(Gx, filename):
         if isinstance(arg, Argument):
             G.get_node(nd).attr['shape'] = 'box'
 
-        t = v.get('target')
+        t = Gx.targets[nd]
         if t:
             G.get_node(nd).attr['label'] += ':' + str(t)
             G.get_node(nd).attr['shape'] = 'hexagon'
 
-        c = v.get('component')
+        c = Gx.components[nd]
         if c:
             G.get_node(nd).attr['label'] += f", comp={c}"
 
     for nd, eds in Gx.out_edges.items():
         for ed in eds:
-            G.add_edge(nd, ed)
+            G.add_edge(nd, int(ed))
 
     G.layout(prog='dot')
     G.draw(filename)
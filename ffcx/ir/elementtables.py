@@ -32,6 +32,9 @@ uniform_ttypes = ("fixed", "ones", "zeros", "uniform")
 valid_ttypes = set(("quadrature", )) | set(
     piecewise_ttypes) | set(uniform_ttypes)
 
+component_table_t = collections.namedtuple(
+    "component_table", ["values", "offset", "stride", "original_dim"])
+
 unique_table_reference_t = collections.namedtuple(
     "unique_table_reference",
     ["name", "values", "dofrange", "dofmap", "original_dim", "ttype", "is_piecewise", "is_uniform",
@@ -67,8 +70,13 @@ def clamp_table_small_numbers(table,
     return table
 
 
-def strip_table_zeros(table, block_size, rtol=default_rtol, atol=default_atol):
-    """Strip zero columns from table. Returns column range (begin, end) and the new compact table."""
+def strip_table_zeros(table, block_size, rtol=default_rtol, atol=default_atol, offset=0, stride=1):
+    """Strip zero columns from table. Returns column range (begin, end) and the new compact table.
+
+    The columns of table correspond to the dofs offset, offset + stride,
+    offset + 2*stride, ... of the full element, i.e. the table may
+    already be restricted to the dofs of a single sub element.
+    """
     # Get shape of table and number of columns, defined as the last axis
     table = numpy.asarray(table)
     sh = table.shape
@@ -76,7 +84,8 @@ def strip_table_zeros(table, block_size, rtol=default_rtol, atol=default_atol):
     # Find nonzero columns
     z = numpy.zeros(sh[:-1])  # Correctly shaped zero table
     dofmap = tuple(
-        i for i in range(sh[-1]) if not numpy.allclose(z, table[..., i], rtol=rtol, atol=atol))
+        offset + stride * i for i in range(sh[-1])
+        if not numpy.allclose(z, table[..., i], rtol=rtol, atol=atol))
     if dofmap:
         # Find first nonzero column
         begin = dofmap[0]
@@ -95,8 +104,16 @@ def strip_table_zeros(table, block_size, rtol=default_rtol, atol=default_atol):
         # If dofs are all in the same block component, keep only that block component
         dofmap = tuple(range(begin, end, block_size))
 
-    # Make subtable by dropping zero columns
-    stripped_table = table[..., dofmap]
+    # Make subtable by dropping zero columns, dofs not represented in
+    # the input table are known to be zero
+    columns = [(i - offset) // stride if (i - offset) % stride == 0 else None for i in dofmap]
+    if all(j is not None for j in columns):
+        stripped_table = table[..., columns]
+    else:
+        stripped_table = numpy.zeros(sh[:-1] + (len(dofmap), ), dtype=table.dtype)
+        for k, j in enumerate(columns):
+            if j is not None:
+                stripped_table[..., k] = table[..., j]
     dofrange = (begin, end)
     return dofrange, dofmap, stripped_table
 
@@ -133,8 +150,11 @@ def get_ffcx_table_values(points, cell, integral_type, ufl_element, avg, entityt
                           derivative_counts, flat_component):
     """Extract values from ffcx element table.
 
-    Returns a 3D numpy array with axes
-    (entity number, quadrature point number, dof number)
+    Returns a component_table_t, where values is a 3D numpy array with axes
+    (entity number, quadrature point number, dof number). For vector-valued
+    and mixed elements only the dofs of the sub element contributing to
+    flat_component are tabulated, column j holding the values of the dof
+    offset + stride * j of the full element with original_dim dofs.
     """
     deriv_order = sum(derivative_counts)
 
@@ -179,6 +199,12 @@ def get_ffcx_table_values(points, cell, integral_type, ufl_element, avg, entityt
     # Extract arrays for the right scalar component
     component_tables = []
     sh = ufl_element.value_shape()
+
+    # Columns of the extracted tables are the full element dofs
+    # offset, offset + stride, ..., unless restricted to a sub element below
+    offset = 0
+    stride = 1
+    original_dim = None
     if sh == ():
         # Scalar valued element
         for entity in range(num_entities):
@@ -243,6 +269,12 @@ def get_ffcx_table_values(points, cell, integral_type, ufl_element, avg, entityt
             if len(r) == 3:
                 return 1 + (r[1] - r[0] - 1) // r[2]
 
+        # The dofs of the sub element are ir[0], ir[0] + ir[2], ... in
+        # the full element, so only these columns are extracted here
+        offset = int(ir[0])
+        stride = int(ir[2]) if len(ir) == 3 else 1
+        original_dim = int(irange[-1])
+
         for entity in range(num_entities):
             entity_points = map_integral_points(
                 points, integral_type, cell, entity)
@@ -253,15 +285,9 @@ def get_ffcx_table_values(points, cell, integral_type, ufl_element, avg, entityt
             index = basix_index(*derivative_counts)
             tbl = tbl[index].transpose()
 
-            # Prepare a padded table with zeros
-            padded_shape = (basix_element.dim,) + basix_element.value_shape + (len(entity_points), )
-            padded_tbl = numpy.zeros(padded_shape, dtype=tbl.dtype)
-
             tab = tbl.reshape(slice_size(ir), slice_size(cr), -1)
 
-            padded_tbl[slice(*ir), slice(*cr)] = tab
-
-            component_tables.append(padded_tbl[:, flat_component, :])
+            component_tables.append(tab[:, flat_component - cr[0], :])
 
     if avg in ("cell", "facet"):
         # Compute numeric integral of the each component table
@@ -280,7 +306,9 @@ def get_ffcx_table_values(points, cell, integral_type, ufl_element, avg, entityt
     res = numpy.zeros(shape)
     for entity in range(num_entities):
         res[entity, :, :] = numpy.transpose(component_tables[entity])
-    return res
+    if original_dim is None:
+        original_dim = num_dofs
+    return component_table_t(res, offset, stride, original_dim)
 
 
 def generate_psi_table_name(quadrature_rule, element_counter, averaged, entitytype, derivative_counts,
@@ -430,11 +458,16 @@ def build_element_tables(quadrature_rule,
     Output:
       tables - dict(name: table)
       mt_table_names - dict(ModifiedTerminal: name)
+      table_origins - dict(name: (element, avg, derivatives, flat_component))
+      table_layouts - dict(name: (offset, stride, original_dim)), the table
+                      columns are the dofs offset, offset + stride, ...
+                      of the full element with original_dim dofs
 
     """
     mt_table_names = {}
     tables = {}
     table_origins = {}
+    table_layouts = {}
 
     # Add to element tables
     analysis = {}
@@ -463,49 +496,30 @@ def build_element_tables(quadrature_rule,
             tdim = cell.topological_dimension()
             if entitytype == "facet":
                 if tdim == 1:
-                    tables[name] = numpy.array([
-                        get_ffcx_table_values(quadrature_rule.points, cell,
-                                              integral_type, element, avg, entitytype,
-                                              local_derivatives, flat_component)])
+                    permuted_points = [quadrature_rule.points]
                 elif tdim == 2:
-                    # Extract the values of the table from ffc table format
-                    new_table = []
-                    for ref in range(2):
-                        new_table.append(get_ffcx_table_values(
-                            permute_quadrature_interval(
-                                quadrature_rule.points, ref),
-                            cell, integral_type, element, avg, entitytype, local_derivatives, flat_component))
-
-                    tables[name] = numpy.array(new_table)
+                    permuted_points = [permute_quadrature_interval(quadrature_rule.points, ref)
+                                       for ref in range(2)]
                 elif tdim == 3:
                     cell_type = cell.cellname()
                     if cell_type == "tetrahedron":
-                        # Extract the values of the table from ffc table format
-                        new_table = []
-                        for rot in range(3):
-                            for ref in range(2):
-                                new_table.append(get_ffcx_table_values(
-                                    permute_quadrature_triangle(
-                                        quadrature_rule.points, ref, rot),
-                                    cell, integral_type, element, avg, entitytype, local_derivatives, flat_component))
-
-                        tables[name] = numpy.array(new_table)
+                        permuted_points = [permute_quadrature_triangle(quadrature_rule.points, ref, rot)
+                                           for rot in range(3) for ref in range(2)]
                     elif cell_type == "hexahedron":
-                        # Extract the values of the table from ffc table format
-                        new_table = []
-                        for rot in range(4):
-                            for ref in range(2):
-                                new_table.append(get_ffcx_table_values(
-                                    permute_quadrature_quadrilateral(
-                                        quadrature_rule.points, ref, rot),
-                                    cell, integral_type, element, avg, entitytype, local_derivatives, flat_component))
-
-                        tables[name] = numpy.array(new_table)
+                        permuted_points = [permute_quadrature_quadrilateral(quadrature_rule.points, ref, rot)
+                                           for rot in range(4) for ref in range(2)]
             else:
-                # Extract the values of the table from ffc table format
-                tables[name] = numpy.array([get_ffcx_table_values(quadrature_rule.points, cell,
-                                                                  integral_type, element, avg, entitytype,
-                                                                  local_derivatives, flat_component)])
+                permuted_points = [quadrature_rule.points]
+
+            # Extract the values of the table from ffc table format
+            component_tables = [get_ffcx_table_values(points, cell, integral_type, element, avg, entitytype,
+                                                      local_derivatives, flat_component)
+                                for points in permuted_points]
+            tables[name] = numpy.array([t.values for t in component_tables])
+
+            # Track which dofs of the full element the table columns refer to
+            t = component_tables[0]
+            table_layouts[name] = (t.offset, t.stride, t.original_dim)
 
             # Track table origin for custom integrals:
             table_origins[name] = res
@@ -534,11 +548,12 @@ def build_element_tables(quadrature_rule,
         name = add_table(res)
         mt_table_names[mt] = name
 
-    return tables, mt_table_names, table_origins
+    return tables, mt_table_names, table_origins, table_layouts
 
 
 def optimize_element_tables(tables,
                             table_origins,
+                            table_layouts,
                             rtol=default_rtol,
                             atol=default_atol):
     """Optimize tables and make unique set.
@@ -556,6 +571,7 @@ def optimize_element_tables(tables,
     Input:
       tables - { name: table }
       table_origins - FIXME
+      table_layouts - { name: (offset, stride, original_dim) }
 
     Output:
       unique_tables - { unique_name: stripped_table }
@@ -577,14 +593,14 @@ def optimize_element_tables(tables,
         tbl = clamp_table_small_numbers(tbl, rtol=rtol, atol=atol)
 
         # Store original dof dimension before compressing
-        num_dofs = tbl.shape[3]
+        offset, stride, num_dofs = table_layouts[name]
         ufl_element = table_origins[name][0]
         block_size = 1
         if isinstance(ufl_element, ufl.VectorElement) or isinstance(ufl_element, ufl.TensorElement):
             block_size = len(ufl_element.sub_elements())
 
         dofrange, dofmap, tbl = strip_table_zeros(
-            tbl, block_size, rtol=rtol, atol=atol)
+            tbl, block_size, rtol=rtol, atol=atol, offset=offset, stride=stride)
 
         compressed_tables[name] = tbl
         table_ranges[name] = dofrange
@@ -704,7 +720,7 @@ def build_optimized_tables(quadrature_rule,
                            atol=default_atol):
 
     # Build tables needed by all modified terminals
-    tables, mt_table_names, table_origins = build_element_tables(
+    tables, mt_table_names, table_origins, table_layouts = build_element_tables(
         quadrature_rule,
         cell,
         integral_type,
@@ -716,7 +732,7 @@ def build_optimized_tables(quadrature_rule,
     # Optimize tables and get table name and dofrange for each modified terminal
     unique_tables, unique_table_origins, table_unames, table_ranges, table_dofmaps, table_permuted, \
         table_original_num_dofs = optimize_element_tables(
-            tables, table_origins, rtol=rtol, atol=atol)
+            tables, table_origins, table_layouts, rtol=rtol, atol=atol)
 
     # Get num_dofs for all tables before they can be deleted later
     unique_table_num_dofs = {uname: tbl.shape[-1]
@@ -14,11 +14,17 @@ import numpy
 import ufl
 from ffcx.ir.analysis.factorization import \
     compute_argument_factorization
-from ffcx.ir.analysis.graph import build_scalar_graph
+from ffcx.ir.analysis.graph import (build_scalar_graph,
+                                    build_scalar_graph_from_components)
 from ffcx.ir.analysis.modified_terminals import (
     analyse_modified_terminal, is_modified_terminal)
 from ffcx.ir.analysis.visualise import visualise_graph
-from ffcx.ir.elementtables import build_optimized_tables
+from ffcx.ir.elementtables import (build_optimized_tables,
+                                   clamp_table_small_numbers,
+                                   piecewise_ttypes)
+from ffcx.ir.sumfactorization import (diagonal_is_factorizable,
+                                      factorize_table, is_permutation,
+                                      quadrature_grid)
 from ufl.algorithms.balancing import balance_modifiers
 from ufl.checks import is_cellwise_constant
 from ufl.classes import QuadratureWeight
@@ -38,9 +44,14 @@ block_data_t = collections.namedtuple("block_data_t",
                                        "name",  # used in "preintegrated" and "premultiplied"
                                        "ma_data",  # used in "full", "safe" and "partial"
                                        "piecewise_ma_index",  # used in "partial"
-                                       "is_permuted"  # Do quad points on facets need to be permuted?
+                                       "is_permuted",  # Do quad points on facets need to be permuted?
+                                       "tensor_factors",  # 1D factors of the argument tables for sum factorization
+                                       "symmetric",  # "self" if symmetric, "pair" if summed with its transpose
                                        ])
 
+# Integral types supported by preintegration of blocks
+preintegration_integral_types = ("cell", "exterior_facet", "interior_facet")
+
 
 def compute_integral_ir(cell, integral_type, entitytype, integrands, argument_shape,
                         p, visualise):
@@ -62,6 +73,10 @@ def compute_integral_ir(cell, integral_type, entitytype, integrands, argument_sh
     ir["needs_transformation_data"] = 0
     ir["table_needs_transformation_data"] = {}
 
+    # Names of preintegrated blocks for each quadrature rule and
+    # argument tables
+    preintegrated_blocks = {}
+
     for quadrature_rule, integrand in integrands.items():
 
         expression = integrand
@@ -81,9 +96,9 @@ def compute_integral_ir(cell, integral_type, entitytype, integrands, argument_sh
         # efficiently before argument factorization. We can build
         # terminal_data again after factorization if that's necessary.
 
-        initial_terminals = {i: analyse_modified_terminal(v['expression'])
-                             for i, v in S.nodes.items()
-                             if is_modified_terminal(v['expression'])}
+        initial_terminals = {i: analyse_modified_terminal(expr)
+                             for i, expr in enumerate(S.expressions)
+                             if is_modified_terminal(expr)}
 
         (unique_tables, unique_table_types, unique_table_num_dofs,
          mt_unique_table_reference) = build_optimized_tables(
@@ -103,31 +118,34 @@ def compute_integral_ir(cell, integral_type, entitytype, integrands, argument_sh
             ir["table_dof_base_transformations"][td.name] = td.dof_base_transformations
             ir["table_dofmaps"][td.name] = td.dofmap
 
-        S_targets = [i for i, v in S.nodes.items() if v.get('target', False)]
-
-        if 'zeros' in unique_table_types.values() and len(S_targets) == 1:
-            # If there are any 'zero' tables, replace symbolically and rebuild graph
-            #
-            # TODO: Implement zero table elimination for non-scalar graphs
+        if 'zeros' in unique_table_types.values():
+            # If there are any 'zero' tables, replace symbolically and
+            # rebuild graph
+            num_operations = count_operations(S)
             for i, mt in initial_terminals.items():
                 # Set modified terminals with zero tables to zero
                 tr = mt_unique_table_reference.get(mt)
                 if tr is not None and tr.ttype == "zeros":
-                    S.nodes[i]['expression'] = ufl.as_ufl(0.0)
+                    S.expressions[i] = ufl.as_ufl(0.0)
 
             # Propagate expression changes using dependency list
-            for i, v in S.nodes.items():
-                deps = [S.nodes[j]['expression'] for j in S.out_edges[i]]
+            for i, expr in enumerate(S.expressions):
+                deps = [S.expressions[j] for j in S.out_edges[i]]
                 if deps:
-                    v['expression'] = v['expression']._ufl_expr_reconstruct_(*deps)
+                    S.expressions[i] = expr._ufl_expr_reconstruct_(*deps)
 
-            # Rebuild scalar target expressions and graph (this may be
-            # overkill and possible to optimize away if it turns out to be
-            # costly)
-            expression = S.nodes[S_targets[0]]['expression']
+            # Rebuild scalar list-based graph representation from the
+            # target expressions of all components
+            components = {}
+            for i, t in enumerate(S.targets):
+                if t:
+                    for comp in S.components[i]:
+                        components[comp] = S.expressions[i]
+            S = build_scalar_graph_from_components([components[comp] for comp in sorted(components)])
 
-            # Rebuild scalar list-based graph representation
-            S = build_scalar_graph(expression)
+            logger.info(f"Zero table elimination removed {num_operations - count_operations(S)} of "
+                        f"{num_operations} operations for quadrature rule {quadrature_rule.id()} "
+                        f"of {integral_type} integral.")
 
         # Output diagnostic graph as pdf
         if visualise:
@@ -138,18 +156,18 @@ def compute_integral_ir(cell, integral_type, entitytype, integrands, argument_sh
         F = compute_argument_factorization(S, rank)
 
         # Get the 'target' nodes that are factors of arguments, and insert in dict
-        FV_targets = [i for i, v in F.nodes.items() if v.get('target', False)]
+        FV_targets = [i for i, t in enumerate(F.targets) if t]
         argument_factorization = {}
 
         for fi in FV_targets:
             # Number of blocks using this factor must agree with number of components
             # to which this factor contributes. I.e. there are more blocks iff there are more
             # components
-            assert len(F.nodes[fi]['target']) == len(F.nodes[fi]['component'])
+            assert len(F.targets[fi]) == len(F.components[fi])
 
             k = 0
-            for w in F.nodes[fi]['target']:
-                comp = F.nodes[fi]['component'][k]
+            for w in F.targets[fi]:
+                comp = F.components[fi][k]
                 argument_factorization[w] = argument_factorization.get(w, [])
 
                 # Store tuple of (factor index, component index)
@@ -168,24 +186,29 @@ def compute_integral_ir(cell, integral_type, entitytype, integrands, argument_sh
 
         # Build set of modified_terminals for each mt factorized vertex in F
         # and attach tables, if appropriate
-        for i, v in F.nodes.items():
-            expr = v['expression']
+        for i, expr in enumerate(F.expressions):
             if is_modified_terminal(expr):
                 mt = analyse_modified_terminal(expr)
-                F.nodes[i]['mt'] = mt
-                tr = mt_unique_table_reference.get(mt)
-                if tr is not None:
-                    F.nodes[i]['tr'] = tr
+                F.mts[i] = mt
+                F.trs[i] = mt_unique_table_reference.get(mt)
 
         # Attach 'status' to each node: 'inactive', 'piecewise' or 'varying'
         analyse_dependencies(F, mt_unique_table_reference)
 
+        # Find the tensor-product structure of the quadrature points
+        # for sum factorization
+        grid = None
+        if p["sum_factorization"] and integral_type == "cell" \
+                and cell.cellname() in ("quadrilateral", "hexahedron"):
+            grid = quadrature_grid(quadrature_rule.points, rtol=p["table_rtol"], atol=p["table_atol"])
+        table_factors = {}
+
         # Loop over factorization terms
         block_contributions = collections.defaultdict(list)
         for ma_indices, fi_ci in sorted(argument_factorization.items()):
             # Get a bunch of information about this term
             assert rank == len(ma_indices)
-            trs = tuple(F.nodes[ai]['tr'] for ai in ma_indices)
+            trs = tuple(F.trs[ai] for ai in ma_indices)
 
             unames = tuple(tr.name for tr in trs)
             ttypes = tuple(tr.ttype for tr in trs)
@@ -201,13 +224,13 @@ def compute_integral_ir(cell, integral_type, entitytype, integrands, argument_sh
                 if trs[i].is_uniform:
                     r = None
                 else:
-                    r = F.nodes[ai]['mt'].restriction
+                    r = F.mts[ai].restriction
 
                 block_restrictions.append(r)
             block_restrictions = tuple(block_restrictions)
 
             # Check if each *each* factor corresponding to this argument is piecewise
-            all_factors_piecewise = all(F.nodes[ifi[0]]["status"] == 'piecewise' for ifi in fi_ci)
+            all_factors_piecewise = all(F.get_status(ifi[0]) == 'piecewise' for ifi in fi_ci)
             block_is_permuted = False
             for n in unames:
                 if unique_tables[n].shape[0] > 1:
@@ -218,26 +241,84 @@ def compute_integral_ir(cell, integral_type, entitytype, integrands, argument_sh
 
             block_is_transposed = False  # FIXME: Handle transposes for these block types
 
+            # Integrate the block at compile time if the factor is the
+            # same at all quadrature points, the kernel then only scales
+            # the preintegrated block by the factor
+            block_name = None
+            if p["preintegration"] and rank > 0 and all_factors_piecewise \
+                    and integral_type in preintegration_integral_types and not block_is_permuted \
+                    and "quadrature" not in ttypes and not any(tr.needs_transformation_data for tr in trs):
+                interior_facet = integral_type == "interior_facet"
+                tables = [tr.values[0] for tr in trs]
+                if preintegration_is_cheaper(len(quadrature_rule.weights), tables, interior_facet,
+                                             p["preintegration_max_table_size"]):
+                    block_name = preintegrated_blocks.get((quadrature_rule, unames))
+                    if block_name is None:
+                        ptable = integrate_block(quadrature_rule.weights, tables, interior_facet)
+                        ptable = clamp_table_small_numbers(ptable, rtol=p["table_rtol"], atol=p["table_atol"])
+                        block_name = "PI_" + "_".join(unames) + f"_Q{quadrature_rule.id()}"
+                        preintegrated_blocks[(quadrature_rule, unames)] = block_name
+                        unique_tables[block_name] = ptable
+                        unique_table_types[block_name] = "preintegrated"
+                        ir["table_needs_transformation_data"][block_name] = False
+
+            # Factorize the argument tables into 1D tables, dof
+            # transformations are then only supported if they permute
+            # the dofs
+            tensor_factors = None
+            if grid is not None and block_name is None and rank > 0 and all(tt == "varying" for tt in ttypes) \
+                    and all(not tr.needs_transformation_data or all(is_permutation(M) for M in
+                                                                    tr.dof_base_transformations) for tr in trs):
+                for n in unames:
+                    if n not in table_factors:
+                        table_factors[n] = factorize_table(unique_tables[n][0][0], grid,
+                                                           rtol=p["table_rtol"], atol=p["table_atol"])
+                if all(table_factors[n] is not None for n in unames):
+                    tensor_factors = tuple(table_factors[n] for n in unames)
+
+                # The diagonal of a sum factorized block uses the
+                # products of the 1D tables of both arguments
+                if tensor_factors is not None and p["tabulate_diagonal"] and rank == 2 \
+                        and set(blockmap[0]) & set(blockmap[1]) \
+                        and not diagonal_is_factorizable(blockmap, tensor_factors):
+                    tensor_factors = None
+
             block_unames = unames
             blockdata = block_data_t(ttypes, fi_ci,
                                      all_factors_piecewise, block_unames,
                                      block_restrictions, block_is_transposed,
-                                     block_is_uniform, None, tuple(ma_data), None, block_is_permuted)
+                                     block_is_uniform, block_name, tuple(ma_data), None, block_is_permuted,
+                                     tensor_factors, None)
 
             # Insert in expr_ir for this quadrature loop
             block_contributions[blockmap].append(blockdata)
 
+        # Compute only the upper triangle of symmetric blocks of
+        # bilinear forms
+        if p["symmetric_blocks"] and rank == 2 and integral_type != "expression":
+            for blockmap in block_contributions:
+                if blockmap[0] == blockmap[1]:
+                    block_contributions[blockmap] = find_symmetric_blocks(
+                        block_contributions[blockmap], len(blockmap[0]) ** 2, p["gemm_min_block_size"],
+                        p["hoist_piecewise_arguments"])
+
         # Figure out which table names are referenced
         active_table_names = set()
-        for i, v in F.nodes.items():
-            tr = v.get('tr')
-            if tr is not None and F.nodes[i]['status'] != 'inactive':
+        for i, tr in enumerate(F.trs):
+            if tr is not None and F.get_status(i) != 'inactive':
                 active_table_names.add(tr.name)
 
-        # Figure out which table names are referenced in blocks
+        # Figure out which table names are referenced in blocks, sum
+        # factorized blocks only use 1D tables and preintegrated blocks
+        # only their preintegrated table
         for blockmap, contributions in itertools.chain(
                 block_contributions.items()):
             for blockdata in contributions:
+                if blockdata.name is not None:
+                    active_table_names.add(blockdata.name)
+                    continue
+                if blockdata.tensor_factors is not None:
+                    continue
                 for mad in blockdata.ma_data:
                     active_table_names.add(mad.tabledata.name)
 
@@ -265,16 +346,16 @@ def compute_integral_ir(cell, integral_type, entitytype, integrands, argument_sh
 
         # Analyse active terminals to check what we'll need to generate code for
         active_mts = []
-        for i, v in F.nodes.items():
-            mt = v.get('mt', False)
-            if mt and F.nodes[i]['status'] != 'inactive':
+        for i, mt in enumerate(F.mts):
+            if mt and F.get_status(i) != 'inactive':
                 active_mts.append(mt)
 
         # Build IR dict for the given expressions
         # Store final ir for this num_points
         ir["integrand"][quadrature_rule] = {"factorization": F,
-                                            "modified_arguments": [F.nodes[i]['mt'] for i in argkeys],
-                                            "block_contributions": block_contributions}
+                                            "modified_arguments": [F.mts[i] for i in argkeys],
+                                            "block_contributions": block_contributions,
+                                            "quadrature_grid": grid}
     return ir
 
 
@@ -286,24 +367,23 @@ def analyse_dependencies(F, mt_unique_table_reference):
     # nodes are also set to 'varying' - any remaining active nodes are 'piecewise'.
 
     # Set targets, and dependencies to 'active'
-    targets = [i for i, v in F.nodes.items() if v.get('target')]
-    for i, v in F.nodes.items():
-        v['status'] = 'inactive'
+    targets = [i for i, t in enumerate(F.targets) if t]
+    F.init_status('inactive')
 
     while targets:
         s = targets.pop()
-        F.nodes[s]['status'] = 'active'
+        F.set_status(s, 'active')
         for j in F.out_edges[s]:
-            if F.nodes[j]['status'] == 'inactive':
+            if F.get_status(j) == 'inactive':
                 targets.append(j)
 
     # Build piecewise/varying markers for factorized_vertices
     varying_ttypes = ("varying", "quadrature", "uniform")
     varying_indices = []
-    for i, v in F.nodes.items():
-        if v.get('mt') is None:
+    for i, mt in enumerate(F.mts):
+        if mt is None:
             continue
-        tr = v.get('tr')
+        tr = F.trs[i]
         if tr is not None:
             ttype = tr.ttype
             # Check if table computations have revealed values varying over points
@@ -313,7 +393,7 @@ def analyse_dependencies(F, mt_unique_table_reference):
                 if ttype not in ("fixed", "piecewise", "ones", "zeros"):
                     raise RuntimeError("Invalid ttype %s" % (ttype, ))
 
-        elif not is_cellwise_constant(v['expression']):
+        elif not is_cellwise_constant(F.expressions[i]):
             raise RuntimeError("Error")
             # Keeping this check to be on the safe side,
             # not sure which cases this will cover (if any)
@@ -322,15 +402,105 @@ def analyse_dependencies(F, mt_unique_table_reference):
     # Set all parents of active varying nodes to 'varying'
     while varying_indices:
         s = varying_indices.pop()
-        if F.nodes[s]['status'] == 'active':
-            F.nodes[s]['status'] = 'varying'
-            for j in F.in_edges[s]:
-                varying_indices.append(j)
+        if F.get_status(s) == 'active':
+            F.set_status(s, 'varying')
+            varying_indices.extend(F.in_edges[s])
 
     # Any remaining active nodes must be 'piecewise'
-    for i, v in F.nodes.items():
-        if v['status'] == 'active':
-            v['status'] = 'piecewise'
+    F.status[F.nodes_with_status('active')] = F.statuses.index('piecewise')
+
+
+def count_operations(S):
+    """Count the nodes of a scalar expression graph which are not modified terminals."""
+    return sum(1 for expr in S.expressions if not is_modified_terminal(expr))
+
+
+def find_symmetric_blocks(contributions, block_size, gemm_min_block_size, hoist_piecewise_arguments=False):
+    """Mark the contributions to a square block that are symmetric.
+
+    A contribution is symmetric if both arguments use the same table,
+    and the sum of a contribution and its transpose, i.e. the
+    contribution with swapped argument tables and the same factor, is
+    symmetric. The transposes are removed from the returned list of
+    contributions. Preintegrated, sum factorized and matrix-matrix
+    product blocks are left unchanged, as are blocks with piecewise
+    argument tables if these are hoisted out of the quadrature loop.
+    """
+    def is_candidate(blockdata):
+        gemm = 0 <= gemm_min_block_size <= block_size and all(tt in ("varying", "uniform")
+                                                              for tt in blockdata.ttypes)
+        hoisted = hoist_piecewise_arguments and any(tt in piecewise_ttypes for tt in blockdata.ttypes)
+        return (blockdata.name is None and blockdata.tensor_factors is None and not gemm and not hoisted
+                and "quadrature" not in blockdata.ttypes)
+
+    contributions = list(contributions)
+    symmetric = []
+    while contributions:
+        blockdata = contributions.pop(0)
+        if not is_candidate(blockdata):
+            symmetric.append(blockdata)
+        elif blockdata.unames[0] == blockdata.unames[1] and blockdata.restrictions[0] == blockdata.restrictions[1]:
+            symmetric.append(blockdata._replace(symmetric="self"))
+        else:
+            for i, other in enumerate(contributions):
+                if is_candidate(other) and other.unames == blockdata.unames[::-1] \
+                        and other.restrictions == blockdata.restrictions[::-1] \
+                        and other.factor_indices_comp_indices == blockdata.factor_indices_comp_indices:
+                    del contributions[i]
+                    symmetric.append(blockdata._replace(symmetric="pair"))
+                    break
+            else:
+                symmetric.append(blockdata)
+    return symmetric
+
+
+def preintegration_is_cheaper(num_points, tables, interior_facet, max_table_size):
+    """Decide whether a block is preintegrated or computed by quadrature.
+
+    The tables of the arguments have axes (entity, point, dof). The
+    cost counts flops and loaded table values. For a block of n
+    entries, quadrature costs (rank + 1) n flops and loads the table
+    values of all arguments at each point, while a preintegrated block
+    costs 3 n: 2 n flops to scale and add the block, and n loads of the
+    values of the preintegrated table. Blocks with preintegrated tables
+    of more than max_table_size values are never preintegrated (-1
+    means no limit).
+    """
+    rank = len(tables)
+    dims = [t.shape[-1] for t in tables]
+    block_size = ufl.product(dims)
+    if interior_facet:
+        num_entities = ufl.product([t.shape[0] for t in tables])
+    else:
+        num_entities = max(t.shape[0] for t in tables)
+    if 0 <= max_table_size < num_entities * block_size:
+        return False
+    quadrature_cost = num_points * ((rank + 1) * block_size + sum(dims))
+    # Scale and add each entry (2 flops), loading it from the table
+    preintegration_cost = 3 * block_size
+    return preintegration_cost < quadrature_cost
+
+
+def integrate_block(weights, tables, interior_facet):
+    """Integrate the product of argument tables with the quadrature weights.
+
+    The tables of the arguments have axes (entity, point, dof), with a
+    single point for piecewise tables and a single entity for uniform
+    tables. Returns a table with axes (entity, dofs...), or with one
+    entity axis for each argument in interior facet integrals.
+    """
+    num_points = len(weights)
+    rank = len(tables)
+    tables = [numpy.broadcast_to(t, (t.shape[0], num_points, t.shape[2])) for t in tables]
+    dofs = "ijkl"[:rank]
+    if interior_facet:
+        entities = "abcd"[:rank]
+        operands = ",".join(f"{e}q{i}" for e, i in zip(entities, dofs))
+        return numpy.einsum(f"q,{operands}->{entities}{dofs}", weights, *tables)
+    num_entities = max(t.shape[0] for t in tables)
+    tables = [numpy.broadcast_to(t, (num_entities, ) + t.shape[1:]) for t in tables]
+    operands = ",".join(f"eq{i}" for i in dofs)
+    return numpy.einsum(f"q,{operands}->e{dofs}", weights, *tables)
 
 
 def replace_quadratureweight(expression):
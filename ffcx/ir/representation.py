@@ -16,7 +16,7 @@ should only need to use the data stored in the intermediate
 representation under the key "foo".
 """
 
-import itertools
+import functools
 import logging
 import warnings
 from collections import namedtuple
@@ -29,6 +29,7 @@ from ffcx.basix_interface import create_basix_element
 from ffcx.ir.integral import compute_integral_ir
 from ffcx.ir.representationutils import (QuadratureRule,
                                          create_quadrature_points_and_weights)
+from ffcx.parallel import run_tasks
 from ufl.classes import Integral
 from ufl.sorting import sorted_expr_sum
 
@@ -67,7 +68,9 @@ ir_integral = namedtuple('ir_integral', [
     'element_ids', 'tensor_shape', 'coefficient_numbering', 'coefficient_offsets',
     'original_constant_offsets', 'params', 'cell_shape', 'unique_tables', 'unique_table_types',
     'table_dofmaps', 'table_dof_base_transformations', 'integrand', 'name', 'precision',
-    'table_needs_transformation_data', 'needs_transformation_data'])
+    'table_needs_transformation_data', 'needs_transformation_data', 'coefficients_size',
+    'coordinate_dofs_size', 'constants_size', 'fused_name'])
+ir_fused_integral = namedtuple('ir_fused_integral', ['name', 'integral_type', 'num_forms', 'integrals'])
 ir_evaluate_dof = namedtuple('ir_evaluate_dof', [
     'mappings', 'reference_value_size', 'physical_value_size', 'geometric_dimension',
     'topological_dimension', 'dofs', 'cell_shape'])
@@ -77,7 +80,8 @@ ir_expression = namedtuple('ir_expression', [
     'integral_type', 'entitytype', 'tensor_shape', 'expression_shape', 'original_constant_offsets',
     'original_coefficient_positions', 'points', 'table_needs_transformation_data', 'needs_transformation_data'])
 
-ir_data = namedtuple('ir_data', ['elements', 'dofmaps', 'coordinate_mappings', 'integrals', 'forms', 'expressions'])
+ir_data = namedtuple('ir_data', ['elements', 'dofmaps', 'coordinate_mappings', 'integrals', 'fused_integrals',
+                                 'forms', 'expressions'])
 
 
 def compute_ir(analysis: namedtuple, object_names, prefix, parameters, visualise):
@@ -102,6 +106,23 @@ def compute_ir(analysis: namedtuple, object_names, prefix, parameters, visualise
             integral_names[(fd_index, itg_index)] = naming.integral_name(itg_data.integral_type, fd.original_form,
                                                                          fd_index, itg_data.subdomain_id)
 
+    # Integrals of different forms over the same domain, which are
+    # fused into one kernel
+    fused_integrals = {}
+    if parameters.get("fuse_forms", False):
+        for fd_index, fd in enumerate(analysis.form_data):
+            for itg_index, itg_data in enumerate(fd.integral_data):
+                if itg_data.integral_type not in ufl.custom_integral_types:
+                    key = (itg_data.integral_type, itg_data.subdomain_id, itg_data.domain)
+                    fused_integrals.setdefault(key, []).append((fd_index, itg_index))
+        fused_integrals = [members for members in fused_integrals.values() if len(members) > 1]
+    original_forms = [fd.original_form for fd in analysis.form_data]
+    fused_integral_names = {}
+    for i, members in enumerate(fused_integrals):
+        itg_data = analysis.form_data[members[0][0]].integral_data[members[0][1]]
+        name = naming.fused_integral_name(itg_data.integral_type, original_forms, i, itg_data.subdomain_id)
+        fused_integral_names.update((member, name) for member in members)
+
     ir_elements = [
         _compute_element_ir(e, analysis.element_numbers, finite_element_names, parameters["epsilon"])
         for e in analysis.unique_elements
@@ -117,11 +138,43 @@ def compute_ir(analysis: namedtuple, object_names, prefix, parameters, visualise
         for e in analysis.unique_coordinate_elements
     ]
 
-    irs = [
-        _compute_integral_ir(fd, i, prefix, analysis.element_numbers, integral_names, parameters, visualise)
-        for (i, fd) in enumerate(analysis.form_data)
+    # Integrals and expressions are independent of each other (tables
+    # are only shared between quadrature rules of the same integral),
+    # so they can be evaluated in any order, or in parallel
+    integral_keys = [(i, itg_data_index) for (i, fd) in enumerate(analysis.form_data)
+                     for itg_data_index in range(len(fd.integral_data))]
+    integral_positions = {key: k for k, key in enumerate(integral_keys)}
+    integral_tasks = [
+        functools.partial(_compute_integral_ir, analysis.form_data[i], i, itg_data_index, analysis.element_numbers,
+                          integral_names, fused_integral_names, parameters, visualise)
+        for (i, itg_data_index) in integral_keys
     ]
-    ir_integrals = list(itertools.chain(*irs))
+    expression_tasks = [
+        functools.partial(_compute_expression_ir, expr, i, prefix, analysis, parameters, visualise)
+        for i, expr in enumerate(analysis.expressions)
+    ]
+    if parameters.get("streaming", False):
+        # Keep the tasks instead, so that each IR is only computed when
+        # its code is generated, and released as soon as it is emitted.
+        # The IR of integrals that are fused is kept until the fused
+        # kernel is generated from it.
+        for members in fused_integrals:
+            for member in members:
+                k = integral_positions[member]
+                integral_tasks[k] = _SharedTask(integral_tasks[k], 2)
+        ir_integrals = integral_tasks
+        ir_expressions = expression_tasks
+    else:
+        irs = run_tasks(integral_tasks + expression_tasks, parameters.get("ir_num_workers", 1))
+        ir_integrals = irs[:len(integral_tasks)]
+        ir_expressions = irs[len(integral_tasks):]
+
+    # Fused integrals are built from the IR of their member integrals
+    ir_fused_integrals = []
+    for members in fused_integrals:
+        integrals = [(member[0], ir_integrals[integral_positions[member]]) for member in members]
+        task = functools.partial(_compute_fused_integral_ir, integrals, len(analysis.form_data))
+        ir_fused_integrals.append(task if parameters.get("streaming", False) else task())
 
     ir_forms = [
         _compute_form_ir(fd, i, prefix, analysis.element_numbers, finite_element_names,
@@ -129,12 +182,9 @@ def compute_ir(analysis: namedtuple, object_names, prefix, parameters, visualise
         for (i, fd) in enumerate(analysis.form_data)
     ]
 
-    ir_expressions = [_compute_expression_ir(expr, i, prefix, analysis, parameters, visualise)
-                      for i, expr in enumerate(analysis.expressions)]
-
     return ir_data(elements=ir_elements, dofmaps=ir_dofmaps,
                    coordinate_mappings=ir_coordinate_mappings,
-                   integrals=ir_integrals, forms=ir_forms,
+                   integrals=ir_integrals, fused_integrals=ir_fused_integrals, forms=ir_forms,
                    expressions=ir_expressions)
 
 
@@ -346,175 +396,206 @@ def _compute_coordinate_mapping_ir(ufl_coordinate_element,
     return ir_coordinate_map(**ir)
 
 
-def _compute_integral_ir(form_data, form_index, prefix, element_numbers, integral_names,
-                         parameters, visualise):
-    """Compute intermediate represention for form integrals."""
+_entity_types = {
+    "cell": "cell",
+    "exterior_facet": "facet",
+    "interior_facet": "facet",
+    "vertex": "vertex",
+    "custom": "cell"
+}
+
+
+def _compute_integral_ir(form_data, form_index, itg_data_index, element_numbers, integral_names,
+                         fused_integral_names, parameters, visualise):
+    """Compute intermediate represention for a group of form integrals."""
+    itg_data = form_data.integral_data[itg_data_index]
+
+    logger.info(f"Computing IR for integral in integral group {itg_data_index}")
+
+    # Compute representation
+    entitytype = _entity_types[itg_data.integral_type]
+    cell = itg_data.domain.ufl_cell()
+    cellname = cell.cellname()
+    tdim = cell.topological_dimension()
+    assert all(tdim == itg.ufl_domain().topological_dimension() for itg in itg_data.integrals)
+
+    ir = {
+        "integral_type": itg_data.integral_type,
+        "subdomain_id": itg_data.subdomain_id,
+        "rank": form_data.rank,
+        "geometric_dimension": form_data.geometric_dimension,
+        "topological_dimension": tdim,
+        "entitytype": entitytype,
+        "num_facets": cell.num_facets(),
+        "num_vertices": cell.num_vertices(),
+        "enabled_coefficients": itg_data.enabled_coefficients,
+        "cell_shape": cellname
+    }
+
+    # Get element space dimensions
+    unique_elements = element_numbers.keys()
+    ir["element_dimensions"] = {
+        ufl_element: create_basix_element(ufl_element).dim
+        for ufl_element in unique_elements
+    }
 
-    _entity_types = {
-        "cell": "cell",
-        "exterior_facet": "facet",
-        "interior_facet": "facet",
-        "vertex": "vertex",
-        "custom": "cell"
+    ir["element_ids"] = {
+        ufl_element: i
+        for i, ufl_element in enumerate(unique_elements)
     }
 
-    # Iterate over groups of integrals
-    irs = []
-    for itg_data_index, itg_data in enumerate(form_data.integral_data):
-
-        logger.info(f"Computing IR for integral in integral group {itg_data_index}")
-
-        # Compute representation
-        entitytype = _entity_types[itg_data.integral_type]
-        cell = itg_data.domain.ufl_cell()
-        cellname = cell.cellname()
-        tdim = cell.topological_dimension()
-        assert all(tdim == itg.ufl_domain().topological_dimension() for itg in itg_data.integrals)
-
-        ir = {
-            "integral_type": itg_data.integral_type,
-            "subdomain_id": itg_data.subdomain_id,
-            "rank": form_data.rank,
-            "geometric_dimension": form_data.geometric_dimension,
-            "topological_dimension": tdim,
-            "entitytype": entitytype,
-            "num_facets": cell.num_facets(),
-            "num_vertices": cell.num_vertices(),
-            "enabled_coefficients": itg_data.enabled_coefficients,
-            "cell_shape": cellname
-        }
-
-        # Get element space dimensions
-        unique_elements = element_numbers.keys()
-        ir["element_dimensions"] = {
-            ufl_element: create_basix_element(ufl_element).dim
-            for ufl_element in unique_elements
-        }
-
-        ir["element_ids"] = {
-            ufl_element: i
-            for i, ufl_element in enumerate(unique_elements)
-        }
-
-        # Create dimensions of primary indices, needed to reset the argument
-        # 'A' given to tabulate_tensor() by the assembler.
-        argument_dimensions = [
-            ir["element_dimensions"][ufl_element] for ufl_element in form_data.argument_elements
-        ]
-
-        # Compute shape of element tensor
-        if ir["integral_type"] == "interior_facet":
-            ir["tensor_shape"] = [2 * dim for dim in argument_dimensions]
+    # Create dimensions of primary indices, needed to reset the argument
+    # 'A' given to tabulate_tensor() by the assembler.
+    argument_dimensions = [
+        ir["element_dimensions"][ufl_element] for ufl_element in form_data.argument_elements
+    ]
+
+    # Compute shape of element tensor
+    if ir["integral_type"] == "interior_facet":
+        ir["tensor_shape"] = [2 * dim for dim in argument_dimensions]
+    else:
+        ir["tensor_shape"] = argument_dimensions
+
+    integral_type = itg_data.integral_type
+    cell = itg_data.domain.ufl_cell()
+
+    # Group integrands with the same quadrature rule
+    grouped_integrands = {}
+    for integral in itg_data.integrals:
+        md = integral.metadata() or {}
+        scheme = md["quadrature_rule"]
+        degree = md["quadrature_degree"]
+
+        if scheme == "custom":
+            points = md["quadrature_points"]
+            weights = md["quadrature_weights"]
+        elif scheme == "vertex":
+            # FIXME: Could this come from basix?
+
+            # The vertex scheme, i.e., averaging the function value in the
+            # vertices and multiplying with the simplex volume, is only of
+            # order 1 and inferior to other generic schemes in terms of
+            # error reduction. Equation systems generated with the vertex
+            # scheme have some properties that other schemes lack, e.g., the
+            # mass matrix is a simple diagonal matrix. This may be
+            # prescribed in certain cases.
+            if degree > 1:
+                warnings.warn(
+                    "Explicitly selected vertex quadrature (degree 1), but requested degree is {}.".
+                    format(degree))
+            if cellname == "tetrahedron":
+                points, weights = (numpy.array([[0.0, 0.0, 0.0], [1.0, 0.0, 0.0],
+                                                [0.0, 1.0, 0.0], [0.0, 0.0, 1.0]]),
+                                   numpy.array([1.0 / 24.0, 1.0 / 24.0, 1.0 / 24.0, 1.0 / 24.0]))
+            elif cellname == "triangle":
+                points, weights = (numpy.array([[0.0, 0.0], [1.0, 0.0], [0.0, 1.0]]),
+                                   numpy.array([1.0 / 6.0, 1.0 / 6.0, 1.0 / 6.0]))
+            elif cellname == "interval":
+                # Trapezoidal rule
+                points, weights = (numpy.array([[0.0], [1.0]]), numpy.array([1.0 / 2.0, 1.0 / 2.0]))
         else:
-            ir["tensor_shape"] = argument_dimensions
-
-        integral_type = itg_data.integral_type
-        cell = itg_data.domain.ufl_cell()
-
-        # Group integrands with the same quadrature rule
-        grouped_integrands = {}
-        for integral in itg_data.integrals:
-            md = integral.metadata() or {}
-            scheme = md["quadrature_rule"]
-            degree = md["quadrature_degree"]
-
-            if scheme == "custom":
-                points = md["quadrature_points"]
-                weights = md["quadrature_weights"]
-            elif scheme == "vertex":
-                # FIXME: Could this come from basix?
-
-                # The vertex scheme, i.e., averaging the function value in the
-                # vertices and multiplying with the simplex volume, is only of
-                # order 1 and inferior to other generic schemes in terms of
-                # error reduction. Equation systems generated with the vertex
-                # scheme have some properties that other schemes lack, e.g., the
-                # mass matrix is a simple diagonal matrix. This may be
-                # prescribed in certain cases.
-                if degree > 1:
-                    warnings.warn(
-                        "Explicitly selected vertex quadrature (degree 1), but requested degree is {}.".
-                        format(degree))
-                if cellname == "tetrahedron":
-                    points, weights = (numpy.array([[0.0, 0.0, 0.0], [1.0, 0.0, 0.0],
-                                                    [0.0, 1.0, 0.0], [0.0, 0.0, 1.0]]),
-                                       numpy.array([1.0 / 24.0, 1.0 / 24.0, 1.0 / 24.0, 1.0 / 24.0]))
-                elif cellname == "triangle":
-                    points, weights = (numpy.array([[0.0, 0.0], [1.0, 0.0], [0.0, 1.0]]),
-                                       numpy.array([1.0 / 6.0, 1.0 / 6.0, 1.0 / 6.0]))
-                elif cellname == "interval":
-                    # Trapezoidal rule
-                    return (numpy.array([[0.0], [1.0]]), numpy.array([1.0 / 2.0, 1.0 / 2.0]))
-            else:
-                points, weights = create_quadrature_points_and_weights(
-                    integral_type, cell, degree, scheme)
-
-            points = numpy.asarray(points)
-            weights = numpy.asarray(weights)
-
-            rule = QuadratureRule(points, weights)
-
-            if rule not in grouped_integrands:
-                grouped_integrands[rule] = []
-
-            grouped_integrands[rule].append(integral.integrand())
-
-        sorted_integrals = {}
-        for rule, integrands in grouped_integrands.items():
-            integrands_summed = sorted_expr_sum(integrands)
-
-            integral_new = Integral(integrands_summed, itg_data.integral_type, itg_data.domain,
-                                    itg_data.subdomain_id, {}, None)
-            sorted_integrals[rule] = integral_new
-
-        # TODO: See if coefficient_numbering can be removed
-        # Build coefficient numbering for UFC interface here, to avoid
-        # renumbering in UFL and application of replace mapping
-        coefficient_numbering = {}
-        for i, f in enumerate(form_data.reduced_coefficients):
-            coefficient_numbering[f] = i
-
-        # Add coefficient numbering to IR
-        ir["coefficient_numbering"] = coefficient_numbering
-
-        index_to_coeff = sorted([(v, k) for k, v in coefficient_numbering.items()])
-        offsets = {}
-        width = 2 if integral_type in ("interior_facet") else 1
-        _offset = 0
-        for k, el in zip(index_to_coeff, form_data.coefficient_elements):
-            offsets[k[1]] = _offset
-            _offset += width * ir["element_dimensions"][el]
-
-        # Copy offsets also into IR
-        ir["coefficient_offsets"] = offsets
-
-        # Build offsets for Constants
-        original_constant_offsets = {}
-        _offset = 0
-        for constant in form_data.original_form.constants():
-            original_constant_offsets[constant] = _offset
-            _offset += numpy.product(constant.ufl_shape, dtype=int)
-
-        ir["original_constant_offsets"] = original_constant_offsets
-
-        ir["precision"] = itg_data.metadata["precision"]
-
-        # Create map from number of quadrature points -> integrand
-        integrands = {rule: integral.integrand() for rule, integral in sorted_integrals.items()}
-
-        # Build more specific intermediate representation
-        integral_ir = compute_integral_ir(itg_data.domain.ufl_cell(), itg_data.integral_type,
-                                          ir["entitytype"], integrands, ir["tensor_shape"],
-                                          parameters, visualise)
-
-        ir.update(integral_ir)
-
-        # Fetch name
-        ir["name"] = integral_names[(form_index, itg_data_index)]
-
-        irs.append(ir_integral(**ir))
-
-    return irs
+            points, weights = create_quadrature_points_and_weights(
+                integral_type, cell, degree, scheme)
+
+        points = numpy.asarray(points)
+        weights = numpy.asarray(weights)
+
+        rule = QuadratureRule(points, weights)
+
+        if rule not in grouped_integrands:
+            grouped_integrands[rule] = []
+
+        grouped_integrands[rule].append(integral.integrand())
+
+    sorted_integrals = {}
+    for rule, integrands in grouped_integrands.items():
+        integrands_summed = sorted_expr_sum(integrands)
+
+        integral_new = Integral(integrands_summed, itg_data.integral_type, itg_data.domain,
+                                itg_data.subdomain_id, {}, None)
+        sorted_integrals[rule] = integral_new
+
+    # TODO: See if coefficient_numbering can be removed
+    # Build coefficient numbering for UFC interface here, to avoid
+    # renumbering in UFL and application of replace mapping
+    coefficient_numbering = {}
+    for i, f in enumerate(form_data.reduced_coefficients):
+        coefficient_numbering[f] = i
+
+    # Add coefficient numbering to IR
+    ir["coefficient_numbering"] = coefficient_numbering
+
+    index_to_coeff = sorted([(v, k) for k, v in coefficient_numbering.items()])
+    offsets = {}
+    width = 2 if integral_type in ("interior_facet") else 1
+    _offset = 0
+    for k, el in zip(index_to_coeff, form_data.coefficient_elements):
+        offsets[k[1]] = _offset
+        _offset += width * ir["element_dimensions"][el]
+
+    # Copy offsets also into IR
+    ir["coefficient_offsets"] = offsets
+
+    # Sizes of coefficient and coordinate dof arrays of one integration entity
+    ir["coefficients_size"] = _offset
+    ir["coordinate_dofs_size"] = width * create_basix_element(itg_data.domain.ufl_coordinate_element()).dim
+
+    # Build offsets for Constants
+    original_constant_offsets = {}
+    _offset = 0
+    for constant in form_data.original_form.constants():
+        original_constant_offsets[constant] = _offset
+        _offset += numpy.product(constant.ufl_shape, dtype=int)
+
+    ir["original_constant_offsets"] = original_constant_offsets
+    ir["constants_size"] = _offset
+
+    ir["precision"] = itg_data.metadata["precision"]
+
+    # Create map from number of quadrature points -> integrand
+    integrands = {rule: integral.integrand() for rule, integral in sorted_integrals.items()}
+
+    # Build more specific intermediate representation
+    integral_ir = compute_integral_ir(itg_data.domain.ufl_cell(), itg_data.integral_type,
+                                      ir["entitytype"], integrands, ir["tensor_shape"],
+                                      parameters, visualise)
+
+    ir.update(integral_ir)
+
+    # Fetch name
+    ir["name"] = integral_names[(form_index, itg_data_index)]
+    ir["fused_name"] = fused_integral_names.get((form_index, itg_data_index))
+
+    return ir_integral(**ir)
+
+
+def _compute_fused_integral_ir(integrals, num_forms):
+    """Compute intermediate representation for integrals of several forms over the same domain.
+
+    The integrals are given as pairs of form index and IR, or a task
+    computing the IR.
+    """
+    integrals = [(form_index, ir() if callable(ir) else ir) for form_index, ir in integrals]
+    return ir_fused_integral(name=integrals[0][1].fused_name, integral_type=integrals[0][1].integral_type,
+                             num_forms=num_forms, integrals=integrals)
+
+
+class _SharedTask(object):
+    """Task computing a result used by several consumers, computed once and released after the last use."""
+
+    def __init__(self, task, num_uses):
+        self.task = task
+        self.num_uses = num_uses
+        self.result = None
+
+    def __call__(self):
+        if self.result is None:
+            self.result = self.task()
+        result = self.result
+        self.num_uses -= 1
+        if self.num_uses == 0:
+            self.result = None
+        return result
 
 
 def _compute_form_ir(form_data, form_id, prefix, element_numbers, finite_element_names,
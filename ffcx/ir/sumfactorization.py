@@ -0,0 +1,152 @@
+# Copyright (C) 2021 FEniCS Project
+#
+# This file is part of FFCX.(https://www.fenicsproject.org)
+#
+# SPDX-License-Identifier:    LGPL-3.0-or-later
+"""Detection of tensor-product structure for sum factorization.
+
+On quadrilateral and hexahedral cells, the quadrature points of the
+default rules form a grid, and the basis functions of Q and DQ elements
+are products of 1D functions. A table of such basis functions at the
+points of a grid can then be written as
+
+    table[q, column] = scale * U_0[q_0, a_0] * ... * U_{d-1}[q_{d-1}, a_{d-1}]
+
+with 1D tables U_k, which allows contracting the quadrature points one
+dimension at a time.
+"""
+
+import collections
+
+import numpy
+
+quadrature_grid_t = collections.namedtuple(
+    "quadrature_grid", ["shape", "indices"])
+
+tensor_factors_t = collections.namedtuple(
+    "tensor_factors", ["tables", "columns", "scales"])
+
+
+def _cluster(values, rtol, atol):
+    """Return the distinct values (up to tolerance) and the index of each value among them."""
+    order = numpy.argsort(values)
+    distinct = []
+    indices = numpy.empty(len(values), dtype=int)
+    for i in order:
+        if not distinct or not numpy.isclose(values[i], distinct[-1], rtol=rtol, atol=atol):
+            distinct.append(values[i])
+        indices[i] = len(distinct) - 1
+    return distinct, indices
+
+
+def quadrature_grid(points, rtol=1e-6, atol=1e-9):
+    """Find the tensor-product grid formed by the quadrature points.
+
+    Returns a quadrature_grid_t with the number of points in each
+    direction and the index of each point in the lexicographically
+    ordered grid (first direction slowest), or None if the points do
+    not form a grid.
+    """
+    points = numpy.asarray(points)
+    if points.ndim != 2 or points.shape[1] < 2:
+        return None
+    shape = []
+    multi_index = []
+    for d in range(points.shape[1]):
+        distinct, indices = _cluster(points[:, d], rtol, atol)
+        shape.append(len(distinct))
+        multi_index.append(indices)
+    shape = tuple(shape)
+    if numpy.product(shape) != points.shape[0]:
+        return None
+    indices = numpy.ravel_multi_index(multi_index, shape)
+    if len(set(indices)) != len(indices):
+        return None
+    return quadrature_grid_t(shape, tuple(int(i) for i in indices))
+
+
+def is_permutation(matrix):
+    """Check if a matrix is a permutation matrix."""
+    matrix = numpy.asarray(matrix)
+    return (numpy.allclose(numpy.sort(matrix, axis=1)[:, :-1], 0.0) and numpy.allclose(matrix.max(axis=1), 1.0)
+            and numpy.allclose(matrix.sum(axis=0), 1.0))
+
+
+def _find_or_add(vectors, v, rtol, atol):
+    for i, u in enumerate(vectors):
+        if numpy.allclose(u, v, rtol=rtol, atol=atol):
+            return i
+    vectors.append(v)
+    return len(vectors) - 1
+
+
+def factorize_table(table, grid, rtol=1e-6, atol=1e-9):
+    """Factorize a table of basis function values at the points of a quadrature grid.
+
+    The table has axes (point, column). Returns a tensor_factors_t with
+    the 1D tables of each direction, the column and scale of each
+    lexicographically ordered product of 1D functions, or None if the
+    columns are not products of 1D functions spanning a full tensor
+    product space.
+    """
+    table = numpy.asarray(table)
+    num_points, num_columns = table.shape
+    if num_points != len(grid.indices):
+        return None
+
+    # Reshape each column to the grid
+    values = numpy.zeros((num_points, num_columns))
+    values[list(grid.indices)] = table
+    values = values.reshape(grid.shape + (num_columns, ))
+
+    tdim = len(grid.shape)
+    vectors = [[] for d in range(tdim)]
+    multi_index = numpy.zeros((tdim, num_columns), dtype=int)
+    scales = numpy.zeros(num_columns)
+    for j in range(num_columns):
+        g = values[..., j]
+        imax = numpy.unravel_index(numpy.argmax(abs(g)), grid.shape)
+        if numpy.isclose(g[imax], 0.0, rtol=rtol, atol=atol):
+            return None
+
+        # Take the 1D functions from lines through the largest value,
+        # normalised to a largest absolute value of 1 and positive sign
+        # of the first significant value
+        product = numpy.ones(grid.shape)
+        for d in range(tdim):
+            v = g[imax[:d] + (slice(None), ) + imax[d + 1:]]
+            v = v / abs(v).max()
+            if v[numpy.argmax(abs(v) > 1e-3)] < 0:
+                v = -v
+            multi_index[d, j] = _find_or_add(vectors[d], v, rtol, atol)
+            shape = [1] * tdim
+            shape[d] = grid.shape[d]
+            product = product * vectors[d][multi_index[d, j]].reshape(shape)
+        scales[j] = g[imax] / product[imax]
+        if not numpy.allclose(scales[j] * product, g, rtol=rtol, atol=atol):
+            return None
+
+    # The columns must be all products of the 1D functions
+    dims = tuple(len(v) for v in vectors)
+    if numpy.product(dims) != num_columns:
+        return None
+    lex = numpy.ravel_multi_index(multi_index, dims)
+    if len(set(lex)) != num_columns:
+        return None
+    columns = numpy.zeros(num_columns, dtype=int)
+    columns[lex] = numpy.arange(num_columns)
+
+    tables = tuple(numpy.array(v).T for v in vectors)
+    return tensor_factors_t(tables, tuple(int(j) for j in columns), scales[columns])
+
+
+def diagonal_is_factorizable(blockmap, factors):
+    """Check if the diagonal of a sum factorized block of a bilinear form can be sum factorized.
+
+    This is the case if the products of 1D functions of both arguments
+    have the same dimensions and the same dofs in lexicographic order,
+    the diagonal then uses the products of the 1D tables.
+    """
+    test, trial = factors
+    return [t.shape for t in test.tables] == [t.shape for t in trial.tables] \
+        and [blockmap[0][j] for j in test.columns] == [blockmap[1][j] for j in trial.columns]
@@ -11,6 +11,7 @@ Parse command-line arguments and generate code from input UFL form files.
 import argparse
 import cProfile
 import logging
+import os
 import pathlib
 import re
 import string
@@ -67,12 +68,18 @@ def main(args=None):
         ufd = ufl.algorithms.load_ufl_file(filename)
 
         # Generate code
-        if len(ufd.forms) > 0:
-            code_h, code_c = compiler.compile_ufl_objects(
-                ufd.forms, ufd.object_names, prefix=prefix, parameters=parameters, visualise=xargs.visualise)
+        ufl_objects = ufd.forms if len(ufd.forms) > 0 else ufd.elements
+        if parameters["streaming"]:
+            # Write source while it is generated
+            c_filename = os.path.join(xargs.output_directory, prefix + ".c")
+            with open(c_filename, "w") as c_file:
+                code_h = compiler.compile_ufl_objects_streaming(
+                    ufl_objects, c_file, ufd.object_names, prefix=prefix, parameters=parameters,
+                    visualise=xargs.visualise)
+            code_c = None
         else:
             code_h, code_c = compiler.compile_ufl_objects(
-                ufd.elements, ufd.object_names, prefix=prefix, parameters=parameters, visualise=xargs.visualise)
+                ufl_objects, ufd.object_names, prefix=prefix, parameters=parameters, visualise=xargs.visualise)
 
         # Write to file
         formatting.write_code(code_h, code_c, prefix, xargs.output_directory)
@@ -82,5 +89,8 @@ def main(args=None):
             pr.disable()
             pfn = f"ffcx_{prefix}.profile"
             pr.dump_stats(pfn)
+            memory = compiler.peak_memory()
+            if memory is not None:
+                logger.info(f"Peak memory usage: {memory:.1f} MB")
 
     return 0
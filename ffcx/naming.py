@@ -86,6 +86,11 @@ def integral_name(integral_type, original_form, form_id, subdomain_id):
     return "integral_{}_{}_{!s}".format(integral_type, subdomain_id, sig)
 
 
+def fused_integral_name(integral_type, original_forms, fused_id, subdomain_id):
+    sig = compute_signature(original_forms, str(fused_id))
+    return "fused_integral_{}_{}_{!s}".format(integral_type, subdomain_id, sig)
+
+
 def form_name(original_form, form_id):
     sig = compute_signature([original_form], str(form_id))
     return "form_{!s}".format(sig)
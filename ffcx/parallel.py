@@ -0,0 +1,61 @@
+# Copyright (C) 2021 FEniCS Project
+#
+# This file is part of FFCX.(https://www.fenicsproject.org)
+#
+# SPDX-License-Identifier:    LGPL-3.0-or-later
+"""Evaluation of independent compiler tasks in a pool of worker processes."""
+
+import concurrent.futures
+import concurrent.futures.process
+import logging
+import multiprocessing
+import os
+import pickle
+
+logger = logging.getLogger("ffcx")
+
+# Tasks of the currently running pool, inherited by forked workers
+_tasks = None
+
+
+def _run_task(i):
+    result = _tasks[i]()
+    try:
+        return pickle.dumps(result, protocol=pickle.HIGHEST_PROTOCOL)
+    except (TypeError, AttributeError) as e:
+        raise pickle.PicklingError(f"Cannot pickle the result of task {i}: {e}") from e
+
+
+def num_workers(n):
+    """Return the number of worker processes for the parameter value n (0 means all cores)."""
+    if n == 0:
+        return os.cpu_count() or 1
+    return max(int(n), 1)
+
+
+def run_tasks(tasks, workers):
+    """Evaluate a list of callables, returning their results in order.
+
+    With more than one worker the tasks are evaluated in forked worker
+    processes. The tasks themselves are inherited by the workers and never
+    pickled, only their results are sent back. If forking is not available,
+    a result cannot be pickled or a worker dies, all tasks are evaluated
+    serially. Errors raised by the tasks are propagated.
+
+    """
+    global _tasks
+
+    workers = min(num_workers(workers), len(tasks))
+    if workers > 1 and "fork" in multiprocessing.get_all_start_methods():
+        logger.info(f"Evaluating {len(tasks)} tasks with {workers} worker processes")
+        _tasks = tasks
+        try:
+            with concurrent.futures.ProcessPoolExecutor(
+                    max_workers=workers, mp_context=multiprocessing.get_context("fork")) as pool:
+                return [pickle.loads(result) for result in pool.map(_run_task, range(len(tasks)))]
+        except (pickle.PicklingError, concurrent.futures.process.BrokenProcessPool) as e:
+            logger.warning(f"Parallel evaluation failed ({e}), falling back to serial evaluation.")
+        finally:
+            _tasks = None
+
+    return [task() for task in tasks]
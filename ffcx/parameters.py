@@ -22,16 +22,103 @@ FFCX_DEFAULT_PARAMETERS = {
         ("double", "Scalar type used in generated code. Any of real or complex C floating-point types."),
     "tabulate_tensor_void":
         (False, "True to generate empty tabulation kernels."),
+    "tabulate_action":
+        (False, """Generate tabulate_action kernels for integrals of bilinear forms, computing the action of
+               the element tensor on the trial function dofs without forming the element tensor."""),
+    "tabulate_diagonal":
+        (False, """Generate tabulate_diagonal kernels for integrals of bilinear forms with square element tensor,
+               computing only the diagonal of the element tensor."""),
+    "fuse_forms":
+        (False, """Generate tabulate_fused kernels computing the integrals over the same domain of all forms
+               compiled together at once, sharing the evaluation of geometry and coefficients."""),
     "table_rtol":
         (1e-6, "Relative precision to use when comparing finite element table values for table reuse."),
     "table_atol":
         (1e-9, "Absolute precision to use when comparing finite element table values for reuse."),
+    "table_blob_threshold":
+        (-1, """Element tables with at least this many values are stored as binary data in a string literal
+               instead of an initializer list, which is about three times faster to compile although the
+               source is up to about 20% larger (-1 to disable)."""),
+    "shared_tables":
+        (True, """Define static tables of quadrature weights and basis function values once at file scope,
+               named after a hash of their values, so that identical tables are shared by all kernels."""),
     "assume_aligned":
         (-1, """Assumes alignment (in bytes) of pointers to tabulated tensor, coefficients and constants array.
                This value must be compatible with alignment of data structures allocated outside FFC.
                (-1 means no alignment assumed, safe option)"""),
     "padlen":
         (1, "Pads every declared array in tabulation kernel such that its last dimension is divisible by given value."),
+    "max_unroll":
+        (-1, """Maximum number of statements or terms generated by unrolling loops over non-contiguous dofs and
+               dof transformations. Larger loops are generated as compact loops over static index arrays
+               (-1 means no limit)."""),
+    "preintegration":
+        (False, """Integrate blocks of the element tensor at compile time where the factor multiplying the
+               arguments is piecewise constant, e.g. on affine simplices, if a cost model estimates this is
+               cheaper than quadrature. The kernel then only scales the preintegrated blocks by the factor."""),
+    "preintegration_max_table_size":
+        (4096, """Maximum number of values of the table of a preintegrated block, including all entities
+               (-1 means no limit)."""),
+    "hoist_piecewise_arguments":
+        (True, """Sum only the factor times the arguments varying over the quadrature points in the quadrature
+               loop for blocks where some arguments are piecewise constant, e.g. gradients of P1 functions on
+               affine simplices, and multiply the sums by the piecewise arguments after the loop."""),
+    "gemm_min_block_size":
+        (-1, """Blocks of bilinear forms with at least this many entries and argument tables varying over
+               the quadrature points are computed after the quadrature loop as the product of the first
+               argument premultiplied by the integrand at all points and the table of the second argument,
+               by a register tiled loop nest (-1 to disable)."""),
+    "gemm_microkernel":
+        ("", """Name of a C function void f(int m, int n, int k, const ufc_scalar_t* a, int lda,
+               const double* b, int ldb, ufc_scalar_t* c, int ldc) computing
+               c[i * ldc + j] += sum_p a[p * lda + i] * b[p * ldb + j], e.g. a wrapper of a BLAS gemm, called
+               for the blocks selected by gemm_min_block_size instead of the generated loop nest. The function
+               must be linked with the generated code."""),
+    "symmetric_blocks":
+        (True, """Accumulate only the upper triangle of blocks of bilinear forms that are symmetric, e.g. of
+               mass and stiffness matrices, in the quadrature loop and add it to both triangles of the
+               element tensor after the loop."""),
+    "sum_factorization":
+        (False, """Use sum factorization for cell integrals on quadrilaterals and hexahedra where the quadrature
+               points form a grid and the argument basis functions are products of 1D functions (e.g. Q and
+               DQ elements), contracting the quadrature points one direction at a time."""),
+    "simd_width":
+        (0, """Number of cells evaluated at once by tabulate_tensor_batch of cell integrals, e.g. 4 or 8 for
+               AVX2 or AVX-512, using a vectorized kernel with interleaved (AoSoA) data and loops over cells
+               annotated with '#pragma omp simd', which requires e.g. -fopenmp-simd (0 to disable)."""),
+    "ensemble_size":
+        (0, """Number of sets of coefficients and constants for which tabulate_ensemble kernels compute the element
+               tensors at once, sharing the geometry, with loops over the ensemble annotated with
+               '#pragma omp simd' (0 to disable)."""),
+    "cnodes_optimization":
+        (False, """Simplify the generated integral kernels: fold literal constants, expand integer powers into
+               multiplications, compute reciprocals of loop invariant divisors before loops and reuse values
+               computed before, also across the piecewise and varying partitions."""),
+    "fma_contraction":
+        (False, """Contract a*b + c into fma(a, b, c) when simplifying integral kernels with cnodes_optimization
+               for real scalar types, which is only fast with hardware FMA (e.g. -mfma)."""),
+    "ir_num_workers":
+        (1, """Number of worker processes used to compute the intermediate representation of integrals
+               and expressions (0 means one per available core, 1 disables parallelism)."""),
+    "codegen_num_workers":
+        (1, """Number of worker processes used to generate code for elements, integrals, forms
+               and expressions (0 means one per available core, 1 disables parallelism)."""),
+    "streaming":
+        (False, """Compute the IR of integrals and expressions, generate their code and write it to the
+               output one at a time, releasing the IR after use, to reduce peak memory. The IR is then
+               computed serially (ir_num_workers is ignored) and a single translation unit is written."""),
+    "translation_units":
+        (1, """Number of C source files integral and expression kernels are split into, balanced by code size,
+               in addition to a glue unit with elements, dofmaps and forms (0 means one per kernel, 1 generates
+               a single source file)."""),
+    "compile_num_workers":
+        (0, """Number of C compiler processes used by the JIT to build split translation units
+               (0 means one per available core)."""),
+    "large_unit_size":
+        (-1, """Size in bytes of a translation unit above which the JIT compiles it with large_unit_flags
+               (-1 to disable)."""),
+    "large_unit_flags":
+        ("-O1", "Extra compiler flags used by the JIT for large translation units, e.g. a lower optimisation level."),
     "verbosity":
         (30, "Logger verbosity. Follows standard logging library levels, i.e. INFO=20, DEBUG=10, etc.")
 }
@@ -19,3 +19,12 @@ def test_visualise():
     subprocess.run(["ffcx", "--visualise", "Poisson.ufl"])
     assert os.path.isfile("S.pdf")
     assert os.path.isfile("F.pdf")
+
+
+def test_translation_units(tmp_path):
+    os.chdir(os.path.dirname(__file__))
+    result = subprocess.run(["ffcx", "--translation_units", "0", "-o", str(tmp_path), "Poisson.ufl"])
+    assert result.returncode == 0
+    assert (tmp_path / "Poisson.h").is_file()
+    assert (tmp_path / "Poisson.c").is_file()
+    assert (tmp_path / "Poisson_1.c").is_file()
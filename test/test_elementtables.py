@@ -0,0 +1,46 @@
+# Copyright (C) 2021 FEniCS Project
+#
+# This file is part of FFCX.(https://www.fenicsproject.org)
+#
+# SPDX-License-Identifier:    LGPL-3.0-or-later
+
+import numpy as np
+import pytest
+
+import ufl
+from ffcx.ir.elementtables import get_ffcx_table_values, strip_table_zeros
+
+
+def pad_table(table):
+    """Return the table of all dofs of the full element, with zeros for the dofs of other sub elements."""
+    full = np.zeros(table.values.shape[:-1] + (table.original_dim, ))
+    full[..., table.offset::table.stride] = table.values
+    return full
+
+
+@pytest.mark.parametrize("points,dofrange,dofmap", [
+    (np.array([[0.0, 0.0]]), (1, 2), (1, )),
+    (np.array([[0.2, 0.3], [0.6, 0.1]]), (1, 12), (1, 3, 5, 7, 9, 11)),
+])
+def test_strip_table_zeros_blocked(points, dofrange, dofmap):
+    element = ufl.VectorElement("Lagrange", ufl.triangle, 2)
+    scalar_element = ufl.FiniteElement("Lagrange", ufl.triangle, 2)
+
+    # Only the dofs 1, 3, ..., 11 of the blocked element contribute to component 1
+    table = get_ffcx_table_values(points, ufl.triangle, "cell", element, None, "cell", (0, 0), 1)
+    assert table.offset == 1
+    assert table.stride == 2
+    assert table.original_dim == 12
+    assert table.values.shape == (1, len(points), 6)
+
+    scalar_table = get_ffcx_table_values(points, ufl.triangle, "cell", scalar_element, None, "cell", (0, 0), 0)
+    assert (scalar_table.offset, scalar_table.stride, scalar_table.original_dim) == (0, 1, 6)
+    assert np.allclose(table.values, scalar_table.values)
+
+    # Stripping the sub element table gives the same result as stripping the padded table of the full element
+    stripped = strip_table_zeros(table.values, 2, offset=table.offset, stride=table.stride)
+    padded = strip_table_zeros(pad_table(table), 2)
+    assert stripped[0] == padded[0] == dofrange
+    assert stripped[1] == padded[1] == dofmap
+    assert np.array_equal(stripped[2], padded[2])
+    assert np.allclose(stripped[2], pad_table(table)[..., list(dofmap)])
@@ -5,6 +5,9 @@
 #
 # SPDX-License-Identifier:    LGPL-3.0-or-later
 
+import logging
+import re
+
 import numpy as np
 
 import cffi
@@ -135,3 +138,48 @@ def test_rank1(compile_args):
     u_correct = np.array([f[1], f[0]]) + gradf0
 
     assert np.allclose(u_ffcx, u_correct.T)
+
+
+def test_zero_tables(compile_args, caplog):
+    """Test evaluation of a vector-valued expression with zero tables.
+
+    Evaluates [f, div(grad(f)) + 2 f] where f is in P1 space, such that
+    the second derivatives of the basis functions are zero and the terms
+    with them are eliminated from the graph with two targets.
+
+    """
+    e = ufl.FiniteElement("P", "triangle", 1)
+    mesh = ufl.Mesh(ufl.VectorElement("P", "triangle", 1))
+    V = ufl.FunctionSpace(mesh, e)
+    f = ufl.Coefficient(V)
+
+    expr = ufl.as_vector([f, ufl.div(ufl.grad(f)) + 2 * f])
+
+    points = np.array([[0.0, 0.0], [1.0, 0.0], [0.0, 1.0], [0.25, 0.25]])
+    with caplog.at_level(logging.INFO, logger="ffcx"):
+        obj, module = ffcx.codegeneration.jit.compile_expressions(
+            [(expr, points)], parameters={"verbosity": logging.INFO}, cffi_extra_compile_args=compile_args)
+    removed = [re.search(r"Zero table elimination removed (\d+) of (\d+) operations", r.getMessage())
+               for r in caplog.records]
+    removed = [(int(m.group(1)), int(m.group(2))) for m in removed if m]
+    assert len(removed) == 1
+    assert 0 < removed[0][0] < removed[0][1]
+
+    ffi = cffi.FFI()
+    kernel = obj[0][0]
+
+    c_type, np_type = float_to_type("double")
+
+    A = np.zeros((4, 2), dtype=np_type)
+    w = np.array([1.0, 2.0, 3.0], dtype=np_type)
+    c = np.array([0.0], dtype=np_type)
+
+    coords = np.array([0.0, 0.0, 1.0, 0.0, 0.0, 1.0], dtype=np.float64)
+    kernel.tabulate_expression(
+        ffi.cast('{type} *'.format(type=c_type), A.ctypes.data),
+        ffi.cast('{type} *'.format(type=c_type), w.ctypes.data),
+        ffi.cast('{type} *'.format(type=c_type), c.ctypes.data),
+        ffi.cast('double *', coords.ctypes.data))
+
+    f_values = np.array([1.0, 2.0, 3.0, 1.75])
+    assert np.allclose(A, np.array([f_values, 2 * f_values]).T)
@@ -4,11 +4,17 @@
 #
 # SPDX-License-Identifier:    LGPL-3.0-or-later
 
+import re
+import tempfile
+from pathlib import Path
+
 import cffi
 import numpy as np
 import pytest
 
 import ffcx.codegeneration.jit
+import ffcx.compiler
+import ffcx.parameters
 import ufl
 import sympy
 
@@ -29,6 +35,79 @@ def float_to_type(name):
         raise RuntimeError("Unknown C type for: {}".format(name))
 
 
+def jit_compile(forms, parameters, compile_args, **kwargs):
+    """Compile forms by the JIT, returning the compiled forms and the generated C code."""
+    cache_dir = Path(tempfile.mkdtemp())
+    compiled_forms, module = ffcx.codegeneration.jit.compile_forms(
+        forms, parameters=parameters, cache_dir=cache_dir, cffi_extra_compile_args=compile_args, **kwargs)
+    return compiled_forms, "".join(f.read_text() for f in sorted(cache_dir.glob("*.c")))
+
+
+def tabulate_cells(integral, shape, w, c, coords, entity_local_index=None, quadrature_permutation=None):
+    """Tabulate an integral on each cell of a batch by tabulate_tensor, returning the element tensors."""
+    ffi = cffi.FFI()
+    A = np.zeros((len(coords), ) + shape, dtype=np.float64)
+    for i in range(len(coords)):
+        entity, perm = ffi.NULL, ffi.NULL
+        if entity_local_index is not None:
+            entity = ffi.cast('int *', entity_local_index[i:].ctypes.data)
+            perm = ffi.cast('uint8_t *', quadrature_permutation[i:].ctypes.data)
+        integral.tabulate_tensor(
+            ffi.cast('double *', A[i].ctypes.data), ffi.cast('double *', w[i].ctypes.data),
+            ffi.cast('double *', c.ctypes.data), ffi.cast('double *', coords[i].ctypes.data), entity, perm, 0)
+    return A
+
+
+def compile_and_compare(forms, parameters, reference_parameters, compile_args, coords, w=(), c=(),
+                        reference_c=None, integral_types=("cell", ), cell_permutations=(0, ), **kwargs):
+    """Compile forms with the given and the reference parameters, and compare their element tensors.
+
+    The integrals of each form are tabulated on a cell with coordinate
+    dofs coords, exterior facet integrals on each facet of the cell.
+    The element tensors hold ones before tabulation, so kernels must
+    add to them. Further keyword arguments are passed to compile_forms
+    with the given parameters. Returns the generated C code and the
+    element tensors, keyed by form, integral type, subdomain id, facet
+    and cell permutation, for the reference and the given parameters.
+
+    """
+    c_type, np_type = float_to_type(parameters.get("scalar_type", "double"))
+    ffi = cffi.FFI()
+    coords = np.array(coords, dtype=np.float64)
+    perm = np.zeros(1, dtype=np.uint8)
+
+    codes, tensors = [], []
+    for p, ck, kw in [(reference_parameters, c if reference_c is None else reference_c, {}), (parameters, c, kwargs)]:
+        compiled_forms, code = jit_compile(forms, p, compile_args, **kw)
+        codes.append(code)
+
+        wk, ck = np.array(w, dtype=np_type), np.array(ck, dtype=np_type)
+        A = {}
+        for i, (form, name) in enumerate(compiled_forms):
+            shape = tuple(form.create_finite_element(k).space_dimension for k in range(form.rank))
+            for integral_type in integral_types:
+                ids = np.zeros(getattr(form, f"num_{integral_type}_integrals"), dtype=np.intc)
+                getattr(form, f"get_{integral_type}_integral_ids")(ffi.cast('int *', ids.ctypes.data))
+                facets = [None] if integral_type == "cell" else range(forms[i].ufl_cell().num_facets())
+                for subdomain_id, facet in ((int(j), facet) for j in ids for facet in facets):
+                    integral = getattr(form, f"create_{integral_type}_integral")(subdomain_id)
+                    entity = np.array([0 if facet is None else facet], dtype=np.intc)
+                    for cell_permutation in cell_permutations:
+                        Ak = np.ones(shape, dtype=np_type)
+                        integral.tabulate_tensor(
+                            ffi.cast(f'{c_type} *', Ak.ctypes.data), ffi.cast(f'{c_type} *', wk.ctypes.data),
+                            ffi.cast(f'{c_type} *', ck.ctypes.data), ffi.cast('double *', coords.ctypes.data),
+                            ffi.cast('int *', entity.ctypes.data), ffi.cast('uint8_t *', perm.ctypes.data),
+                            cell_permutation)
+                        A[i, integral_type, subdomain_id, facet, cell_permutation] = Ak
+        tensors.append(A)
+
+    assert tensors[0].keys() == tensors[1].keys()
+    for key in tensors[0]:
+        assert np.allclose(tensors[0][key], tensors[1][key])
+    return codes, tensors
+
+
 @pytest.mark.parametrize("mode,expected_result", [
     ("double", np.array([[1.0, -0.5, -0.5], [-0.5, 0.5, 0.0], [-0.5, 0.0, 0.5]], dtype=np.float64)),
     ("double complex",
@@ -671,3 +750,514 @@ def test_lagrange_tetrahedron(compile_args, order, mode, sym_fun, ufl_fun):
                 ffi.NULL,
                 ffi.cast('double *', new_coords.ctypes.data), ffi.NULL, ffi.NULL, perm)
             assert np.allclose(b[start:end], perm_b[start:end])
+
+
+def test_parallel_compilation(compile_args):
+    cell = ufl.triangle
+    element = ufl.FiniteElement("Lagrange", cell, 2)
+    u, v = ufl.TrialFunction(element), ufl.TestFunction(element)
+    f = ufl.Coefficient(element)
+    a = ufl.inner(ufl.grad(u), ufl.grad(v)) * ufl.dx + f * ufl.inner(u, v) * ufl.dx(1) + ufl.inner(u, v) * ufl.ds
+    L = f * v * ufl.dx + f * v * ufl.dx(3)
+
+    code = []
+    for num_workers in (1, 2):
+        parameters = ffcx.parameters.get_parameters({"ir_num_workers": num_workers,
+                                                     "codegen_num_workers": num_workers})
+        code.append(ffcx.compiler.compile_ufl_objects([a, L], prefix="parallel", parameters=parameters))
+    assert code[0] == code[1]
+
+    compiled_forms, module = ffcx.codegeneration.jit.compile_forms(
+        [a, L], parameters={"ir_num_workers": 2, "codegen_num_workers": 2}, cffi_extra_compile_args=compile_args)
+    assert compiled_forms[0][0].num_cell_integrals == 2
+    assert compiled_forms[1][0].num_cell_integrals == 2
+
+
+@pytest.mark.parametrize("mode", ["double", "double complex"])
+def test_table_blobs(mode, compile_args):
+    cell = ufl.triangle
+    element = ufl.FiniteElement("Lagrange", cell, 3)
+    u, v = ufl.TrialFunction(element), ufl.TestFunction(element)
+    a = ufl.inner(ufl.grad(u), ufl.grad(v)) * ufl.dx + ufl.inner(u, v) * ufl.dx
+
+    coords = [0.0, 0.0, 1.0, 0.0, 0.0, 1.0]
+    parameters = {"scalar_type": mode, "table_blob_threshold": 0}
+    (code0, code), (A0, A) = compile_and_compare([a], parameters, {"scalar_type": mode}, compile_args, coords)
+    assert "_data.values" in code and "_data.values" not in code0
+    assert np.allclose(A[0, "cell", -1, None, 0], A[0, "cell", -1, None, 0].T)
+
+
+def test_shared_tables(compile_args):
+    cell = ufl.triangle
+    element = ufl.FiniteElement("Lagrange", cell, 2)
+    u, v = ufl.TrialFunction(element), ufl.TestFunction(element)
+    f = ufl.Coefficient(element)
+    a = ufl.inner(u, v) * ufl.dx
+    L = f * v * ufl.dx
+
+    # Both forms use the same quadrature rule and basis function tables
+    coords = [0.0, 0.0, 1.0, 0.0, 0.0, 1.0]
+    (code0, code), (A0, A) = compile_and_compare([a, L], {"shared_tables": True}, {"shared_tables": False},
+                                                 compile_args, coords, w=np.ones(6))
+    assert code.count("static const double weights_") == 1
+    assert code0.count("static const double weights_") == 2
+    assert np.isclose(np.sum(A[0, "cell", -1, None, 0] - 1), 0.5)
+    assert np.isclose(np.sum(A[1, "cell", -1, None, 0] - 1), 0.5)
+
+
+@pytest.mark.parametrize("translation_units", [0, 2])
+def test_translation_units(translation_units, compile_args):
+    cell = ufl.triangle
+    element = ufl.FiniteElement("Lagrange", cell, 2)
+    u, v = ufl.TrialFunction(element), ufl.TestFunction(element)
+    f = ufl.Coefficient(element)
+    a = ufl.inner(ufl.grad(u), ufl.grad(v)) * ufl.dx + f * ufl.inner(u, v) * ufl.dx(1) + ufl.inner(u, v) * ufl.ds
+    L = f * v * ufl.dx
+
+    coords = [0.0, 0.0, 1.0, 0.0, 0.0, 1.0]
+    parameters = {"translation_units": translation_units, "large_unit_size": 0}
+    (code0, code), (A0, A) = compile_and_compare([a, L], parameters, {}, compile_args, coords, w=np.ones(6))
+    assert {key[:3] for key in A} == {(0, "cell", -1), (0, "cell", 1), (1, "cell", -1)}
+
+    # The module source is followed by a unit for each group of the
+    # four kernels, each unit including the UFC header
+    num_units = translation_units if translation_units > 0 else 4
+    assert code0.count("#include <ufc.h>") == 1
+    assert code.count("#include <ufc.h>") == 1 + num_units
+
+
+def test_streaming(compile_args):
+    cell = ufl.triangle
+    element = ufl.FiniteElement("Lagrange", cell, 2)
+    u, v = ufl.TrialFunction(element), ufl.TestFunction(element)
+    f = ufl.Coefficient(element)
+    a = ufl.inner(ufl.grad(u), ufl.grad(v)) * ufl.dx + f * ufl.inner(u, v) * ufl.dx
+    L = f * v * ufl.dx
+
+    # The module source includes the body written while the code is
+    # generated
+    coords = [0.0, 0.0, 1.0, 0.0, 0.0, 1.0]
+    (code0, code), _ = compile_and_compare([a, L], {"streaming": True}, {"streaming": False}, compile_args, coords,
+                                           w=np.ones(6))
+    assert '_body.c"' in code and '_body.c"' not in code0
+
+
+def test_max_unroll(compile_args):
+    cell = ufl.triangle
+    P2 = ufl.VectorElement("Lagrange", cell, 2)
+    P1 = ufl.FiniteElement("Lagrange", cell, 1)
+    element = ufl.MixedElement([P2, P1])
+    u, p = ufl.TrialFunctions(element)
+    v, q = ufl.TestFunctions(element)
+    f = ufl.Coefficient(element)
+    f_u, f_p = ufl.split(f)
+    a = (ufl.inner(ufl.grad(u), ufl.grad(v)) + ufl.inner(ufl.dot(f_u, ufl.grad(u)), v)
+         - ufl.div(v) * p + ufl.div(u) * q) * ufl.dx
+
+    # The interleaved dofs of the components of the coefficient are
+    # looped over by static arrays if the limit is exceeded
+    coords = [0.0, 0.0, 1.0, 0.0, 0.0, 1.0]
+    (code0, code), _ = compile_and_compare([a], {"max_unroll": 0}, {"max_unroll": -1}, compile_args, coords,
+                                           w=np.arange(15))
+    pattern = re.compile(r"static const int w0_c\d+_dofs\[")
+    assert pattern.search(code) and not pattern.search(code0)
+
+    # Dof transformations of N1curl are applied by loops over static
+    # tables of the transformed rows if the limit is exceeded
+    N1curl = ufl.FiniteElement("N1curl", cell, 2)
+    u, v = ufl.TrialFunction(N1curl), ufl.TestFunction(N1curl)
+    f = ufl.Coefficient(N1curl)
+    a = (ufl.inner(f, f) * ufl.inner(u, v) + ufl.inner(ufl.curl(u), ufl.curl(v))) * ufl.dx
+    (code0, code), _ = compile_and_compare([a], {"max_unroll": 0}, {"max_unroll": -1}, compile_args, coords,
+                                           w=np.arange(1, 9), cell_permutations=(0, 5))
+    assert "transform_rows" in code and "transform_rows" not in code0
+
+
+def test_tabulate_tensor_batch(compile_args):
+    cell = ufl.triangle
+    element = ufl.FiniteElement("Lagrange", cell, 2)
+    u, v = ufl.TrialFunction(element), ufl.TestFunction(element)
+    f = ufl.Coefficient(element)
+    a = f * ufl.inner(ufl.grad(u), ufl.grad(v)) * ufl.dx + f * u * v * ufl.ds
+
+    # Without a SIMD width the batch kernel loops over tabulate_tensor
+    compiled_forms, code = jit_compile([a], {}, compile_args)
+    assert "void tabulate_tensor_batch_" in code and "tabulate_tensor_simd_" not in code
+    form = compiled_forms[0][0]
+
+    ffi = cffi.FFI()
+    num_cells = 3
+    coords = np.array([[0.0, 0.0, 1.0, 0.0, 0.0, 1.0],
+                       [1.0, 0.0, 0.0, 1.0, 1.0, 1.0],
+                       [0.0, 0.0, 2.0, 0.0, 0.0, 0.5]], dtype=np.float64)
+    w = np.arange(num_cells * 6, dtype=np.float64).reshape(num_cells, 6)
+    c = np.array([], dtype=np.float64)
+    facets = np.array([0, 2, 1], dtype=np.intc)
+    perms = np.zeros(num_cells, dtype=np.uint8)
+
+    for integral, local_index in [(form.create_cell_integral(-1), None),
+                                  (form.create_exterior_facet_integral(-1), facets)]:
+        A = np.zeros((num_cells, 6, 6), dtype=np.float64)
+        integral.tabulate_tensor_batch(
+            num_cells, ffi.cast('double *', A.ctypes.data),
+            ffi.cast('double *', w.ctypes.data),
+            ffi.cast('double *', c.ctypes.data),
+            ffi.cast('double *', coords.ctypes.data),
+            ffi.NULL if local_index is None else ffi.cast('int *', local_index.ctypes.data),
+            ffi.NULL if local_index is None else ffi.cast('uint8_t *', perms.ctypes.data), ffi.NULL)
+        assert np.allclose(A, tabulate_cells(integral, (6, 6), w, c, coords, local_index, perms))
+
+
+@pytest.mark.parametrize("simd_width", [4, 8])
+def test_simd_width(compile_args, simd_width):
+    cell = ufl.triangle
+    element = ufl.FiniteElement("Lagrange", cell, 2)
+    u, v = ufl.TrialFunction(element), ufl.TestFunction(element)
+    f = ufl.Coefficient(element)
+    a = ufl.conditional(ufl.gt(f, 5.0), f, 1.0) * ufl.inner(ufl.grad(u), ufl.grad(v)) * ufl.dx
+
+    # The cell integral is vectorized, not the scalar batch loop
+    compiled_forms, code = jit_compile([a], {"simd_width": simd_width}, compile_args + ["-fopenmp-simd"])
+    assert "tabulate_tensor_simd_" in code
+    integral = compiled_forms[0][0].create_cell_integral(-1)
+
+    # A number of cells that is not a multiple of the SIMD width
+    ffi = cffi.FFI()
+    num_cells = 2 * simd_width + 3
+    rng = np.random.default_rng(0)
+    vertices = np.array([[0.0, 0.0], [1.0, 0.0], [0.0, 1.0]])
+    coords = (vertices + 0.2 * rng.random((num_cells, 3, 2))).reshape(num_cells, 6)
+    w = 10.0 * rng.random((num_cells, 6))
+    c = np.array([], dtype=np.float64)
+
+    A = np.zeros((num_cells, 6, 6), dtype=np.float64)
+    integral.tabulate_tensor_batch(
+        num_cells, ffi.cast('double *', A.ctypes.data), ffi.cast('double *', w.ctypes.data),
+        ffi.cast('double *', c.ctypes.data), ffi.cast('double *', coords.ctypes.data), ffi.NULL, ffi.NULL, ffi.NULL)
+    assert np.allclose(A, tabulate_cells(integral, (6, 6), w, c, coords))
+
+
+@pytest.mark.parametrize("cell,degree", [(ufl.quadrilateral, 3), (ufl.hexahedron, 2)])
+def test_sum_factorization(compile_args, cell, degree):
+    element = ufl.FiniteElement("Q", cell, degree)
+    u, v = ufl.TrialFunction(element), ufl.TestFunction(element)
+    f = ufl.Coefficient(element)
+    a = ufl.inner(ufl.grad(u), ufl.grad(v)) * ufl.dx + f * u * v * ufl.dx
+    L = f * v * ufl.dx
+
+    tdim = cell.topological_dimension()
+    vertices = np.array([[(i >> d) & 1 for d in range(tdim)] for i in range(2 ** tdim)], dtype=np.float64)
+    coords = (vertices + 0.1 * np.random.default_rng(0).random(vertices.shape)).flatten()
+    (code0, code), _ = compile_and_compare([a, L], {"sum_factorization": True}, {"sum_factorization": False},
+                                           compile_args, coords, w=np.arange((degree + 1) ** tdim),
+                                           cell_permutations=(0, 1))
+
+    # The factors of the quadrature points are stored for contraction
+    # with the 1D tables
+    assert "ufc_scalar_t sf0[" in code and "ufc_scalar_t sf0[" not in code0
+
+
+@pytest.mark.parametrize("cell", [ufl.triangle, ufl.tetrahedron])
+def test_preintegration(compile_args, cell):
+    element = ufl.FiniteElement("Lagrange", cell, 2)
+    u, v = ufl.TrialFunction(element), ufl.TestFunction(element)
+    kappa = ufl.Coefficient(ufl.FiniteElement("DG", cell, 0))
+    a = kappa * ufl.inner(ufl.grad(u), ufl.grad(v)) * ufl.dx + u * v * ufl.dx + kappa * u * v * ufl.ds
+
+    tdim = cell.topological_dimension()
+    vertices = np.vstack([np.zeros(tdim), np.eye(tdim)])
+    coords = (vertices + 0.1 * np.random.default_rng(0).random(vertices.shape)).flatten()
+    (code0, code), _ = compile_and_compare([a], {"preintegration": True}, {"preintegration": False}, compile_args,
+                                           coords, w=[2.0], integral_types=("cell", "exterior_facet"))
+
+    # The blocks are scaled by the factor from preintegrated tables
+    assert "static const double PI_" in code and "static const double PI_" not in code0
+
+
+def test_gemm_blocks(compile_args):
+    cell = ufl.triangle
+    element = ufl.FiniteElement("Lagrange", cell, 3)
+    u, v = ufl.TrialFunction(element), ufl.TestFunction(element)
+    f = ufl.Coefficient(ufl.FiniteElement("Lagrange", cell, 1))
+    a = f * ufl.inner(ufl.grad(u), ufl.grad(v)) * ufl.dx + f * u * v * ufl.ds
+
+    parameters = ffcx.parameters.get_parameters({"gemm_min_block_size": 0, "gemm_microkernel": "user_gemm"})
+    code_h, code_c = ffcx.compiler.compile_ufl_objects([a], prefix="gemm", parameters=parameters)
+    assert "user_gemm(" in code_c
+
+    # The premultiplied first argument is stored at all points, and
+    # multiplied with the second argument by the register tiled loop
+    # nest
+    coords = [0.1, 0.0, 1.0, 0.2, 0.3, 1.1]
+    (code0, code), _ = compile_and_compare([a], {"gemm_min_block_size": 0}, {"gemm_min_block_size": -1},
+                                           compile_args, coords, w=[1.0, 2.0, 3.0],
+                                           integral_types=("cell", "exterior_facet"))
+    assert "ufc_scalar_t gemm_a0[" in code and "acc0_0 += " in code
+    assert "gemm_a0" not in code0
+
+
+@pytest.mark.parametrize("cell,coords", [(ufl.triangle, [0.1, 0.0, 1.0, 0.2, 0.3, 1.1]),
+                                         (ufl.quadrilateral, [0.0, 0.0, 1.0, 0.1, 0.2, 1.0, 1.3, 1.2])])
+def test_symmetric_blocks(compile_args, cell, coords):
+    element = ufl.FiniteElement("Lagrange", cell, 2)
+    u, v = ufl.TrialFunction(element), ufl.TestFunction(element)
+    f = ufl.Coefficient(element)
+    a = (f * ufl.inner(ufl.grad(u), ufl.grad(v)) + u * v) * ufl.dx
+
+    (code0, code), (A0, A) = compile_and_compare([a], {"symmetric_blocks": True}, {"symmetric_blocks": False},
+                                                 compile_args, coords, w=np.arange(1, 10))
+    for Ak in A.values():
+        assert np.allclose(Ak, Ak.T)
+
+    # The upper triangle is accumulated in a scratch array, which is
+    # added to both triangles of the element tensor after the loop
+    assert "ufc_scalar_t sym0[" in code and "ufc_scalar_t sym0[" not in code0
+    assert "for (int j = i + 1; j < " in code
+
+
+# Cells, coordinate dofs and parameters for which the extra kernels of
+# bilinear forms are checked against tabulate_tensor
+kernel_cases = [
+    (ufl.triangle, [0.1, 0.0, 1.0, 0.2, 0.3, 1.1], {}),
+    (ufl.triangle, [0.1, 0.0, 1.0, 0.2, 0.3, 1.1], {"preintegration": True}),
+    (ufl.quadrilateral, [0.0, 0.0, 1.0, 0.1, 0.2, 1.0, 1.3, 1.2], {"sum_factorization": True})]
+
+
+def neighbour_cells(cell, coords):
+    """Return the coordinate dofs of a cell and a neighbour sharing a facet, and the local indices of the facet."""
+    x = np.array(coords, dtype=np.float64).reshape(-1, 2)
+    if cell == ufl.triangle:
+        # Reflect the first vertex through the midpoint of facet 0
+        return np.vstack([x, [x[1] + x[2] - x[0], x[1], x[2]]]).flatten(), [0, 0]
+    elif cell == ufl.quadrilateral:
+        # Extend the edges of the cell through facet 2, which is facet 1 of the neighbour
+        return np.vstack([x, [x[1], 2 * x[1] - x[0], x[3], 2 * x[3] - x[2]]]).flatten(), [2, 1]
+    raise RuntimeError(f"No neighbour for {cell}")
+
+
+@pytest.mark.parametrize("cell,coords,parameters", kernel_cases)
+def test_tabulate_action(compile_args, cell, coords, parameters):
+    element = ufl.FiniteElement("Lagrange", cell, 2)
+    u, v = ufl.TrialFunction(element), ufl.TestFunction(element)
+    f = ufl.Coefficient(ufl.FiniteElement("DG", cell, 0))
+    a = (f * ufl.inner(ufl.grad(u), ufl.grad(v)) + u.dx(0) * v) * ufl.dx + f * u * v * ufl.ds \
+        + ufl.avg(f) * ufl.jump(u) * ufl.jump(v) * ufl.dS
+
+    compiled_forms, module = ffcx.codegeneration.jit.compile_forms(
+        [a], parameters=dict(parameters, tabulate_action=True), cffi_extra_compile_args=compile_args)
+    form = compiled_forms[0][0]
+    ndofs = form.create_finite_element(0).space_dimension
+
+    ffi = cffi.FFI()
+    w = np.array([2.0, 3.0], dtype=np.float64)
+    c = np.array([], dtype=np.float64)
+
+    # Integrals with the entity, coordinate dofs and number of dofs of
+    # the cells, two cells sharing a facet for interior facet integrals
+    integrals = [(form.create_cell_integral(-1), None, coords, ndofs)]
+    for facet in range(cell.num_facets()):
+        integrals.append((form.create_exterior_facet_integral(-1), [facet], coords, ndofs))
+    interior_coords, interior_facets = neighbour_cells(cell, coords)
+    integrals.append((form.create_interior_facet_integral(-1), interior_facets, interior_coords, 2 * ndofs))
+    for integral, facets, coords, n in integrals:
+        coords = np.array(coords, dtype=np.float64)
+        facets = None if facets is None else np.array(facets, dtype=np.intc)
+        entity = ffi.NULL if facets is None else ffi.cast('int *', facets.ctypes.data)
+        perm = np.zeros(2, dtype=np.uint8)
+        x = np.arange(1, n + 1, dtype=np.float64)
+        A = np.zeros((n, n), dtype=np.float64)
+        integral.tabulate_tensor(
+            ffi.cast('double *', A.ctypes.data), ffi.cast('double *', w.ctypes.data),
+            ffi.cast('double *', c.ctypes.data), ffi.cast('double *', coords.ctypes.data),
+            entity, ffi.cast('uint8_t *', perm.ctypes.data), 0)
+        y = np.ones(n, dtype=np.float64)
+        integral.tabulate_action(
+            ffi.cast('double *', y.ctypes.data), ffi.cast('double *', x.ctypes.data),
+            ffi.cast('double *', w.ctypes.data), ffi.cast('double *', c.ctypes.data),
+            ffi.cast('double *', coords.ctypes.data), entity, ffi.cast('uint8_t *', perm.ctypes.data), 0)
+        assert np.allclose(y - 1, A @ x)
+
+
+@pytest.mark.parametrize("cell,coords,parameters", kernel_cases)
+def test_tabulate_diagonal(compile_args, cell, coords, parameters):
+    element = ufl.FiniteElement("Lagrange", cell, 2)
+    u, v = ufl.TrialFunction(element), ufl.TestFunction(element)
+    f = ufl.Coefficient(ufl.FiniteElement("DG", cell, 0))
+    a = (f * ufl.inner(ufl.grad(u), ufl.grad(v)) + u.dx(0) * v + u * v.dx(0)) * ufl.dx + f * u * v * ufl.ds
+
+    compiled_forms, module = ffcx.codegeneration.jit.compile_forms(
+        [a], parameters=dict(parameters, tabulate_diagonal=True), cffi_extra_compile_args=compile_args)
+    form = compiled_forms[0][0]
+    ndofs = form.create_finite_element(0).space_dimension
+
+    ffi = cffi.FFI()
+    coords = np.array(coords, dtype=np.float64)
+    w = np.array([2.0], dtype=np.float64)
+    c = np.array([], dtype=np.float64)
+
+    integrals = [(form.create_cell_integral(-1), ffi.NULL)]
+    for facet in range(cell.num_facets()):
+        facets = np.array([facet], dtype=np.intc)
+        integrals.append((form.create_exterior_facet_integral(-1), facets))
+    for integral, facets in integrals:
+        entity = ffi.NULL if facets is ffi.NULL else ffi.cast('int *', facets.ctypes.data)
+        perm = np.array([0], dtype=np.uint8)
+        A = np.zeros((ndofs, ndofs), dtype=np.float64)
+        integral.tabulate_tensor(
+            ffi.cast('double *', A.ctypes.data), ffi.cast('double *', w.ctypes.data),
+            ffi.cast('double *', c.ctypes.data), ffi.cast('double *', coords.ctypes.data),
+            entity, ffi.cast('uint8_t *', perm.ctypes.data), 0)
+        d = np.ones(ndofs, dtype=np.float64)
+        integral.tabulate_diagonal(
+            ffi.cast('double *', d.ctypes.data), ffi.cast('double *', w.ctypes.data),
+            ffi.cast('double *', c.ctypes.data), ffi.cast('double *', coords.ctypes.data),
+            entity, ffi.cast('uint8_t *', perm.ctypes.data), 0)
+        assert np.allclose(d - 1, np.diag(A))
+
+
+@pytest.mark.parametrize("cell,coords,parameters", kernel_cases)
+def test_tabulate_fused(compile_args, cell, coords, parameters):
+    element = ufl.FiniteElement("Lagrange", cell, 2)
+    du, v = ufl.TrialFunction(element), ufl.TestFunction(element)
+    u = ufl.Coefficient(element)
+    f = ufl.Coefficient(ufl.FiniteElement("DG", cell, 0))
+    k = ufl.Constant(cell)
+    F = (1 + u**2) * ufl.inner(ufl.grad(u), ufl.grad(v)) * ufl.dx - f * v * ufl.dx + k * u * v * ufl.ds
+    J = ufl.derivative(F, u, du)
+
+    compiled_forms, module = ffcx.codegeneration.jit.compile_forms(
+        [J, F], parameters=dict(parameters, fuse_forms=True), cffi_extra_compile_args=compile_args)
+    ndofs = compiled_forms[0][0].create_finite_element(0).space_dimension
+
+    ffi = cffi.FFI()
+    coords = np.array(coords, dtype=np.float64)
+    u_dofs = np.linspace(0.5, 1.5, ndofs)
+    w = [u_dofs, np.append(u_dofs, 2.0)]
+    c = np.array([3.0], dtype=np.float64)
+    w_ptrs = ffi.new("double *[2]", [ffi.cast('double *', wk.ctypes.data) for wk in w])
+    c_ptrs = ffi.new("double *[2]", [ffi.cast('double *', c.ctypes.data)] * 2)
+
+    integrals = [([form.create_cell_integral(-1) for form, name in compiled_forms], ffi.NULL)]
+    for facet in range(cell.num_facets()):
+        facets = np.array([facet], dtype=np.intc)
+        integrals.append(([form.create_exterior_facet_integral(-1) for form, name in compiled_forms], facets))
+    for (jac, res), facets in integrals:
+        entity = ffi.NULL if facets is ffi.NULL else ffi.cast('int *', facets.ctypes.data)
+        perm = np.array([0], dtype=np.uint8)
+        A = [np.zeros((ndofs, ndofs), dtype=np.float64), np.zeros(ndofs, dtype=np.float64)]
+        for integral, Ak, wk in zip((jac, res), A, w):
+            integral.tabulate_tensor(
+                ffi.cast('double *', Ak.ctypes.data), ffi.cast('double *', wk.ctypes.data),
+                ffi.cast('double *', c.ctypes.data), ffi.cast('double *', coords.ctypes.data),
+                entity, ffi.cast('uint8_t *', perm.ctypes.data), 0)
+
+        # Both integrals share the fused kernel
+        assert jac.tabulate_fused == res.tabulate_fused
+        A_fused = [np.ones_like(Ak) for Ak in A]
+        A_ptrs = ffi.new("double *[2]", [ffi.cast('double *', Ak.ctypes.data) for Ak in A_fused])
+        jac.tabulate_fused(A_ptrs, w_ptrs, c_ptrs, ffi.cast('double *', coords.ctypes.data),
+                           entity, ffi.cast('uint8_t *', perm.ctypes.data), 0)
+        for Ak, Ak_fused in zip(A, A_fused):
+            assert np.allclose(Ak_fused - 1, Ak)
+
+
+@pytest.mark.parametrize("ensemble_size", [1, 4])
+def test_tabulate_ensemble(compile_args, ensemble_size):
+    cell = ufl.triangle
+    element = ufl.FiniteElement("Lagrange", cell, 2)
+    u, v = ufl.TrialFunction(element), ufl.TestFunction(element)
+    f = ufl.Coefficient(ufl.FiniteElement("Lagrange", cell, 1))
+    k = ufl.Constant(cell)
+    a = k * f * ufl.inner(ufl.grad(u), ufl.grad(v)) * ufl.dx + f**2 * u * v * ufl.ds
+
+    # The cell and the exterior facet integral are vectorized across
+    # the ensemble, not looped over the members
+    compiled_forms, code = jit_compile([a], {"ensemble_size": ensemble_size}, compile_args + ["-fopenmp-simd"])
+    assert code.count("static void tabulate_ensemble_simd_") == 2
+    form = compiled_forms[0][0]
+    ndofs = form.create_finite_element(0).space_dimension
+
+    ffi = cffi.FFI()
+    coords = np.array([0.1, 0.0, 1.0, 0.2, 0.3, 1.1], dtype=np.float64)
+    w = np.linspace(0.5, 2.0, 3 * ensemble_size).reshape(ensemble_size, 3)
+    c = np.arange(1.0, ensemble_size + 1.0).reshape(ensemble_size, 1)
+
+    integrals = [(form.create_cell_integral(-1), ffi.NULL)]
+    for facet in range(cell.num_facets()):
+        facets = np.array([facet], dtype=np.intc)
+        integrals.append((form.create_exterior_facet_integral(-1), facets))
+    for integral, facets in integrals:
+        assert integral.ensemble_size == ensemble_size
+        entity = ffi.NULL if facets is ffi.NULL else ffi.cast('int *', facets.ctypes.data)
+        perm = np.array([0], dtype=np.uint8)
+        A = np.zeros((ensemble_size, ndofs, ndofs), dtype=np.float64)
+        for Ak, wk, ck in zip(A, w, c):
+            integral.tabulate_tensor(
+                ffi.cast('double *', Ak.ctypes.data), ffi.cast('double *', wk.ctypes.data),
+                ffi.cast('double *', ck.ctypes.data), ffi.cast('double *', coords.ctypes.data),
+                entity, ffi.cast('uint8_t *', perm.ctypes.data), 0)
+        A_ensemble = np.ones_like(A)
+        integral.tabulate_ensemble(
+            ffi.cast('double *', A_ensemble.ctypes.data), ffi.cast('double *', w.ctypes.data),
+            ffi.cast('double *', c.ctypes.data), ffi.cast('double *', coords.ctypes.data),
+            entity, ffi.cast('uint8_t *', perm.ctypes.data), 0)
+        assert np.allclose(A_ensemble - 1, A)
+
+
+def test_specialize_constants(compile_args):
+    cell = ufl.triangle
+    element = ufl.FiniteElement("Lagrange", cell, 2)
+    u, v = ufl.TrialFunction(element), ufl.TestFunction(element)
+    k = ufl.Constant(cell)
+    b = ufl.Constant(cell, shape=(2, ))
+    m = ufl.Constant(cell)
+    a = (k * u * v + ufl.inner(b, ufl.grad(u)) * v + m * ufl.inner(ufl.grad(u), ufl.grad(v))) * ufl.dx
+
+    coords = [0.1, 0.0, 1.0, 0.2, 0.3, 1.1]
+    (code0, code), _ = compile_and_compare([a], {}, {}, compile_args, coords, c=[2.0],
+                                           reference_c=[2.0, 1.0, 0.0, 0.0],
+                                           specialize_constants={b: [1.0, 0.0], m: 0.0})
+
+    # Only the constant k is left as an input of the specialized form
+    assert "form->num_constants = 3;" in code0 and "form->num_constants = 1;" in code
+    assert re.search(r"\bc\[3\]", code0) and not re.search(r"\bc\[[1-9]\]", code)
+
+
+@pytest.mark.parametrize("parameters", [
+    {"cnodes_optimization": True},
+    {"cnodes_optimization": True, "fma_contraction": True},
+    {"cnodes_optimization": True, "preintegration": True}])
+def test_cnodes_optimization(compile_args, parameters):
+    cell = ufl.triangle
+    element = ufl.FiniteElement("Lagrange", cell, 2)
+    du, v = ufl.TrialFunction(element), ufl.TestFunction(element)
+    u = ufl.Coefficient(element)
+    k = ufl.Constant(cell)
+    F = (1 + u**2 + u**3 / k) * ufl.inner(ufl.grad(u), ufl.grad(v)) * ufl.dx + u**2 / (1 + k**2) * v * ufl.dx
+    J = ufl.derivative(F, u, du)
+
+    coords = [0.1, 0.0, 1.0, 0.2, 0.3, 1.1]
+    (code0, code), _ = compile_and_compare([J], parameters, {}, compile_args, coords,
+                                           w=[0.5, 1.0, 1.5, 0.2, 0.4, 0.8], c=[2.0])
+
+    # Integer powers are expanded into multiplications
+    assert "pow(" in code0 and "pow(" not in code
+    assert ("fma(" in code) == parameters.get("fma_contraction", False)
+
+
+def test_hoist_piecewise_arguments(compile_args):
+    cell = ufl.triangle
+    P1, P2 = ufl.FiniteElement("Lagrange", cell, 1), ufl.FiniteElement("Lagrange", cell, 2)
+    f = ufl.Coefficient(P2)
+    u1, v1, u2 = ufl.TrialFunction(P1), ufl.TestFunction(P1), ufl.TrialFunction(P2)
+    a1 = (1 + f**2) * ufl.inner(ufl.grad(u1), ufl.grad(v1)) * ufl.dx
+    a2 = (1 + f**2) * (u2 * v1.dx(0) + ufl.inner(ufl.grad(u2), ufl.grad(v1))) * ufl.dx
+
+    coords = [0.1, 0.0, 1.0, 0.2, 0.3, 1.1]
+    (code0, code), _ = compile_and_compare([a1, a2], {"hoist_piecewise_arguments": True},
+                                           {"hoist_piecewise_arguments": False}, compile_args, coords,
+                                           w=[0.5, 1.0, 1.5, 0.2, 0.4, 0.8])
+
+    # The products of the factor and the trial functions of a2 are
+    # summed over the quadrature points in an array over the P2 dofs
+    assert "ufc_scalar_t hsum0[" in code and "hsum" not in code0